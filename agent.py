@@ -8,14 +8,41 @@ import re
 import json
 import time
 import csv
+import hashlib
+import contextlib
+import contextvars
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import anthropic
 from dotenv import load_dotenv
 from langfuse import observe, get_client as get_langfuse_client
 from opentelemetry.instrumentation.anthropic import AnthropicInstrumentor
 
-from tools import search_web, format_search_results
-from prompts import SYSTEM_PROMPT, ANALYSIS_PROMPT, SEARCH_PLANNING_PROMPT
+from cache import SQLiteCache, normalize_text, make_key
+from ratelimit import anthropic_limiter, start_run as start_rate_limit_run
+from breaker import CircuitOpenError, anthropic_breaker, degraded_providers
+from retry import retry_policy
+import search_policy
+import budget_controller
+from deadline import Deadline, start as start_run_deadline
+from checkpoint import save_step, load_steps, clear_checkpoint
+from research import (
+    ResearchEngine, QueryDeduper, QueryStreamParser, assemble_findings, dedupe_findings,
+    merge_speculative, search_stats, research_makespan, estimate_tokens,
+    StragglerLog, quorum_size, RESEARCH_QUORUM, RESEARCH_DEADLINE_SEC,
+    FINDINGS_TOKEN_BUDGET, QUERY_DEDUP_THRESHOLD,
+)
+from passages import PASSAGE_CHAR_BUDGET
+from prompts import (
+    SYSTEM_PROMPT,
+    SEARCH_PLANNING_INSTRUCTIONS,
+    SEARCH_PLANNING_PROMPT,
+    ANALYSIS_INSTRUCTIONS,
+    ANALYSIS_PROMPT,
+    GAP_MATRIX_PROMPT,
+    REPORT_SECTION_PROMPT,
+)
+from sections import SHARDED_ANALYSIS, MATRIX_SHARD, SECTION_SHARDS, merge_sections, render_shard
 
 load_dotenv()
 
@@ -23,78 +50,388 @@ load_dotenv()
 langfuse = get_langfuse_client()
 AnthropicInstrumentor().instrument()
 
-# Initialize Claude client
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Initialize Claude client. The SDK's own retries are off: retry_policy
+# (see _retry_api_call) is the only retry layer, so every retry respects
+# the run deadline.
+client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+
+SONNET_4_5 = "claude-sonnet-4-5-20250929"
+SONNET_4 = "claude-sonnet-4-20250514"
+HAIKU_4_5 = "claude-haiku-4-5-20251001"
+
+# USD per million tokens (input, output), for per-step cost accounting.
+# Prompt-cache writes bill at 1.25× input, reads at 0.1×. Models missing
+# here get no cost.
+MODEL_PRICES_PER_MTOK = {
+    SONNET_4_5: (3.00, 15.00),
+    SONNET_4: (3.00, 15.00),
+    HAIKU_4_5: (1.00, 5.00),
+}
+
+
+def _route(step: str, model: str, max_tokens: int, thinking_budget: int, fallback_model: str | None) -> dict:
+    """One MODEL_CONFIG entry, overridable per step from the environment:
+    <STEP>_MODEL, <STEP>_MAX_TOKENS, <STEP>_THINKING_BUDGET (0 = no thinking)
+    and <STEP>_FALLBACK_MODEL ("" = no fallback), e.g. PLANNING_MODEL."""
+    prefix = step.upper()
+    return {
+        "model": os.getenv(f"{prefix}_MODEL", model),
+        "max_tokens": int(os.getenv(f"{prefix}_MAX_TOKENS", str(max_tokens))),
+        "thinking_budget": int(os.getenv(f"{prefix}_THINKING_BUDGET", str(thinking_budget))),
+        "fallback_model": os.getenv(f"{prefix}_FALLBACK_MODEL", fallback_model or "") or None,
+    }
+
+
+# Model routing per Claude step: model, token limits, thinking budget, and a
+# fallback model for when the primary is still overloaded (HTTP 529) after
+# its retries. Part of the run-cache key, so changing any of them invalidates
+# cached reports.
+MODEL_CONFIG = {
+    "planning": _route("planning", SONNET_4_5, 5000, 3000, fallback_model=HAIKU_4_5),
+    "analysis": _route("analysis", SONNET_4_5, 8000, 4000, fallback_model=SONNET_4),
+    # Sharded analysis (SHARDED_ANALYSIS=1): the gap matrix, then each other shard.
+    "analysis_matrix": _route("analysis_matrix", SONNET_4_5, 4000, 2000, fallback_model=SONNET_4),
+    "analysis_section": _route("analysis_section", SONNET_4_5, 4000, 1500, fallback_model=SONNET_4),
+}
+
+# Full-run result cache — quick-start scenarios are re-run constantly by demo
+# visitors. Keyed by normalized inputs + prompts.py hash + MODEL_CONFIG +
+# the settings that shape the report (_output_settings()).
+# Set RUN_CACHE_TTL_SEC=0 to disable.
+run_cache = SQLiteCache(
+    "runs",
+    ttl_sec=float(os.getenv("RUN_CACHE_TTL_SEC", str(24 * 3600))),
+    max_entries=int(os.getenv("RUN_CACHE_MAX_ENTRIES", "200")),
+)
+
+# Streamed planning: searches start as each query arrives in the plan stream
+# instead of after the whole plan is parsed. Set STREAMED_PLANNING=0 to disable.
+STREAMED_PLANNING = os.getenv("STREAMED_PLANNING", "1") == "1"
+
+# Speculative mode: run baseline_queries() while planning is still in flight,
+# hiding planning latency behind searches that are nearly always relevant.
+# Costs up to 3 extra Tavily calls per run. Set SPECULATIVE_SEARCH=1 to enable.
+SPECULATIVE_SEARCH = os.getenv("SPECULATIVE_SEARCH", "0") == "1"
+
+# Deadline budgeting (RUN_DEADLINE_SEC, see deadline.py). When a run is short
+# on time each step sizes itself from what's left: planning falls back to
+# baseline queries, late searches are skipped, and Claude calls get smaller
+# max_tokens / thinking budgets — or the report is cut off and marked partial.
+ANALYSIS_RESERVE_SEC = float(os.getenv("ANALYSIS_RESERVE_SEC", "45"))   # left for analysis when research stops waiting
+RESEARCH_RESERVE_SEC = float(os.getenv("RESEARCH_RESERVE_SEC", "10"))   # left for research when planning starts
+MIN_STEP_SEC = 5.0                       # least time worth starting a Claude call with
+# ~43 tok/s measured on the test log's 8000-token analyses (~185s each).
+CLAUDE_OUTPUT_TOKENS_PER_SEC = float(os.getenv("CLAUDE_OUTPUT_TOKENS_PER_SEC", "43"))
+MIN_THINKING_BUDGET = 1024               # Anthropic's minimum budget_tokens
+
+ANALYSIS_SKIPPED_NOTE = "[Analysis skipped: the run reached its time limit before the report was written. Please retry.]"
+PARTIAL_NOTICE = (
+    "\n\n---\n\n> ⚠️ **Partial report** — this run hit its time limit before the "
+    "analysis finished. Sections may be missing or incomplete; re-run for the full report.\n"
+)
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts.py"), "rb") as _f:
+    PROMPTS_HASH = hashlib.sha256(_f.read()).hexdigest()[:16]
+
+
+# Transient Claude API errors: retried, and counted as breaker failures.
+_TRANSIENT_API_ERRORS = (
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+    anthropic.OverloadedError,
+    anthropic.APIConnectionError,
+    anthropic.APITimeoutError,
+)
+
+
+def _record_api_error(error: BaseException) -> None:
+    """Tell anthropic_breaker how a failed call reflects on the provider.
+
+    Transient errors and any 5xx (500, 503, 529 overloaded) count as
+    failures; other status errors (4xx) mean the provider answered — it's
+    up, the request is wrong. Anything else (a cancelled call, a stream
+    callback or parse error, the run deadline) says nothing about the
+    provider, but still frees a half-open breaker's probe.
+    """
+    status = getattr(error, "status_code", None) or 0
+    if isinstance(error, _TRANSIENT_API_ERRORS) or (isinstance(error, anthropic.APIError) and status >= 500):
+        anthropic_breaker.record_failure()
+    elif isinstance(error, anthropic.APIStatusError):
+        anthropic_breaker.record_success()
+    else:
+        anthropic_breaker.release()
 
 
-def _retry_api_call(fn, max_retries=1, backoff_sec=2.0):
-    """Call fn(), retry once on transient API errors with exponential backoff.
+def _retry_api_call(fn, tokens=0):
+    """Call fn() under the shared retry_policy (jittered backoff, retry-after, run deadline).
 
-    Retries on: rate limits, overloaded, timeouts, connection errors.
+    Every attempt first passes anthropic_breaker (raises CircuitOpenError
+    while Claude is known to be down) and queues on anthropic_limiter for one
+    request and `tokens` estimated input tokens.
+    Retries on: rate limits, overloaded, timeouts, connection errors — these
+    also count as breaker failures.
     Does NOT retry on: auth errors, invalid requests, or non-API exceptions.
     Returns the result of fn() on success, or re-raises the last exception.
     """
-    last_exc = None
-    for attempt in range(1 + max_retries):
+    def attempt():
+        anthropic_breaker.check()
         try:
-            return fn()
-        except anthropic.RateLimitError as e:
-            last_exc = e
-        except anthropic.InternalServerError as e:
-            last_exc = e
-        except anthropic.APIConnectionError as e:
-            last_exc = e
-        except anthropic.APITimeoutError as e:
-            last_exc = e
-        except Exception:
+            anthropic_limiter.acquire(tokens)
+            result = fn()
+        except BaseException as e:
+            _record_api_error(e)
             raise
+        anthropic_breaker.record_success()
+        return result
 
-        wait = backoff_sec * (2 ** attempt)
-        print(f"⚠️ API call failed (attempt {attempt + 1}/{1 + max_retries}), retrying in {wait}s…")
-        time.sleep(wait)
+    return retry_policy.call(
+        attempt,
+        retryable=lambda e: isinstance(e, _TRANSIENT_API_ERRORS),
+        label="Claude API call",
+    )
 
-    raise last_exc
 
+def _is_overloaded(error: Exception) -> bool:
+    """Anthropic's "overloaded" response (HTTP 529) — capacity on that model, not a bad request."""
+    return isinstance(error, anthropic.APIStatusError) and getattr(error, "status_code", None) == 529
 
-# Function 1: plan_searches() - Ask Claude what to search
-@observe()
-def plan_searches(use_case: str, technology: str, industry: str) -> dict:
+
+def _fallback_request(step: str, request: dict, error: Exception) -> dict | None:
+    """The request re-routed to the step's fallback model, if error is an overload and there is one."""
+    fallback = MODEL_CONFIG[step].get("fallback_model")
+    if not _is_overloaded(error) or not fallback or fallback == request["model"]:
+        return None
+    print(f"🔀 {request['model']} overloaded — {step} falling back to {fallback}")
+    return {**request, "model": fallback}
+
+
+def _routed_call(step: str, request: dict, send) -> tuple:
+    """_retry_api_call(send(request)) on the step's model; if that model is
+    still overloaded (529) after retry_policy's attempts, once more on its
+    fallback model.
+
+    Returns (result, model used).
     """
-    Ask Claude to plan what searches to run, with extended thinking enabled.
+    try:
+        return _retry_api_call(lambda: send(request), tokens=_request_tokens(request)), request["model"]
+    except anthropic.APIStatusError as e:
+        fallback = _fallback_request(step, request, e)
+        if fallback is None:
+            raise
+        return _retry_api_call(lambda: send(fallback), tokens=_request_tokens(fallback)), fallback["model"]
+
+
+def _route_info(step: str, model: str | None) -> dict:
+    """model / fallback keys for a step result."""
+    info = {"model": model}
+    if model is not None and model != MODEL_CONFIG[step]["model"]:
+        info["fallback"] = True
+    return info
+
+
+def _request_tokens(request: dict) -> int:
+    """Estimated input tokens of a messages API request, for the rate limiter."""
+    return estimate_tokens(json.dumps([request["system"], request["messages"]]))
+
+
+def _system_blocks(instructions: str) -> list:
+    """SYSTEM_PROMPT plus a task's static instructions, marked for prompt caching.
+
+    The cache breakpoint sits on the last static block, so the whole prefix
+    before the per-run user message is reused across runs. Anthropic only
+    caches prefixes above a minimum length (1024 tokens for Sonnet): the
+    analysis prefix clears it, the shorter planning prefix currently doesn't.
+    """
+    return [
+        {"type": "text", "text": SYSTEM_PROMPT},
+        {"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}},
+    ]
+
+
+def _usage_tokens(response) -> dict:
+    """Token counts from a Claude response, including prompt-cache writes/reads."""
+    usage = response.usage
+    return {
+        "tokens_in": usage.input_tokens,
+        "tokens_out": usage.output_tokens,
+        "cache_creation_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+    }
+
+
+def _step_budget(step: str, deadline: Deadline | None, reserve_sec: float = 0.0,
+                 config: dict | None = None) -> dict | None:
+    """Token limits for a Claude step that fit in the run's remaining time.
+
+    Output time is estimated at CLAUDE_OUTPUT_TOKENS_PER_SEC. Thinking is cut
+    before the answer's share of max_tokens, and dropped entirely below
+    MIN_THINKING_BUDGET.
+
+    Args:
+        step: MODEL_CONFIG key ("planning" or "analysis")
+        deadline: The run's Deadline (None = no limit)
+        reserve_sec: Time to leave for the steps after this one
+        config: max_tokens / thinking_budget to start from (default MODEL_CONFIG[step])
 
     Returns:
-        dict with keys: queries (list[str]), thinking (str), tokens_in (int), tokens_out (int)
+        None when those limits fit, else dict with max_tokens,
+        thinking_budget (0 = thinking off) and available_sec
     """
-    print("\n📋 Planning research strategy...")
+    if deadline is None or not deadline.seconds:
+        return None
+    config = config or MODEL_CONFIG[step]
+    available = deadline.remaining() - reserve_sec
+    cap = int(max(0.0, available) * CLAUDE_OUTPUT_TOKENS_PER_SEC)
+    if cap >= config["max_tokens"]:
+        return None
+    answer_tokens = config["max_tokens"] - config["thinking_budget"]
+    thinking = min(config["thinking_budget"], cap - answer_tokens)
+    return {
+        "max_tokens": max(cap, 1),
+        "thinking_budget": thinking if thinking >= MIN_THINKING_BUDGET else 0,
+        "available_sec": round(available, 1),
+    }
+
+
+def _request_limits(step: str, budget: dict | None = None) -> dict:
+    """max_tokens / thinking request kwargs from MODEL_CONFIG, or a _step_budget() override."""
+    config = budget or MODEL_CONFIG[step]
+    limits = {"max_tokens": config["max_tokens"]}
+    if config["thinking_budget"]:
+        limits["thinking"] = {"type": "enabled", "budget_tokens": config["thinking_budget"]}
+    return limits
+
+
+def _thinking_budget(request: dict) -> int:
+    """budget_tokens a messages request was sent with (0 = thinking off)."""
+    return request.get("thinking", {}).get("budget_tokens", 0)
+
 
+def _budget_action(step: str, budget: dict) -> str:
+    thinking = f"thinking {budget['thinking_budget']}" if budget["thinking_budget"] else "no thinking"
+    return f"{step} limited to {budget['max_tokens']} tokens ({thinking}) with {budget['available_sec']}s left"
+
+
+# Function 1: plan_searches() - Ask Claude what to search
+def baseline_queries(technology: str, industry: str) -> list[str]:
+    """Queries worth running for any input — the plan fallback and speculative searches."""
+    return [
+        f"{industry} AI regulations compliance",
+        f"{technology} data retention policy",
+        f"{technology} GDPR compliance"
+    ]
+
+
+def _planning_request(use_case: str, technology: str, industry: str, budget: dict | None = None) -> dict:
     prompt = SEARCH_PLANNING_PROMPT.format(
         use_case=use_case,
         technology=technology,
         industry=industry
     )
+    return {
+        "model": MODEL_CONFIG["planning"]["model"],
+        **_request_limits("planning", budget),
+        "system": _system_blocks(SEARCH_PLANNING_INSTRUCTIONS),
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+    }
 
-    try:
-        response = _retry_api_call(lambda: client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=5000,
-            thinking={"type": "enabled", "budget_tokens": 3000},
-            system=SYSTEM_PROMPT,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        ))
-    except anthropic.APIError as e:
-        print(f"⚠️ Claude API error during search planning: {e}")
-        return {
-            "queries": [
-                f"{industry} AI regulations compliance",
-                f"{technology} data retention policy",
-                f"{technology} GDPR compliance"
-            ],
+
+def _stream_plan(request: dict, on_query, should_stop=lambda: False,
+                 text_parts: list[str] | None = None, thinking_parts: list[str] | None = None) -> tuple:
+    """Stream the planning call, passing each query to on_query as soon as it closes.
+
+    Stops reading early once should_stop() is true (the run is out of time).
+    The streamed text and thinking are appended to text_parts / thinking_parts,
+    if given, so a stopped plan can still account for its output.
+
+    Returns (final message, queries already passed to on_query, model used);
+    the message is None when the stream was stopped early.
+    """
+    parser = QueryStreamParser()
+    streamed = []
+    with contextlib.ExitStack() as stack:
+        stream, model = _routed_call("planning", request,
+                                     lambda req: stack.enter_context(client.messages.stream(**req)))
+        for event in stream:
+            delta = _stream_delta(event)
+            if delta is None:
+                continue
+            if delta["type"] == "thinking":
+                if thinking_parts is not None:
+                    thinking_parts.append(delta["delta"])
+                continue
+            if text_parts is not None:
+                text_parts.append(delta["delta"])
+            for query in parser.feed(delta["delta"]):
+                streamed.append(query)
+                on_query(query)
+            if should_stop():
+                return None, streamed, model
+        return stream.get_final_message(), streamed, model
+
+
+def _planning_preflight(fallback_queries: list[str], deadline: Deadline | None) -> tuple:
+    """Size planning to the run's remaining time.
+
+    Returns (budget, deadline_actions, result): result is the baseline-queries
+    plan when there's no time left to call Claude, else None.
+    """
+    budget = _step_budget("planning", deadline, reserve_sec=RESEARCH_RESERVE_SEC + ANALYSIS_RESERVE_SEC)
+    if budget is not None and budget["available_sec"] < MIN_STEP_SEC:
+        print("⏰ No time left to plan — using baseline queries")
+        return budget, [], {
+            "queries": fallback_queries,
             "thinking": None,
             "tokens_in": 0,
             "tokens_out": 0,
-            "error": f"plan_searches API error: {e}",
+            "deadline_actions": ["planning skipped — baseline queries used"],
+        }
+    deadline_actions = []
+    if budget is not None:
+        deadline_actions.append(_budget_action("planning", budget))
+        print(f"⏰ {deadline_actions[-1]}")
+    return budget, deadline_actions, None
+
+
+def _planning_stop(deadline: Deadline | None):
+    """should_stop for a streamed plan: true once only the later steps' reserve is left."""
+    if deadline is None:
+        return lambda: False
+    reserve_sec = RESEARCH_RESERVE_SEC + ANALYSIS_RESERVE_SEC
+    return lambda: deadline.remaining() <= reserve_sec
+
+
+def _planning_error(e: Exception, fallback_queries: list[str]) -> dict:
+    print(f"⚠️ Claude API error during search planning: {e}")
+    return {
+        "queries": fallback_queries,
+        "thinking": None,
+        "tokens_in": 0,
+        "tokens_out": 0,
+        "error": f"plan_searches API error: {e}",
+    }
+
+
+def _planning_result(response, streamed: list[str], fallback_queries: list[str],
+                     deadline_actions: list[str], request: dict | None = None,
+                     text_parts: list[str] = (), thinking_parts: list[str] = ()) -> dict:
+    """Parse the plan out of a Claude response (None = stream stopped at the deadline).
+
+    A stopped stream has no usage to report, so its tokens are estimated from
+    the request and what Claude streamed (text_parts / thinking_parts).
+    """
+    if response is None:
+        print(f"⏰ Planning stopped at the time limit — keeping {len(streamed)} streamed queries")
+        deadline_actions.append("planning stopped early — streamed queries kept")
+        thinking_text = "".join(thinking_parts)
+        return {
+            "queries": streamed or fallback_queries,
+            "thinking": thinking_text or None,
+            "tokens_in": _request_tokens(request) if request is not None else 0,
+            "tokens_out": estimate_tokens("".join(text_parts) + thinking_text),
+            "deadline_actions": deadline_actions,
         }
 
     thinking_text = ""
@@ -105,8 +442,7 @@ def plan_searches(use_case: str, technology: str, industry: str) -> dict:
         elif block.type == "text":
             response_text = block.text
 
-    tokens_in = response.usage.input_tokens
-    tokens_out = response.usage.output_tokens
+    tokens = _usage_tokens(response)
 
     try:
         start = response_text.find('[')
@@ -118,130 +454,704 @@ def plan_searches(use_case: str, technology: str, industry: str) -> dict:
         return {
             "queries": queries,
             "thinking": thinking_text,
-            "tokens_in": tokens_in,
-            "tokens_out": tokens_out,
+            **tokens,
+            "deadline_actions": deadline_actions,
         }
     except (json.JSONDecodeError, ValueError, IndexError):
-        print("⚠️ Couldn't parse search plan, using defaults")
+        if streamed:
+            # e.g. the reply was cut off after the array — the queries that
+            # already streamed through are usable and already being searched.
+            print(f"⚠️ Couldn't parse full search plan, keeping {len(streamed)} streamed queries")
+            queries = streamed
+        else:
+            print("⚠️ Couldn't parse search plan, using defaults")
+            queries = fallback_queries
         return {
-            "queries": [
-                f"{industry} AI regulations compliance",
-                f"{technology} data retention policy",
-                f"{technology} GDPR compliance"
-            ],
+            "queries": queries,
             "thinking": thinking_text,
-            "tokens_in": tokens_in,
-            "tokens_out": tokens_out,
+            **tokens,
+            "deadline_actions": deadline_actions,
         }
 
 
-# Function 2: conduct_research() - Execute searches
 @observe()
-def conduct_research(queries: list) -> str:
+def plan_searches(use_case: str, technology: str, industry: str, on_query=None,
+                  deadline: Deadline | None = None) -> dict:
     """
-    Execute searches and compile results.
-    
+    Ask Claude to plan what searches to run, with extended thinking enabled.
+
     Args:
-        queries: List of search query strings
-        
+        on_query: Optional callback(query: str). When given, the plan is streamed
+            and each query is passed on as soon as it's complete, so research can
+            start while Claude is still writing. The returned queries remain the
+            authoritative list — callers should search any they haven't seen yet.
+        deadline: The run's Deadline. Planning leaves RESEARCH_RESERVE_SEC +
+            ANALYSIS_RESERVE_SEC for the later steps: short on time it plans
+            with fewer tokens; out of time it skips Claude and uses
+            baseline_queries() (a streamed plan keeps the queries it has).
+
     Returns:
-        Formatted string of all research findings
+        dict with keys: queries (list[str]), thinking (str), tokens_in (int), tokens_out (int),
+        cache_creation_tokens (int), cache_read_tokens (int), deadline_actions (list[str]),
+        model (the model that answered — None if Claude wasn't called), fallback (True
+        when MODEL_CONFIG's fallback model stood in) and thinking_budget (as sent,
+        after any deadline cut; 0 = thinking off)
     """
-    print("\n🔬 Conducting research...")
-    
-    all_results = []
-    
+    print("\n📋 Planning research strategy...")
+
+    fallback_queries = baseline_queries(technology, industry)
+    budget, deadline_actions, skipped = _planning_preflight(fallback_queries, deadline)
+    if skipped is not None:
+        return skipped
+
+    request = _planning_request(use_case, technology, industry, budget)
+    streamed, text_parts, thinking_parts = [], [], []
+
+    try:
+        if on_query is None:
+            response, model = _routed_call("planning", request, lambda req: client.messages.create(**req))
+        else:
+            response, streamed, model = _stream_plan(request, on_query, _planning_stop(deadline),
+                                                     text_parts, thinking_parts)
+    except (anthropic.APIError, CircuitOpenError) as e:
+        return {**_planning_error(e, fallback_queries), **_route_info("planning", request["model"])}
+
+    return {**_planning_result(response, streamed, fallback_queries, deadline_actions,
+                               request, text_parts, thinking_parts),
+            **_route_info("planning", model), "thinking_budget": _thinking_budget(request)}
+
+
+# Function 2: conduct_research() - Execute searches
+def _research_timeout(deadline: Deadline | None) -> float | None:
+    """Seconds research may wait before analysis needs the rest (None = no deadline)."""
+    if deadline is None or not deadline.seconds:
+        return None
+    return max(0.0, deadline.remaining() - ANALYSIS_RESERVE_SEC)
+
+
+def _submit_queries(engine, queries: list, timeout: float | None) -> None:
+    """Submit queries the engine hasn't seen; with no time left, record them as skipped."""
+    submitted = set(engine.queries)
     for query in queries:
-        # Search using our tools.py function
-        search_response = search_web(query, max_results=3)
-        results = search_response.get('results', [])
-        
-        if results:
-            all_results.append(f"\n=== Search: {query} ===")
-            all_results.append(format_search_results(results))
-    
-    return "\n".join(all_results)
+        if query in submitted:
+            continue
+        if timeout == 0:
+            engine.skip(query)
+        else:
+            engine.submit(query)
+
+
+def _quorum_wait_sec(timeout: float | None) -> float:
+    return RESEARCH_DEADLINE_SEC if timeout is None else min(timeout, RESEARCH_DEADLINE_SEC)
+
+
+def _log_quorum(quorum_report: dict) -> None:
+    quorum_report["fired"] = bool(quorum_report["stragglers"])
+    if quorum_report["fired"]:
+        why = (f"{quorum_report['done']} of {quorum_report['n']} searches"
+               if quorum_report["done"] >= quorum_report["k"]
+               else f"the {RESEARCH_DEADLINE_SEC:.0f}s research deadline")
+        print(f"🏁 Quorum mode: moving on after {why} — "
+              f"{len(quorum_report['stragglers'])} stragglers left running:")
+        for query in quorum_report["stragglers"]:
+            print(f"   - {query}")
+
+
+def _compile_research(searches: list[dict], queries: list, quorum_report: dict | None) -> dict:
+    """Turn raw search records into the conduct_research() result."""
+    deadline_actions = []
+    skipped = [search["query"] for search in searches
+               if search.get("skipped") and not search.get("straggler")]
+    if skipped:
+        deadline_actions.append(f"skipped {len(skipped)} of {len(searches)} searches")
+        print(f"⏰ Out of research time — skipped {len(skipped)} searches:")
+        for query in skipped:
+            print(f"   - {query}")
+
+    speculative = None
+    if any(search["speculative"] for search in searches):
+        searches, speculative = merge_speculative(searches, queries)
+        if speculative["searches"]:
+            print(f"🎯 Speculative searches: {speculative['kept']}/{speculative['results']} "
+                  f"results survived dedup")
+
+    # The same regulation page often turns up under several queries.
+    searches, findings_dedup = dedupe_findings(searches)
+    if findings_dedup["results_merged"]:
+        print(f"🧹 Merged {findings_dedup['results_merged']} duplicate results "
+              f"(~{findings_dedup['tokens_saved']} tokens saved)")
+
+    stats = search_stats(searches)
+    if stats:
+        slowest = max(row["latency_sec"] for row in stats)
+        cache_hits = sum(1 for row in stats if row["cached"])
+        print(f"✅ Research complete — slowest search {slowest}s, {cache_hits}/{len(stats)} from cache")
+
+    findings, findings_budget = assemble_findings(searches)
+    if findings_budget["results_dropped"]:
+        print(f"✂️ Findings budget ({findings_budget['budget_tokens']} tokens): dropped "
+              f"{findings_budget['results_dropped']} lower-priority results")
+        for dropped in findings_budget["dropped"]:
+            print(f"   - {dropped['title'] or dropped['url']} ({dropped['query']})")
+
+    result = {
+        "findings": findings,
+        "searches": stats,
+        "findings_dedup": findings_dedup,
+        "findings_budget": findings_budget,
+        "evidence": searches,
+        "deadline_actions": deadline_actions,
+    }
+    if speculative is not None:
+        result["speculative"] = speculative
+    if quorum_report is not None:
+        result["quorum"] = quorum_report
+    return result
 
 
-# Function 3: analyze_compliance() - Ask Claude to analyze
 @observe()
-def analyze_compliance(use_case: str, technology: str, industry: str, research_findings: str) -> dict:
+def conduct_research(queries: list, max_workers: int | None = None,
+                     engine: ResearchEngine | None = None, context: str = "",
+                     deadline: Deadline | None = None, quorum: float | None = None) -> dict:
     """
-    Analyze compliance gaps based on research, with extended thinking enabled.
+    Execute searches concurrently and compile results in plan order.
+
+    Args:
+        queries: List of search query strings
+        max_workers: Max searches in flight (defaults to RESEARCH_CONCURRENCY)
+        engine: An open ResearchEngine that may already be running some of the
+            queries (streamed planning). Queries it hasn't seen are submitted;
+            results cover everything it ran. The caller closes it. Speculative
+            searches on it are merged via merge_speculative().
+        context: Use case text that search results are trimmed toward (ignored
+            when engine is given — it carries its own)
+        deadline: The run's Deadline. Research stops waiting once only
+            ANALYSIS_RESERVE_SEC is left: searches still running are skipped,
+            and with no time at all new queries aren't started.
+        quorum: Quorum mode — the fraction of searches to wait for (defaults to
+            RESEARCH_QUORUM; 0 = all). Research moves on once that many are
+            done or RESEARCH_DEADLINE_SEC has passed; the rest are left
+            running as stragglers (see StragglerLog).
 
     Returns:
-        dict with keys: analysis (str), thinking (str), tokens_in (int), tokens_out (int)
+        dict with keys: findings (str), searches (list[dict] with query, num_results, latency_sec, cached),
+        findings_dedup (dedupe_findings() stats), findings_budget
+        (assemble_findings() report), evidence (the deduplicated search records
+        with their results, for search_policy.record_citations()), deadline_actions (list[str]), speculative
+        (merge_speculative() stats) when speculative searches ran, and quorum
+        in quorum mode (k, n, fired, and the StragglerLog fields)
     """
-    print("\n🧠 Analyzing compliance gaps...")
+    if quorum is None:
+        quorum = RESEARCH_QUORUM
+    print(f"\n🔬 Conducting research ({len(queries)} searches)...")
+    if "tavily" in degraded_providers():
+        print("🔌 Tavily circuit is open — searches fail fast and fall back to cached results")
+
+    timeout = _research_timeout(deadline)
+    quorum_report = None
+
+    def run(engine):
+        nonlocal quorum_report
+        _submit_queries(engine, queries, timeout)
+        if not quorum:
+            return engine.results(timeout=timeout)
+
+        k = quorum_size(len(engine.queries), quorum)
+        done = engine.wait_for(k, timeout=_quorum_wait_sec(timeout))
+        quorum_report = {"k": k, "n": len(engine.queries), "done": done}
+        searches = engine.results(timeout=0, stragglers=StragglerLog(quorum_report))
+        _log_quorum(quorum_report)
+        return searches
+
+    if engine is not None:
+        searches = run(engine)
+    else:
+        with ResearchEngine(max_workers=max_workers, context=context) as engine:
+            searches = run(engine)
+
+    return _compile_research(searches, queries, quorum_report)
 
+
+# Function 3: analyze_compliance() - Ask Claude to analyze
+def _analysis_request(use_case: str, technology: str, industry: str, research_findings: str,
+                      budget: dict | None = None) -> dict:
+    """Build the messages API kwargs for the analysis call (shared by both variants)."""
     prompt = ANALYSIS_PROMPT.format(
         use_case=use_case,
         technology=technology,
         industry=industry,
         research_findings=research_findings
     )
+    return {
+        "model": MODEL_CONFIG["analysis"]["model"],
+        **_request_limits("analysis", budget),
+        "system": _system_blocks(ANALYSIS_INSTRUCTIONS),
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+    }
 
-    try:
-        response = _retry_api_call(lambda: client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=8000,
-            thinking={"type": "enabled", "budget_tokens": 4000},
-            system=SYSTEM_PROMPT,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        ))
-    except anthropic.APIError as e:
-        print(f"❌ Claude API error during analysis: {e}")
-        return {
-            "analysis": f"[Analysis failed: Claude API returned an error — {e}. Research data was collected successfully. Please retry.]",
-            "thinking": None,
-            "tokens_in": 0,
-            "tokens_out": 0,
-            "error": f"analyze_compliance API error: {e}",
-        }
 
+def _response_text(response) -> tuple[str, str]:
+    """(thinking, text) of a Claude response."""
     thinking_text = ""
-    analysis_text = ""
+    text = ""
     for block in response.content:
         if block.type == "thinking":
             thinking_text = block.thinking
         elif block.type == "text":
-            analysis_text = block.text
+            text = block.text
+    return thinking_text, text
 
-    return {
+
+def _analysis_result(response) -> dict:
+    """Pull analysis text, thinking and token counts out of a Claude response.
+
+    A reply cut off by max_tokens is marked partial.
+    """
+    thinking_text, analysis_text = _response_text(response)
+
+    result = {
         "analysis": analysis_text,
         "thinking": thinking_text,
-        "tokens_in": response.usage.input_tokens,
-        "tokens_out": response.usage.output_tokens,
+        **_usage_tokens(response),
     }
+    if getattr(response, "stop_reason", None) == "max_tokens":
+        result["analysis"] += PARTIAL_NOTICE
+        result["partial"] = True
+    return result
 
 
-# Function 4: save_report() - Persist results to a file
-def save_report(result: dict, version: str = "v0.5", output_dir: str | None = None, run_id: str | None = None) -> str:
+def _partial_analysis(analysis_text: str = "", thinking_text: str = "", request: dict | None = None) -> dict:
+    """Result for an analysis the run deadline stopped (or never let start).
+
+    Tokens are estimated from the request (if one was sent) and what Claude
+    actually streamed. With no
+    report text the report is a placeholder (marked skipped) that
+    _finish_pipeline() words from what the earlier steps got done.
     """
-    Save the analysis report to a timestamped file named after the use case.
+    result = {
+        "analysis": (analysis_text or ANALYSIS_SKIPPED_NOTE) + PARTIAL_NOTICE,
+        "thinking": thinking_text or None,
+        "tokens_in": _request_tokens(request) if request is not None else 0,
+        "tokens_out": estimate_tokens(analysis_text + thinking_text),
+        "partial": True,
+    }
+    if not analysis_text:
+        result["skipped"] = True
+    return result
+
+
+def _skipped_analysis_note(research_result: dict) -> str:
+    """Placeholder report for an analysis the deadline never let finish writing
+    anything, saying how far research got."""
+    if research_result["deadline_actions"]:
+        research = f"Research was cut short too ({'; '.join(research_result['deadline_actions'])})."
+    elif not _research_succeeded(research_result):
+        research = "Some searches failed, so the research data is incomplete."
+    else:
+        research = "Research data was collected successfully."
+    return f"[Analysis skipped: the run reached its time limit before the report was written. {research} Please retry.]"
+
+
+def _analysis_error(e: Exception) -> dict:
+    print(f"❌ Claude API error during analysis: {e}")
+    return {
+        "analysis": f"[Analysis failed: Claude API returned an error — {e}. Research data was collected successfully. Please retry.]",
+        "thinking": None,
+        "tokens_in": 0,
+        "tokens_out": 0,
+        "error": f"analyze_compliance API error: {e}",
+    }
+
+
+def _analysis_preflight(deadline: Deadline | None, step: str = "analysis", config: dict | None = None) -> tuple:
+    """Size an analysis call (MODEL_CONFIG step, or config's limits) to the run's remaining time.
+
+    Returns (budget, deadline_actions, result): budget is None when the
+    configured limits fit; result is a partial report when there's no time
+    left to call Claude, else None.
+    """
+    budget = _step_budget(step, deadline, config=config)
+    if budget is not None and budget["available_sec"] < MIN_STEP_SEC:
+        print("⏰ No time left to analyze — returning a partial report")
+        return budget, [], {**_partial_analysis(), "deadline_actions": [f"{step} skipped"]}
+    deadline_actions = []
+    if budget is not None:
+        deadline_actions.append(_budget_action(step, budget))
+        print(f"⏰ {deadline_actions[-1]}")
+    return budget, deadline_actions, None
+
+
+def _plan_analysis(research_findings: str, industry: str, deadline: Deadline | None,
+                   num_queries: int | None = None) -> tuple:
+    """Limits for the single-call analysis: budget_controller's pick when
+    ADAPTIVE_THINKING is on, then cut to the run deadline.
+
+    Returns (budget, deadline_actions, skipped result or None, info), where
+    info carries thinking_budget (as requested) and thinking_decision for the result.
+    """
+    config, decision = None, None
+    if budget_controller.ADAPTIVE_THINKING:
+        defaults = MODEL_CONFIG["analysis"]
+        decision = budget_controller.choose(
+            research_findings, industry,
+            answer_tokens=defaults["max_tokens"] - defaults["thinking_budget"],
+            default_budget=defaults["thinking_budget"],
+            tokens_per_sec=CLAUDE_OUTPUT_TOKENS_PER_SEC,
+            num_queries=num_queries,
+        )
+        config = {"max_tokens": decision["max_tokens"], "thinking_budget": decision["thinking_budget"]}
+        predicted = f"~{decision['predicted_sec']}s" if decision["predicted_sec"] is not None else "no estimate"
+        print(f"🎚️ Thinking budget {decision['thinking_budget']} for a {decision['target_sec']:.0f}s target "
+              f"({predicted}, load {decision['load']}, {decision['basis']})")
+    budget, deadline_actions, skipped = _analysis_preflight(deadline, config=config)
+    info = {
+        "thinking_budget": (budget or config or MODEL_CONFIG["analysis"])["thinking_budget"],
+        "thinking_decision": decision,
+    }
+    if skipped is not None:
+        skipped = {**skipped, **info}
+    return budget or config, deadline_actions, skipped, info
+
+
+def _stream_delta(event) -> dict | None:
+    """{"type": "thinking" | "text", "delta": str} for a streamed content delta, else None."""
+    if event.type != "content_block_delta":
+        return None
+    if event.delta.type == "thinking_delta":
+        return {"type": "thinking", "delta": event.delta.thinking}
+    if event.delta.type == "text_delta":
+        return {"type": "text", "delta": event.delta.text}
+    return None
+
+
+def _streamed_analysis_result(response, text_parts: list[str], thinking_parts: list[str],
+                              deadline_actions: list[str], t0: float, first_token_at: float | None,
+                              request: dict | None = None) -> dict:
+    """Result of a streamed analysis (response None = cut off at the deadline), with TTFT and tokens/s."""
+    done_at = time.time()
+    if response is None:
+        print("⏰ Run time limit reached — report cut off")
+        deadline_actions.append("analysis cut off at the time limit")
+        result = _partial_analysis("".join(text_parts), "".join(thinking_parts), request)
+    else:
+        result = _analysis_result(response)
+    result["deadline_actions"] = deadline_actions
+    if first_token_at is not None:
+        result["ttft_sec"] = round(first_token_at - t0, 2)
+        generation_sec = done_at - first_token_at
+        if generation_sec > 0:
+            result["output_tokens_per_sec"] = round(result["tokens_out"] / generation_sec, 1)
+    return result
+
+
+def _shard_step(shard: str) -> str:
+    """MODEL_CONFIG step for a shard."""
+    return "analysis_matrix" if shard == MATRIX_SHARD else "analysis_section"
+
+
+def _shard_request(use_case: str, technology: str, industry: str, research_findings: str,
+                   shard: str, gap_matrix: str, deadline: Deadline | None) -> tuple:
+    """Messages API kwargs for one sections.SECTION_SHARDS shard, sized to the deadline.
+
+    The system blocks are the same as the single-call analysis, so every
+    shard after the first reads ANALYSIS_INSTRUCTIONS from the prompt cache.
+
+    Returns (request, deadline_actions); request is None when there's no time
+    left to write the shard.
+    """
+    step = _shard_step(shard)
+    budget, deadline_actions, skipped = _analysis_preflight(deadline, step)
+    if skipped is not None:
+        return None, [f"{shard} section skipped"]
+    fields = {"use_case": use_case, "technology": technology, "industry": industry,
+              "research_findings": research_findings}
+    if shard == MATRIX_SHARD:
+        prompt = GAP_MATRIX_PROMPT.format(**fields)
+    else:
+        sections = ", ".join(f'"### {title}"' for title in SECTION_SHARDS[shard])
+        prompt = REPORT_SECTION_PROMPT.format(**fields, gap_matrix=gap_matrix, sections=sections)
+    return {
+        "model": MODEL_CONFIG[step]["model"],
+        **_request_limits(step, budget),
+        "system": _system_blocks(ANALYSIS_INSTRUCTIONS),
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+    }, deadline_actions
+
+
+def _shard_outcome(shard: str, deadline_actions: list[str], sec: float = 0.0, response=None,
+                   error: Exception | None = None, model: str | None = None) -> dict:
+    """One shard's reply (text), its rendered sections (markdown, for the live
+    report) and token counts. With neither response nor error the shard was
+    skipped for time."""
+    thinking_text, text = _response_text(response) if response is not None else ("", "")
+    markdown, missing = render_shard(shard, text)
+    outcome = {
+        "shard": shard,
+        "text": text,
+        "markdown": markdown,
+        "missing": missing,
+        "thinking": thinking_text,
+        "sec": round(sec, 1),
+        **_route_info(_shard_step(shard), model),
+        "tokens_in": 0,
+        "tokens_out": 0,
+        "cache_creation_tokens": 0,
+        "cache_read_tokens": 0,
+        "deadline_actions": deadline_actions,
+    }
+    if response is not None:
+        outcome.update(_usage_tokens(response))
+        if getattr(response, "stop_reason", None) == "max_tokens":
+            outcome["partial"] = True
+    elif error is not None:
+        print(f"❌ Claude API error writing the {shard} section: {error}")
+        outcome["error"] = str(error)
+    else:
+        outcome["partial"] = True
+    return outcome
+
+
+@observe()
+def analyze_section(use_case: str, technology: str, industry: str, research_findings: str,
+                    shard: str, gap_matrix: str = "", deadline: Deadline | None = None) -> dict:
+    """Write one shard of a sharded report (see sections.py); returns its _shard_outcome()."""
+    request, deadline_actions = _shard_request(use_case, technology, industry, research_findings,
+                                               shard, gap_matrix, deadline)
+    if request is None:
+        return _shard_outcome(shard, deadline_actions)
+    t0 = time.time()
+    try:
+        response, model = _routed_call(_shard_step(shard), request, lambda req: client.messages.create(**req))
+    except (anthropic.APIError, CircuitOpenError) as e:
+        return _shard_outcome(shard, deadline_actions, time.time() - t0, error=e, model=request["model"])
+    return _shard_outcome(shard, deadline_actions, time.time() - t0, response, model=model)
+
+
+def _gap_matrix(matrix: dict) -> str:
+    """The matrix shard's table, for the prompts of the shards after it."""
+    return matrix["markdown"].split("\n", 1)[-1].strip()
+
+
+def _matrix_failed(matrix: dict) -> dict | None:
+    """The analysis result when the gap matrix (which every other shard needs) wasn't written."""
+    if "error" in matrix:
+        return {**_analysis_error(matrix["error"]), "deadline_actions": matrix["deadline_actions"]}
+    if matrix["missing"]:
+        return {**_partial_analysis(), "deadline_actions": matrix["deadline_actions"]}
+    return None
+
+
+def _sharded_analysis_result(matrix: dict, shards: list[dict], sections_sec: float,
+                             first_token_at: float | None, t0: float) -> dict:
+    """Merge shard outcomes (matrix first, then SECTION_SHARDS order) into an analyze_compliance() result.
+
+    The report is sections.merge_sections() over the shards' replies. A shard that failed leaves a notice in its place and sets error (so the
+    run isn't cached); one cut short by time or max_tokens marks the report
+    partial. sharded reports each shard's model, time and tokens, the
+    shards' total cost_usd, and saved_sec — how much longer writing the
+    shards one after another would have taken.
+    """
+    outcomes = [matrix] + shards
+    analysis, _ = merge_sections({outcome["shard"]: outcome["text"] for outcome in outcomes})
+    partial = any(outcome.get("partial") for outcome in outcomes)
+    serial_sec = sum(outcome["sec"] for outcome in outcomes)
+    costs = [_step_cost(outcome["model"], _step_token_usage(outcome)) for outcome in outcomes]
+    result = {
+        "analysis": analysis + (PARTIAL_NOTICE if partial else ""),
+        "thinking": "\n\n".join(f"[{outcome['shard']}]\n{outcome['thinking']}"
+                                 for outcome in outcomes if outcome["thinking"]) or None,
+        **{key: sum(outcome[key] for outcome in outcomes)
+           for key in ("tokens_in", "tokens_out", "cache_creation_tokens", "cache_read_tokens")},
+        "deadline_actions": [action for outcome in outcomes for action in outcome["deadline_actions"]],
+        "sharded": {
+            "shards": [{key: outcome[key] for key in ("shard", "model", "sec", "tokens_out", "missing",
+                                                       "error", "partial", "fallback")
+                        if key in outcome} for outcome in outcomes],
+            "matrix_sec": matrix["sec"],
+            "sections_sec": round(sections_sec, 1),
+            "saved_sec": round(max(0.0, serial_sec - matrix["sec"] - sections_sec), 1),
+            "cost_usd": None if None in costs else round(sum(costs), 5),
+        },
+    }
+    models = list(dict.fromkeys(outcome["model"] for outcome in outcomes if outcome["model"]))
+    result["model"] = "+".join(models) or None
+    if any(outcome.get("fallback") for outcome in outcomes):
+        result["fallback"] = True
+    if partial:
+        result["partial"] = True
+    errors = [f"{outcome['shard']}: {outcome['error']}" for outcome in outcomes if "error" in outcome]
+    if errors:
+        result["error"] = f"analyze_compliance section error: {'; '.join(errors)}"
+    if first_token_at is not None:
+        result["ttft_sec"] = round(first_token_at - t0, 2)
+    print(f"🧩 Sharded analysis: matrix {matrix['sec']}s, then {len(shards)} more shards concurrently in "
+          f"{result['sharded']['sections_sec']}s (~{result['sharded']['saved_sec']}s saved)")
+    return result
+
+
+def _analyze_sharded(use_case: str, technology: str, industry: str, research_findings: str,
+                     on_delta=None, deadline: Deadline | None = None) -> dict:
+    """Sharded analyze_compliance(): the gap matrix, then the other shards concurrently.
+
+    With on_delta, each shard's sections are passed on as one text delta as
+    soon as it and every shard before it are done, so the live report reads
+    in order.
+    """
+    print("\n🧠 Analyzing compliance gaps (sharded)...")
+    t0 = time.time()
+    matrix = analyze_section(use_case, technology, industry, research_findings, MATRIX_SHARD,
+                             deadline=deadline)
+    failed = _matrix_failed(matrix)
+    if failed is not None:
+        return failed
+
+    first_token_at = None
+    if on_delta is not None:
+        first_token_at = time.time()
+        on_delta({"type": "text", "delta": matrix["markdown"]})
+
+    gap_matrix = _gap_matrix(matrix)
+    names = [name for name in SECTION_SHARDS if name != MATRIX_SHARD]
+    sections_start = time.time()
+    with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="analysis") as pool:
+        # Copied contexts: the shard spans nest under analyze_compliance and see the run deadline.
+        futures = [pool.submit(contextvars.copy_context().run, analyze_section, use_case, technology,
+                               industry, research_findings, name, gap_matrix, deadline)
+                   for name in names]
+        shards = []
+        for future in futures:
+            shards.append(future.result())
+            if on_delta is not None:
+                on_delta({"type": "text", "delta": "\n\n" + shards[-1]["markdown"]})
+    return _sharded_analysis_result(matrix, shards, time.time() - sections_start, first_token_at, t0)
+
+
+@observe()
+def analyze_compliance(use_case: str, technology: str, industry: str, research_findings: str,
+                       on_delta=None, deadline: Deadline | None = None, sharded: bool | None = None,
+                       num_queries: int | None = None) -> dict:
+    """
+    Analyze compliance gaps based on research, with extended thinking enabled.
 
     Args:
-        result: Dictionary returned by run_analysis()
-        version: Code version tag (e.g., "v0.1", "v0.2")
-        output_dir: Directory to save in (defaults to this script's directory)
-        run_id: Supabase analysis_runs UUID for cross-referencing
+        on_delta: Optional callback({"type": "thinking" | "text", "delta": str}).
+            When given, the report is streamed and each token chunk is passed
+            on as it arrives; the return value is the same either way.
+        deadline: The run's Deadline. Short on time, max_tokens and the
+            thinking budget shrink to fit; a streamed report still running at
+            the deadline is cut off there. Either way the report ends with
+            PARTIAL_NOTICE and partial=True.
+        sharded: Write the gap matrix first, then the other sections
+            concurrently (defaults to SHARDED_ANALYSIS; see sections.py).
+        num_queries: Search queries behind the findings, an input to the
+            adaptive thinking budget (see budget_controller.py).
 
     Returns:
-        Path to the saved report file
+        dict with keys: analysis (str), thinking (str), tokens_in (int), tokens_out (int),
+        cache_creation_tokens (int), cache_read_tokens (int), deadline_actions (list[str]),
+        model and fallback (as in plan_searches()), thinking_budget (as requested) and
+        thinking_decision (budget_controller.choose(), with ADAPTIVE_THINKING on),
+        and partial (True) for cut-off reports. Streamed calls also include ttft_sec and output_tokens_per_sec.
+        Sharded calls include sharded (per-shard sec/tokens, saved_sec) and ttft_sec instead.
     """
-    if output_dir is None:
-        output_dir = os.path.dirname(os.path.abspath(__file__))
+    if sharded is None:
+        sharded = SHARDED_ANALYSIS
+    if sharded:
+        return _analyze_sharded(use_case, technology, industry, research_findings,
+                                on_delta=on_delta, deadline=deadline)
+
+    if on_delta is not None:
+        result = None
+        for event in analyze_compliance_stream(use_case, technology, industry, research_findings,
+                                               deadline=deadline, num_queries=num_queries):
+            if event["type"] == "done":
+                result = event["result"]
+            else:
+                on_delta(event)
+        return result
 
-    reports_dir = os.path.join(output_dir, "reports")
-    os.makedirs(reports_dir, exist_ok=True)
+    print("\n🧠 Analyzing compliance gaps...")
 
-    slug = re.sub(r'[^a-z0-9]+', '-', result['use_case'].lower()).strip('-')[:30].rstrip('-')
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-    filename = f"report_{version}_{timestamp}_{slug}.md"
-    filepath = os.path.join(reports_dir, filename)
+    budget, deadline_actions, skipped, thinking_info = _plan_analysis(research_findings, industry, deadline,
+                                                                      num_queries)
+    if skipped is not None:
+        return skipped
+
+    request = _analysis_request(use_case, technology, industry, research_findings, budget)
+
+    try:
+        response, model = _routed_call("analysis", request, lambda req: client.messages.create(**req))
+    except (anthropic.APIError, CircuitOpenError) as e:
+        return {**_analysis_error(e), **_route_info("analysis", request["model"]), **thinking_info}
+
+    return {**_analysis_result(response), "deadline_actions": deadline_actions,
+            **_route_info("analysis", model), **thinking_info}
+
+
+def analyze_compliance_stream(use_case: str, technology: str, industry: str, research_findings: str,
+                              deadline: Deadline | None = None, num_queries: int | None = None):
+    """
+    Streaming variant of analyze_compliance() built on client.messages.stream().
+
+    Not @observe()-decorated: Langfuse's generator wrapper would log every
+    delta as span output. Call it through analyze_compliance(on_delta=...)
+    to get the usual span.
+
+    Yields:
+        {"type": "thinking" | "text", "delta": str} as tokens arrive, then a final
+        {"type": "done", "result": dict} carrying the analyze_compliance() dict plus
+        ttft_sec (time to the first streamed token, thinking included) and
+        output_tokens_per_sec (output tokens over first-token-to-completion time)
+    """
+    print("\n🧠 Analyzing compliance gaps (streaming)...")
+
+    budget, deadline_actions, skipped, thinking_info = _plan_analysis(research_findings, industry, deadline,
+                                                                      num_queries)
+    if skipped is not None:
+        yield {"type": "done", "result": skipped}
+        return
+
+    request = _analysis_request(use_case, technology, industry, research_findings, budget)
+    t0 = time.time()
+    first_token_at = None
+    text_parts, thinking_parts = [], []
+    response = None
+    model = request["model"]
 
+    try:
+        with contextlib.ExitStack() as stack:
+            # Only opening the stream is retried (or re-routed) — once tokens
+            # have reached the user, replaying the call would duplicate the report.
+            stream, model = _routed_call("analysis", request,
+                                         lambda req: stack.enter_context(client.messages.stream(**req)))
+            for event in stream:
+                delta = _stream_delta(event)
+                if delta is None:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.time()
+                (text_parts if delta["type"] == "text" else thinking_parts).append(delta["delta"])
+                yield delta
+                if deadline is not None and deadline.expired():
+                    break
+            else:
+                response = stream.get_final_message()
+    except (anthropic.APIError, CircuitOpenError) as e:
+        yield {"type": "done", "result": {**_analysis_error(e), **_route_info("analysis", model), **thinking_info}}
+        return
+
+    yield {"type": "done", "result": {**_streamed_analysis_result(
+        response, text_parts, thinking_parts, deadline_actions, t0, first_token_at, request),
+        **_route_info("analysis", model), **thinking_info}}
+
+
+# Function 4: save_report() - Persist results to a file
+def render_report(result: dict, version: str = "v0.5", run_id: str | None = None) -> str:
+    """Render the full markdown report (header, queries, analysis) for a result dict."""
     timing = result.get('timing', {})
     timing_line = ""
     if timing:
@@ -251,8 +1161,24 @@ def save_report(result: dict, version: str = "v0.5", output_dir: str | None = No
             f"research: {timing['research_sec']}s, "
             f"analysis: {timing['analysis_sec']}s)  \n"
         )
+        if timing.get('overlap_saved_sec'):
+            timing_line += f"**Planning/Research Overlap:** saved ~{timing['overlap_saved_sec']}s  \n"
 
     run_id_line = f"**Run ID:** `{run_id}`  \n" if run_id else ""
+    cache_line = (
+        f"**Source:** Cached analysis from {result['cached_at']}  \n"
+        if result.get('cache_hit') else ""
+    )
+    models_line = ""
+    if result.get('model_usage'):
+        steps = ", ".join(f"{step}: {usage['model']}" + (" (fallback)" if usage['fallback'] else "")
+                          for step, usage in result['model_usage'].items() if usage['model'])
+        cost = f" — est. ${result['cost_usd']:.3f}" if result.get('cost_usd') is not None else ""
+        models_line = f"**Models:** {steps}{cost}  \n" if steps else ""
+    deadline_line = ""
+    if result.get('deadline_actions'):
+        status = "⚠️ Partial report — " if result.get('partial') else ""
+        deadline_line = f"**Time Limit:** {status}{'; '.join(result['deadline_actions'])}  \n"
 
     header = (
         f"# Compliance Gap Analysis Report\n\n"
@@ -262,28 +1188,529 @@ def save_report(result: dict, version: str = "v0.5", output_dir: str | None = No
         f"**Technology:** {result['technology']}  \n"
         f"**Industry:** {result['industry']}  \n"
         f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n"
-        f"{timing_line}\n"
+        f"{cache_line}"
+        f"{timing_line}"
+        f"{models_line}"
+        f"{deadline_line}\n"
         f"---\n\n"
         f"## Search Queries Used\n\n"
     )
     queries_section = "\n".join(f"- {q}" for q in result['search_queries']) + "\n\n"
     body = f"---\n\n## Analysis\n\n{result['analysis']}\n"
+    return header + queries_section + body
+
+
+def save_report(result: dict, version: str = "v0.5", output_dir: str | None = None, run_id: str | None = None) -> str:
+    """
+    Save the analysis report to a timestamped file named after the use case.
+
+    Args:
+        result: Dictionary returned by run_analysis()
+        version: Code version tag (e.g., "v0.1", "v0.2")
+        output_dir: Directory to save in (defaults to this script's directory)
+        run_id: Supabase analysis_runs UUID for cross-referencing
+
+    Returns:
+        Path to the saved report file
+    """
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(__file__))
+
+    reports_dir = os.path.join(output_dir, "reports")
+    os.makedirs(reports_dir, exist_ok=True)
+
+    slug = re.sub(r'[^a-z0-9]+', '-', result['use_case'].lower()).strip('-')[:30].rstrip('-')
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    filename = f"report_{version}_{timestamp}_{slug}.md"
+    filepath = os.path.join(reports_dir, filename)
 
     with open(filepath, "w", encoding="utf-8") as f:
-        f.write(header + queries_section + body)
+        f.write(render_report(result, version=version, run_id=run_id))
 
     print(f"\n💾 Report saved to: {filepath}")
     return filepath
 
 
-# Function 5: run_analysis() - Orchestrate everything
+def _output_settings(sharded: bool | None = None, speculative: bool | None = None) -> dict:
+    """Settings that change what a run produces, so runs under different ones aren't interchangeable."""
+    return {
+        "findings_token_budget": FINDINGS_TOKEN_BUDGET,
+        "passage_char_budget": PASSAGE_CHAR_BUDGET,
+        "query_dedup_threshold": QUERY_DEDUP_THRESHOLD,
+        "search_policy": search_policy.SEARCH_POLICY,
+        "speculative": SPECULATIVE_SEARCH if speculative is None else speculative,
+        "sharded": SHARDED_ANALYSIS if sharded is None else sharded,
+        "adaptive_thinking_target_sec": (budget_controller.TARGET_ANALYSIS_SEC
+                                         if budget_controller.ADAPTIVE_THINKING else None),
+    }
+
+
+def _run_cache_key(use_case: str, technology: str, industry: str,
+                   sharded: bool | None = None, speculative: bool | None = None) -> str:
+    return make_key(
+        normalize_text(use_case), normalize_text(technology), normalize_text(industry),
+        PROMPTS_HASH, MODEL_CONFIG, _output_settings(sharded, speculative),
+    )
+
+
+def _research_succeeded(research_result: dict) -> bool:
+    """Every search answered (none failed, skipped or left behind) and the findings hold results."""
+    searches = research_result["searches"]
+    return (not any("error" in search for search in searches)
+            and any(search["num_results"] for search in searches))
+
+
+def _step_token_usage(step_result: dict) -> dict:
+    """token_usage entry for one Claude step. cache_* are prompt-cache writes/reads,
+    billed separately from (and not included in) input."""
+    return {
+        'input': step_result.get("tokens_in", 0),
+        'output': step_result.get("tokens_out", 0),
+        'cache_creation_input': step_result.get("cache_creation_tokens", 0),
+        'cache_read_input': step_result.get("cache_read_tokens", 0),
+    }
+
+
+def _step_cost(model: str | None, usage: dict) -> float | None:
+    """Estimated USD cost of one step's tokens (a _step_token_usage() dict) at MODEL_PRICES_PER_MTOK."""
+    if not any(usage.values()):
+        return 0.0
+    prices = MODEL_PRICES_PER_MTOK.get(model)
+    if prices is None:
+        return None
+    input_price, output_price = prices
+    cost = (usage['input'] * input_price
+            + usage['cache_creation_input'] * input_price * 1.25
+            + usage['cache_read_input'] * input_price * 0.1
+            + usage['output'] * output_price) / 1_000_000
+    return round(cost, 5)
+
+
+def _step_model_usage(step_result: dict, sec: float) -> dict:
+    """model_usage entry for one Claude step: model, fallback, thinking budget, latency, tokens and cost."""
+    usage = _step_token_usage(step_result)
+    return {
+        'model': step_result.get("model"),
+        'fallback': step_result.get("fallback", False),
+        'thinking_budget': step_result.get("thinking_budget"),
+        'sec': round(sec, 1),
+        **usage,
+        'cost_usd': _step_cost(step_result.get("model"), usage),
+    }
+
+
+def _total_cost(model_usage: dict) -> float | None:
+    costs = [usage['cost_usd'] for usage in model_usage.values()]
+    return None if any(cost is None for cost in costs) else round(sum(costs), 5)
+
+
+def _cached_run(cache_key: str) -> dict | None:
+    """The run_cache entry for cache_key as a cache-hit result, or None."""
+    cached = run_cache.get(cache_key)
+    if cached is None:
+        return None
+    print(f"\n⚡ Run cache hit — reusing analysis from {cached['cached_at']}")
+    return {**cached, 'cache_hit': True}
+
+
+def _breaker_watch(notify):
+    """A check() that emits breaker_open for providers newly found degraded."""
+    reported_degraded = set()
+
+    def check_breakers():
+        degraded = [p for p in degraded_providers() if p not in reported_degraded]
+        if degraded:
+            reported_degraded.update(degraded)
+            notify("breaker_open", {"providers": degraded})
+
+    return check_breakers
+
+
+def _overlap_saved(research_result: dict, time_research: float) -> float:
+    """Research time hidden behind planning: how long the searches would have
+    taken on their own, minus what research actually waited after planning."""
+    live_latencies = [s["latency_sec"] for s in research_result["searches"]]
+    return max(0.0, research_makespan(live_latencies) - time_research)
+
+
+def _clean_step(step_result: dict) -> bool:
+    """A step worth checkpointing: no API error and nothing given up to the deadline."""
+    return "error" not in step_result and not step_result.get("deadline_actions")
+
+
+def _resumed_steps(resume_from: str | None, run_id: str | None, cache_key: str) -> dict:
+    """Checkpointed steps of the run being retried (see checkpoint.py), re-saved
+    under run_id so this run can be resumed in turn."""
+    if not resume_from:
+        return {}
+    steps = load_steps(resume_from, cache_key)
+    if not steps:
+        print(f"\n♻️ No checkpoint to resume for run {resume_from} — starting from scratch")
+        return {}
+    for step, data in steps.items():
+        save_step(run_id, cache_key, step, data)
+    print(f"\n♻️ Resuming run {resume_from} — reusing its {' and '.join(steps)}")
+    return steps
+
+
+def _checkpoint_planning(run_id: str | None, cache_key: str, plan_result: dict,
+                         search_queries: list, deduper: QueryDeduper, sec: float) -> None:
+    if _clean_step(plan_result):
+        save_step(run_id, cache_key, "planning", {
+            "result": plan_result, "queries": search_queries, "merges": deduper.merges, "sec": sec,
+        })
+
+
+def _checkpoint_research(run_id: str | None, cache_key: str, research_result: dict,
+                         search_queries: list, sec: float) -> None:
+    """Checkpoint research only if something came back — findings from searches
+    that all failed are worth re-searching, not re-analyzing."""
+    answered = [search for search in research_result["searches"]
+                if "error" not in search and search["num_results"]]
+    if _clean_step(research_result) and answered and research_result["findings"].strip():
+        save_step(run_id, cache_key, "research", {
+            "result": research_result, "queries": search_queries, "sec": sec,
+        })
+
+
+def _resume_planning(saved: dict, deduper: QueryDeduper) -> tuple:
+    """(plan_result, search_queries) from a planning checkpoint. Its tokens were
+    spent by the original run, so this run's usage counts none."""
+    deduper.merges = saved["merges"]
+    plan_result = {**saved["result"], "tokens_in": 0, "tokens_out": 0,
+                   "cache_creation_tokens": 0, "cache_read_tokens": 0}
+    return plan_result, saved["queries"]
+
+
+def _resume_summary(resume_from: str | None, resumed: dict) -> dict | None:
+    """result.resumed: the run resumed from, the steps it skipped, and their time and Claude spend."""
+    if not resumed:
+        return None
+    planning = resumed["planning"]["result"]
+    return {
+        'from_run_id': resume_from,
+        'steps': list(resumed),
+        'saved_sec': round(sum(saved["sec"] for saved in resumed.values()), 1),
+        'saved_cost_usd': _step_cost(planning.get("model"), _step_token_usage(planning)),
+    }
+
+
+def _finish_pipeline(use_case: str, technology: str, industry: str, plan_result: dict,
+                     research_result: dict, analysis_result: dict, search_queries: list,
+                     deduper: QueryDeduper, step_sec: dict, total_start: float,
+                     rate_limit_waits: dict, run_deadline: Deadline, cache_key: str,
+                     use_cache: bool, run_id: str | None = None, resumed: dict | None = None) -> dict:
+    """Record citations, assemble the run_pipeline() result and cache it if the run was clean.
+
+    step_sec holds planning, research, overlap_saved and analysis seconds;
+    a skipped analysis gets a placeholder saying how far research got;
+    resumed is the _resume_summary() of a resumed run. A clean run's
+    checkpoint (and that of the run it resumed) is dropped, any other run's
+    is kept for a retry.
+    """
+    analysis = analysis_result["analysis"]
+    if analysis_result.get("skipped"):
+        analysis = _skipped_analysis_note(research_result) + PARTIAL_NOTICE
+
+    # Which search results the report drew on — feeds search_policy's history.
+    citations = None
+    if "error" not in analysis_result and not analysis_result.get("partial"):
+        citations = search_policy.record_citations(research_result["evidence"], analysis)
+        print(f"📎 Report drew on {citations['cited']}/{citations['results']} search results")
+
+    time_total = time.time() - total_start
+
+    timing = {
+        'planning_sec': round(step_sec['planning'], 1),
+        'research_sec': round(step_sec['research'], 1),
+        'overlap_saved_sec': round(step_sec['overlap_saved'], 1),
+        # Time queued behind the process-wide rate limiter, summed over calls
+        # (parallel searches can overlap, so this may exceed wall time).
+        'rate_limit_wait_sec': round(sum(rate_limit_waits.values()), 1),
+        'analysis_sec': round(step_sec['analysis'], 1),
+        'analysis_ttft_sec': analysis_result.get("ttft_sec"),
+        'analysis_tokens_per_sec': analysis_result.get("output_tokens_per_sec"),
+        'total_sec': round(time_total, 1),
+        'deadline_sec': run_deadline.seconds or None,
+        # Research time quorum mode didn't wait for — by now (after analysis)
+        # stragglers have usually finished, so this is measured, not guessed.
+        'quorum_saved_sec': (research_result["quorum"]["saved_sec"]
+                             if "quorum" in research_result else None),
+    }
+
+    deadline_actions = (plan_result.get("deadline_actions", []) + research_result["deadline_actions"]
+                        + analysis_result.get("deadline_actions", []))
+
+    model_usage = {
+        'planning': _step_model_usage(plan_result, step_sec['planning']),
+        'analysis': _step_model_usage(analysis_result, step_sec['analysis']),
+    }
+    if analysis_result.get("sharded"):
+        # Sharded analysis mixes analysis_matrix / analysis_section routes;
+        # price each shard on its own model.
+        model_usage['analysis']['cost_usd'] = analysis_result["sharded"]["cost_usd"]
+
+    result = {
+        'use_case': use_case,
+        'technology': technology,
+        'industry': industry,
+        'search_queries': search_queries,
+        'analysis': analysis,
+        'timing': timing,
+        'searches': research_result["searches"],
+        'speculative': research_result.get("speculative"),
+        'query_merges': deduper.merges,
+        'findings_budget': research_result["findings_budget"],
+        'quorum': research_result.get("quorum"),
+        'sharded_analysis': analysis_result.get("sharded"),
+        # Complexity inputs logged with every run — budget_controller's history.
+        'analysis_inputs': budget_controller.input_features(research_result["findings"], industry,
+                                                            len(search_queries)),
+        'thinking_decision': analysis_result.get("thinking_decision"),
+        'citations': citations,
+        'planning_thinking': plan_result.get("thinking"),
+        'analysis_thinking': analysis_result.get("thinking"),
+        'token_usage': {
+            'planning': _step_token_usage(plan_result),
+            'analysis': _step_token_usage(analysis_result),
+            # Estimated analysis input tokens avoided by merging duplicate results
+            'findings_dedup': research_result["findings_dedup"],
+        },
+        'model_usage': model_usage,
+        'cost_usd': _total_cost(model_usage),
+        'deadline_actions': deadline_actions,
+        'partial': analysis_result.get("partial", False),
+        'resumed': resumed,
+        'resumable': False,
+        'cache_hit': False,
+    }
+
+    # Only fully successful runs are cached — a fallback plan, failed
+    # searches, a failed analysis or a run the deadline cut short should be
+    # retried, not replayed.
+    clean = ("error" not in plan_result and _research_succeeded(research_result)
+             and "error" not in analysis_result and not deadline_actions)
+    if clean:
+        clear_checkpoint(run_id)
+        if resumed:
+            clear_checkpoint(resumed['from_run_id'])
+        if use_cache:
+            run_cache.set(cache_key, {**result, 'cached_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+    else:
+        result['resumable'] = bool(load_steps(run_id, cache_key))
+
+    return result
+
+
+def _pipeline(use_case: str, technology: str, industry: str, on_progress, use_cache: bool,
+              streamed_planning: bool | None, speculative: bool | None, deadline_sec: float | None,
+              quorum: float | None, sharded: bool | None, run_id: str | None, resume_from: str | None):
+    """The run_pipeline() orchestration, written once for the sync and async pipelines.
+
+    A generator: it yields each call the two pipelines make differently and
+    is sent back its result —
+
+        ("io", fn, *args)         blocking cache / checkpoint / log I/O
+        ("engine",)               open a research engine for streamed or speculative searches
+        ("close_engine",)         close it once research is done
+        (step, kwargs)            a pipeline step: "plan", "research" or "analyze"
+
+    run_pipeline() makes these calls directly; agent_async.run_pipeline_async()
+    awaits the async steps and runs the I/O in a worker thread. The generator's
+    return value is the run_pipeline() result. Arguments as run_pipeline().
+    """
+    notify = on_progress or (lambda event, data: None)
+    cache_key = _run_cache_key(use_case, technology, industry, sharded=sharded, speculative=speculative)
+    if use_cache:
+        cached = yield ("io", _cached_run, cache_key)
+        if cached is not None:
+            notify("cache_hit", {"cached_at": cached["cached_at"]})
+            return cached
+
+    if streamed_planning is None:
+        streamed_planning = STREAMED_PLANNING
+    if speculative is None:
+        speculative = SPECULATIVE_SEARCH
+
+    total_start = time.time()
+    rate_limit_waits = start_rate_limit_run()
+    run_deadline = start_run_deadline(deadline_sec)
+
+    check_breakers = _breaker_watch(notify)
+    check_breakers()
+
+    resumed = {}
+    if resume_from:
+        resumed = yield ("io", _resumed_steps, resume_from, run_id, cache_key)
+        if resumed:
+            notify("resumed", {"from_run_id": resume_from, "steps": list(resumed)})
+
+    # Near-duplicate planned queries are searched once (see QueryDeduper).
+    deduper = QueryDeduper()
+
+    engine = None
+    if (streamed_planning or speculative) and not resumed:
+        engine = yield ("engine",)
+        if speculative:
+            for query in baseline_queries(technology, industry):
+                if deduper.add(query) is None:
+                    engine.submit(query, speculative=True)
+
+    def on_query(query):
+        if deduper.add(query) is None:
+            engine.submit(query)
+            notify("query_planned", {"query": query})
+
+    # Step 1: Plan searches (returns dict with queries, thinking, tokens)
+    if "planning" in resumed:
+        plan_result, search_queries = _resume_planning(resumed["planning"], deduper)
+        time_planning = 0.0
+    else:
+        notify("planning_started", {})
+        t0 = time.time()
+        plan_result = yield ("plan", {
+            "use_case": use_case, "technology": technology, "industry": industry,
+            "on_query": on_query if streamed_planning else None, "deadline": run_deadline,
+        })
+        search_queries = deduper.dedupe(plan_result["queries"])
+        time_planning = time.time() - t0
+        notify("planning_done", {"queries": search_queries, "sec": round(time_planning, 1)})
+        yield ("io", _checkpoint_planning, run_id, cache_key, plan_result, search_queries, deduper, time_planning)
+
+    # Step 2: Conduct research (with streamed planning, finish what's in flight)
+    if "research" in resumed:
+        research_result, search_queries = resumed["research"]["result"], resumed["research"]["queries"]
+        time_research = 0.0
+    else:
+        notify("research_started", {"queries": search_queries})
+        t0 = time.time()
+        research_result = yield ("research", {
+            "queries": search_queries, "engine": engine, "context": use_case,
+            "deadline": run_deadline, "quorum": quorum,
+        })
+        time_research = time.time() - t0
+        notify("research_done", {"searches": research_result["searches"], "sec": round(time_research, 1)})
+        check_breakers()
+    if engine is not None:
+        yield ("close_engine",)
+
+    if "research" not in resumed:
+        # A streamed query the final plan dropped was still searched; list it.
+        search_queries = [s["query"] for s in research_result["searches"]] or search_queries
+        yield ("io", _checkpoint_research, run_id, cache_key, research_result, search_queries, time_research)
+    overlap_saved = _overlap_saved(research_result, time_research) if engine is not None else 0.0
+
+    # Step 3: Analyze compliance (returns dict with analysis, thinking, tokens)
+    notify("analysis_started", {})
+    t0 = time.time()
+    analysis_result = yield ("analyze", {
+        "use_case": use_case, "technology": technology, "industry": industry,
+        "research_findings": research_result["findings"],
+        "on_delta": lambda delta: notify("analysis_delta", delta),
+        "deadline": run_deadline, "sharded": sharded, "num_queries": len(search_queries),
+    })
+    time_analysis = time.time() - t0
+    notify("analysis_done", {"sec": round(time_analysis, 1)})
+
+    return (yield (
+        "io", _finish_pipeline,
+        use_case, technology, industry, plan_result, research_result, analysis_result,
+        search_queries, deduper,
+        {"planning": time_planning, "research": time_research,
+         "overlap_saved": overlap_saved, "analysis": time_analysis},
+        total_start, rate_limit_waits, run_deadline, cache_key, use_cache,
+        run_id, _resume_summary(resume_from, resumed),
+    ))
+
+
+# Function 5: run_pipeline() - Plan → research → analyze, no persistence
+def run_pipeline(use_case: str, technology: str, industry: str, on_progress=None,
+                 use_cache: bool = True, streamed_planning: bool | None = None,
+                 speculative: bool | None = None, deadline_sec: float | None = None,
+                 quorum: float | None = None, sharded: bool | None = None,
+                 run_id: str | None = None, resume_from: str | None = None) -> dict:
+    """
+    Run the three pipeline steps and assemble the result dict.
+
+    Shared by run_analysis() (CLI) and the Streamlit UI, which passes
+    on_progress to render step status. Not @observe()-decorated itself:
+    the steps nest directly under the caller's trace.
+
+    Args:
+        on_progress: Optional callback(event: str, data: dict). Events, in order:
+            breaker_open (data = {"providers": [str]}, whenever a provider's
+            circuit breaker is found open — at the start or after research),
+            planning_started, query_planned (streamed planning only, once per
+            query as it starts searching, data = {"query": str}), planning_done,
+            research_started, research_done, analysis_started, analysis_delta (once per streamed token chunk,
+            data = {"type": "thinking" | "text", "delta": str}), analysis_done.
+            A run-cache hit emits only cache_hit (data = {"cached_at": str}).
+            A resumed run emits resumed (data = {"from_run_id": str, "steps": [str]})
+            in place of the events of the steps it skips.
+        use_cache: Look up / store the result in run_cache.
+        streamed_planning: Start each search as soon as its query streams out of
+            the plan (defaults to STREAMED_PLANNING). research_sec then only
+            counts the wait after planning, and timing.overlap_saved_sec
+            estimates the research time hidden behind planning (speculative
+            searches count too).
+        speculative: Run baseline_queries() alongside planning (defaults to
+            SPECULATIVE_SEARCH); result.speculative reports how many of their
+            results survived deduplication against the planned searches.
+        deadline_sec: End-to-end time limit for the run (defaults to
+            RUN_DEADLINE_SEC; 0 = none). Each step budgets against what's left
+            — see plan_searches(), conduct_research() and analyze_compliance().
+        quorum: Quorum mode for research (defaults to RESEARCH_QUORUM; see
+            conduct_research()). result.quorum reports whether it fired and
+            timing.quorum_saved_sec what it saved.
+        sharded: Sharded analysis (defaults to SHARDED_ANALYSIS; see
+            analyze_compliance()). result.sharded_analysis reports each
+            shard's time and tokens and what writing them concurrently saved.
+        run_id: Checkpoint each clean step under this id (see checkpoint.py).
+        resume_from: run_id of a failed run to resume: steps checkpointed
+            for the same inputs are reused instead of re-run. Their time and
+            tokens aren't counted again — result.resumed reports what was saved.
+
+    Returns dict with: use_case, technology, industry, search_queries, analysis,
+    timing, searches (per-query latency), speculative, query_merges (near-duplicate
+    queries folded into another), findings_budget (what the findings token budget
+    dropped), planning_thinking, analysis_thinking,
+    token_usage, model_usage (per Claude step: model, fallback, thinking_budget, sec, tokens, cost_usd),
+    analysis_inputs (findings_tokens, jurisdictions, num_queries), thinking_decision
+    (the adaptive thinking budget pick, see budget_controller.py),
+    cost_usd (estimated Claude spend), quorum, sharded_analysis, citations (search results the report drew on, see
+    search_policy.record_citations()), deadline_actions (what each step gave up to meet the time limit),
+    partial (the report was cut off), resumed (from_run_id, steps, saved_sec, saved_cost_usd — None
+    unless resumed), resumable (run_id has a checkpoint a retry can resume from), cache_hit.
+    Cache hits return the stored run (original timing included) plus cached_at.
+    """
+    pipeline = _pipeline(use_case, technology, industry, on_progress, use_cache, streamed_planning,
+                         speculative, deadline_sec, quorum, sharded, run_id, resume_from)
+    steps = {"plan": plan_searches, "research": conduct_research, "analyze": analyze_compliance}
+    with contextlib.ExitStack() as stack:
+        value = None
+        while True:
+            try:
+                call = pipeline.send(value)
+            except StopIteration as done:
+                return done.value
+            if call[0] == "io":
+                value = call[1](*call[2:])
+            elif call[0] == "engine":
+                value = stack.enter_context(ResearchEngine(context=use_case))
+            elif call[0] == "close_engine":
+                value = stack.close()
+            else:
+                value = steps[call[0]](**call[1])
+
+
+# Function 6: run_analysis() - Orchestrate everything
 @observe()
 def run_analysis(use_case: str, technology: str, industry: str, version: str = "v0.5") -> dict:
     """
     Main function to run complete compliance gap analysis.
 
-    Returns dict with: use_case, technology, industry, search_queries, analysis,
-    timing, planning_thinking, analysis_thinking, token_usage.
+    Validates inputs, runs the pipeline, then saves the report and test-log row.
+    Returns the run_pipeline() result dict, or {"error": ...} for invalid inputs.
     """
     inputs = {"use_case": use_case, "technology": technology, "industry": industry}
     for field, value in inputs.items():
@@ -300,33 +1727,16 @@ def run_analysis(use_case: str, technology: str, industry: str, version: str = "
     print(f"Technology: {technology}")
     print(f"Industry: {industry}")
 
-    total_start = time.time()
-
-    # Step 1: Plan searches (returns dict with queries, thinking, tokens)
-    t0 = time.time()
-    plan_result = plan_searches(use_case, technology, industry)
-    search_queries = plan_result["queries"]
-    time_planning = time.time() - t0
-
-    # Step 2: Conduct research
-    t0 = time.time()
-    research_findings = conduct_research(search_queries)
-    time_research = time.time() - t0
-
-    # Step 3: Analyze compliance (returns dict with analysis, thinking, tokens)
-    t0 = time.time()
-    analysis_result = analyze_compliance(use_case, technology, industry, research_findings)
-    analysis = analysis_result["analysis"]
-    time_analysis = time.time() - t0
-
-    time_total = time.time() - total_start
+    result = run_pipeline(use_case, technology, industry)
+    timing = result['timing']
 
-    timing = {
-        'planning_sec': round(time_planning, 1),
-        'research_sec': round(time_research, 1),
-        'analysis_sec': round(time_analysis, 1),
-        'total_sec': round(time_total, 1),
-    }
+    if result['cache_hit']:
+        # Not a new run: no report file or test-log row, so cached timings
+        # don't skew the performance history.
+        print("\n" + "="*60)
+        print(f"⚡ SERVED FROM RUN CACHE (generated {result['cached_at']})")
+        print("="*60)
+        return result
 
     print("\n" + "="*60)
     print("✅ ANALYSIS COMPLETE")
@@ -334,37 +1744,56 @@ def run_analysis(use_case: str, technology: str, industry: str, version: str = "
           f"(plan: {timing['planning_sec']}s, "
           f"research: {timing['research_sec']}s, "
           f"analysis: {timing['analysis_sec']}s)")
+    if timing.get('overlap_saved_sec'):
+        print(f"⚡ Searching during planning saved ~{timing['overlap_saved_sec']}s")
+    if timing.get('rate_limit_wait_sec'):
+        print(f"⏳ Queued {timing['rate_limit_wait_sec']}s behind API rate limits")
+    if (result.get('quorum') or {}).get('fired'):
+        print(f"🏁 Quorum mode skipped {len(result['quorum']['stragglers'])} stragglers, "
+              f"saving ~{timing['quorum_saved_sec']}s of research")
+    for step, usage in result['model_usage'].items():
+        cost = f", ~${usage['cost_usd']:.4f}" if usage['cost_usd'] is not None else ""
+        fallback = " (fallback)" if usage['fallback'] else ""
+        print(f"🤖 {step}: {usage['model']}{fallback} — {usage['sec']}s, "
+              f"{usage['input']} in / {usage['output']} out{cost}")
+    decision = result.get('thinking_decision')
+    if decision:
+        print(f"🎚️ Thinking budget {decision['thinking_budget']} (predicted {decision['predicted_sec']}s, "
+              f"target {decision['target_sec']:.0f}s) — analysis took {timing['analysis_sec']}s")
+    if result.get('resumed'):
+        print(f"♻️ Resumed run {result['resumed']['from_run_id']} — skipping "
+              f"{' and '.join(result['resumed']['steps'])} saved ~{result['resumed']['saved_sec']}s")
+    if result.get('sharded_analysis'):
+        print(f"🧩 Sharded analysis saved ~{result['sharded_analysis']['saved_sec']}s "
+              f"over writing the sections in sequence")
+    if result['deadline_actions']:
+        label = "⚠️ PARTIAL REPORT — " if result['partial'] else "⏰ "
+        print(f"{label}time limit ({timing['deadline_sec']}s): {'; '.join(result['deadline_actions'])}")
     print("="*60)
 
-    result = {
-        'use_case': use_case,
-        'technology': technology,
-        'industry': industry,
-        'search_queries': search_queries,
-        'analysis': analysis,
-        'timing': timing,
-        'planning_thinking': plan_result.get("thinking"),
-        'analysis_thinking': analysis_result.get("thinking"),
-        'token_usage': {
-            'planning': {'input': plan_result.get("tokens_in", 0), 'output': plan_result.get("tokens_out", 0)},
-            'analysis': {'input': analysis_result.get("tokens_in", 0), 'output': analysis_result.get("tokens_out", 0)},
-        },
-    }
-
     report_path = save_report(result, version=version)
     append_test_log(result, version=version, report_path=report_path)
     return result
 
 
-# Function 6: append_test_log() - Track performance across runs
+# Function 7: append_test_log() - Track performance across runs
 
 _TEST_LOG_FIELDS = [
     'timestamp', 'version', 'run_id', 'use_case', 'technology', 'industry',
-    'num_queries', 'planning_sec', 'research_sec', 'analysis_sec', 'total_sec',
+    'num_queries', 'planning_sec', 'research_sec', 'overlap_saved_sec', 'speculative_hit_rate', 'rate_limit_wait_sec',
+    'quorum_fired', 'quorum_saved_sec', 'analysis_sec',
+    'analysis_ttft_sec', 'analysis_tokens_per_sec', 'total_sec',
+    'planning_model', 'analysis_model', 'cost_usd',
+    'analysis_thinking_budget', 'findings_tokens', 'jurisdictions',
+    'resumed_steps',
     'report_file',
 ]
 
 
+def _blank_none(value):
+    return '' if value is None else value
+
+
 def append_test_log(result: dict, version: str, report_path: str, run_id: str | None = None) -> None:
     """Append one row to reports/test-log.csv after every successful run."""
     log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
@@ -372,6 +1801,8 @@ def append_test_log(result: dict, version: str, report_path: str, run_id: str |
     log_path = os.path.join(log_dir, "test-log.csv")
 
     timing = result.get('timing', {})
+    model_usage = result.get('model_usage') or {}
+    analysis_inputs = result.get('analysis_inputs') or {}
     row = {
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'version': version,
@@ -382,15 +1813,29 @@ def append_test_log(result: dict, version: str, report_path: str, run_id: str |
         'num_queries': len(result.get('search_queries', [])),
         'planning_sec': timing.get('planning_sec', ''),
         'research_sec': timing.get('research_sec', ''),
+        'overlap_saved_sec': timing.get('overlap_saved_sec', ''),
+        'speculative_hit_rate': (result.get('speculative') or {}).get('hit_rate', ''),
+        'rate_limit_wait_sec': timing.get('rate_limit_wait_sec', ''),
+        'quorum_fired': (result.get('quorum') or {}).get('fired', ''),
+        'quorum_saved_sec': '' if timing.get('quorum_saved_sec') is None else timing['quorum_saved_sec'],
         'analysis_sec': timing.get('analysis_sec', ''),
+        'analysis_ttft_sec': timing.get('analysis_ttft_sec', ''),
+        'analysis_tokens_per_sec': timing.get('analysis_tokens_per_sec', ''),
         'total_sec': timing.get('total_sec', ''),
+        'planning_model': model_usage.get('planning', {}).get('model') or '',
+        'analysis_model': model_usage.get('analysis', {}).get('model') or '',
+        'cost_usd': '' if result.get('cost_usd') is None else result['cost_usd'],
+        'analysis_thinking_budget': _blank_none(model_usage.get('analysis', {}).get('thinking_budget')),
+        'findings_tokens': _blank_none(analysis_inputs.get('findings_tokens')),
+        'jurisdictions': _blank_none(analysis_inputs.get('jurisdictions')),
+        'resumed_steps': '+'.join((result.get('resumed') or {}).get('steps', [])),
         'report_file': os.path.basename(report_path),
     }
 
     if os.path.exists(log_path):
         with open(log_path, 'r', encoding='utf-8') as f:
             existing_header = f.readline().strip().split(',')
-        if 'run_id' not in existing_header:
+        if any(field not in existing_header for field in _TEST_LOG_FIELDS):
             _migrate_csv_header(log_path)
 
     file_exists = os.path.exists(log_path)
@@ -404,7 +1849,7 @@ def append_test_log(result: dict, version: str, report_path: str, run_id: str |
 
 
 def _migrate_csv_header(log_path: str) -> None:
-    """One-time migration: add run_id column to existing test-log.csv."""
+    """Rewrite test-log.csv under the current header, adding any new columns (run_id, TTFT, …) as blanks."""
     with open(log_path, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         old_rows = list(reader)
@@ -413,7 +1858,8 @@ def _migrate_csv_header(log_path: str) -> None:
         writer = csv.DictWriter(f, fieldnames=_TEST_LOG_FIELDS, extrasaction='ignore')
         writer.writeheader()
         for old_row in old_rows:
-            old_row.setdefault('run_id', '')
+            for field in _TEST_LOG_FIELDS:
+                old_row.setdefault(field, '')
             writer.writerow(old_row)
 
 
@@ -449,15 +1895,34 @@ TEST_SCENARIOS = {
 if __name__ == "__main__":
     import sys
 
-    if len(sys.argv) < 2 or sys.argv[1] not in TEST_SCENARIOS:
-        print("Usage: python agent.py <scenario>")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+
+    if not args or args[0] not in TEST_SCENARIOS:
+        print("Usage: python agent.py <scenario> [--record | --replay [--simulate-latency]]")
         print("\nAvailable scenarios:")
         for key, s in TEST_SCENARIOS.items():
             print(f"  {key:12s} -- {s['use_case']}")
+        print("\n  --record            save every Claude/Tavily response to cassettes/<scenario>.jsonl")
+        print("  --replay            serve responses from the cassette instead of the network")
+        print("  --simulate-latency  with --replay, sleep for each response's recorded latency")
         sys.exit(1)
 
-    scenario = TEST_SCENARIOS[sys.argv[1]]
-    result = run_analysis(**scenario)
+    version = "v0.5"
+    if "--record" in flags or "--replay" in flags:
+        import cassette
+        mode = "replay" if "--replay" in flags else "record"
+        tape = cassette.Cassette(
+            cassette.default_cassette_path(args[0]),
+            mode,
+            simulate_latency="--simulate-latency" in flags,
+        )
+        cassette.install(tape, sys.modules[__name__])
+        if mode == "replay":
+            version = f"{version}-replay"
+
+    scenario = TEST_SCENARIOS[args[0]]
+    result = run_analysis(**scenario, version=version)
 
     if "error" in result:
         print(f"\n❌ {result['error']}")
@@ -465,4 +1930,4 @@ if __name__ == "__main__":
         print("\n" + "="*60)
         print("COMPLIANCE ANALYSIS REPORT")
         print("="*60)
-        print(result['analysis'])
\ No newline at end of file
+        print(result['analysis'])
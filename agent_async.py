@@ -0,0 +1,338 @@
+"""
+AI Compliance Gap Analyzer - Async Agent
+The agent.py pipeline on asyncio, for running many analyses in one process.
+
+Each step is the async twin of its agent.py function — same arguments,
+same return dicts, same Langfuse spans — built on AsyncAnthropic and the
+async Tavily client (tools.search_web_async). Request building, deadline
+budgeting, result assembly and the run orchestration itself (agent._pipeline())
+are shared with agent.py, so the two paths can't drift apart.
+
+A run waiting on Claude or Tavily holds no thread, and its blocking I/O
+(SQLite caches and checkpoints, the test-log history) runs in worker
+threads, so dozens of runs can share one event loop:
+
+    results = await asyncio.gather(*(run_pipeline_async(*inputs) for inputs in batch))
+
+Rate limits, circuit breakers, the run cache and the search cache are the
+same process-wide ones the sync pipeline uses. Per-run state (deadline,
+rate-limit waits) lives in context variables, which asyncio copies into
+every task, so concurrent runs don't see each other's.
+"""
+
+import os
+import time
+import asyncio
+import contextlib
+import anthropic
+from langfuse import observe
+
+from ratelimit import anthropic_limiter
+from breaker import CircuitOpenError, anthropic_breaker, degraded_providers
+from retry import retry_policy
+from deadline import Deadline
+from research import (
+    AsyncResearchEngine, QueryStreamParser, StragglerLog, quorum_size, RESEARCH_QUORUM,
+)
+from sections import SHARDED_ANALYSIS, MATRIX_SHARD, SECTION_SHARDS
+from agent import (
+    _TRANSIENT_API_ERRORS, _record_api_error,
+    baseline_queries, _request_tokens, _thinking_budget, _fallback_request, _route_info, _shard_step,
+    _planning_request, _planning_preflight, _planning_stop, _planning_error, _planning_result,
+    _research_timeout, _submit_queries, _quorum_wait_sec, _log_quorum, _compile_research,
+    _analysis_request, _analysis_result, _plan_analysis, _analysis_error,
+    _stream_delta, _streamed_analysis_result,
+    _shard_request, _shard_outcome, _gap_matrix, _matrix_failed, _sharded_analysis_result,
+    _pipeline,
+)
+
+# Initialize async Claude client (agent.py has already loaded .env and
+# instrumented the Anthropic SDK, async clients included). SDK retries are
+# off, as on agent.client.
+async_client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+
+
+async def _retry_api_call_async(fn, tokens=0):
+    """agent._retry_api_call() for a coroutine function: same breaker, limiter and retry rules,
+    waiting without blocking the event loop."""
+    async def attempt():
+        anthropic_breaker.check()
+        try:
+            await anthropic_limiter.acquire_async(tokens)
+            result = await fn()
+        except BaseException as e:
+            _record_api_error(e)
+            raise
+        anthropic_breaker.record_success()
+        return result
+
+    return await retry_policy.call_async(
+        attempt,
+        retryable=lambda e: isinstance(e, _TRANSIENT_API_ERRORS),
+        label="Claude API call",
+    )
+
+
+async def _routed_call_async(step: str, request: dict, send) -> tuple:
+    """agent._routed_call() for a coroutine send(request): falls back to the
+    step's fallback model if its model stays overloaded. Returns (result, model used)."""
+    try:
+        return await _retry_api_call_async(lambda: send(request), tokens=_request_tokens(request)), request["model"]
+    except anthropic.APIStatusError as e:
+        fallback = _fallback_request(step, request, e)
+        if fallback is None:
+            raise
+        return await _retry_api_call_async(lambda: send(fallback), tokens=_request_tokens(fallback)), fallback["model"]
+
+
+# Function 1: plan_searches_async()
+async def _stream_plan_async(request: dict, on_query, should_stop=lambda: False,
+                             text_parts: list[str] | None = None, thinking_parts: list[str] | None = None) -> tuple:
+    """agent._stream_plan() on the async client."""
+    parser = QueryStreamParser()
+    streamed = []
+    async with contextlib.AsyncExitStack() as stack:
+        async def open_stream(req):
+            return await stack.enter_async_context(async_client.messages.stream(**req))
+
+        stream, model = await _routed_call_async("planning", request, open_stream)
+        async for event in stream:
+            delta = _stream_delta(event)
+            if delta is None:
+                continue
+            if delta["type"] == "thinking":
+                if thinking_parts is not None:
+                    thinking_parts.append(delta["delta"])
+                continue
+            if text_parts is not None:
+                text_parts.append(delta["delta"])
+            for query in parser.feed(delta["delta"]):
+                streamed.append(query)
+                on_query(query)
+            if should_stop():
+                return None, streamed, model
+        return await stream.get_final_message(), streamed, model
+
+
+@observe()
+async def plan_searches_async(use_case: str, technology: str, industry: str, on_query=None,
+                              deadline: Deadline | None = None) -> dict:
+    """
+    Async agent.plan_searches(): ask Claude to plan what searches to run.
+
+    Args and return dict as plan_searches(); on_query is a plain callback.
+    """
+    print("\n📋 Planning research strategy...")
+
+    fallback_queries = baseline_queries(technology, industry)
+    budget, deadline_actions, skipped = _planning_preflight(fallback_queries, deadline)
+    if skipped is not None:
+        return skipped
+
+    request = _planning_request(use_case, technology, industry, budget)
+    streamed, text_parts, thinking_parts = [], [], []
+
+    try:
+        if on_query is None:
+            response, model = await _routed_call_async(
+                "planning", request, lambda req: async_client.messages.create(**req))
+        else:
+            response, streamed, model = await _stream_plan_async(request, on_query, _planning_stop(deadline),
+                                                                 text_parts, thinking_parts)
+    except (anthropic.APIError, CircuitOpenError) as e:
+        return {**_planning_error(e, fallback_queries), **_route_info("planning", request["model"])}
+
+    return {**_planning_result(response, streamed, fallback_queries, deadline_actions,
+                               request, text_parts, thinking_parts),
+            **_route_info("planning", model), "thinking_budget": _thinking_budget(request)}
+
+
+# Function 2: conduct_research_async()
+@observe()
+async def conduct_research_async(queries: list, max_workers: int | None = None,
+                                 engine: AsyncResearchEngine | None = None, context: str = "",
+                                 deadline: Deadline | None = None, quorum: float | None = None) -> dict:
+    """
+    Async agent.conduct_research(): execute searches concurrently and compile results in plan order.
+
+    Args and return dict as conduct_research(); engine is an open AsyncResearchEngine.
+    """
+    if quorum is None:
+        quorum = RESEARCH_QUORUM
+    print(f"\n🔬 Conducting research ({len(queries)} searches)...")
+    if "tavily" in degraded_providers():
+        print("🔌 Tavily circuit is open — searches fail fast and fall back to cached results")
+
+    timeout = _research_timeout(deadline)
+    quorum_report = None
+
+    async def run(engine):
+        nonlocal quorum_report
+        _submit_queries(engine, queries, timeout)
+        if not quorum:
+            return await engine.results(timeout=timeout)
+
+        k = quorum_size(len(engine.queries), quorum)
+        done = await engine.wait_for(k, timeout=_quorum_wait_sec(timeout))
+        quorum_report = {"k": k, "n": len(engine.queries), "done": done}
+        searches = await engine.results(timeout=0, stragglers=StragglerLog(quorum_report))
+        _log_quorum(quorum_report)
+        return searches
+
+    if engine is not None:
+        searches = await run(engine)
+    else:
+        async with AsyncResearchEngine(max_workers=max_workers, context=context) as engine:
+            searches = await run(engine)
+
+    return _compile_research(searches, queries, quorum_report)
+
+
+# Function 3: analyze_compliance_async()
+@observe()
+async def analyze_section_async(use_case: str, technology: str, industry: str, research_findings: str,
+                                shard: str, gap_matrix: str = "", deadline: Deadline | None = None) -> dict:
+    """Async agent.analyze_section(): write one shard of a sharded report."""
+    request, deadline_actions = _shard_request(use_case, technology, industry, research_findings,
+                                               shard, gap_matrix, deadline)
+    if request is None:
+        return _shard_outcome(shard, deadline_actions)
+    t0 = time.time()
+    try:
+        response, model = await _routed_call_async(
+            _shard_step(shard), request, lambda req: async_client.messages.create(**req))
+    except (anthropic.APIError, CircuitOpenError) as e:
+        return _shard_outcome(shard, deadline_actions, time.time() - t0, error=e, model=request["model"])
+    return _shard_outcome(shard, deadline_actions, time.time() - t0, response, model=model)
+
+
+async def _analyze_sharded_async(use_case: str, technology: str, industry: str, research_findings: str,
+                                 on_delta=None, deadline: Deadline | None = None) -> dict:
+    """Async agent._analyze_sharded(): the gap matrix, then the other shards as concurrent tasks."""
+    print("\n🧠 Analyzing compliance gaps (sharded)...")
+    t0 = time.time()
+    matrix = await analyze_section_async(use_case, technology, industry, research_findings, MATRIX_SHARD,
+                                         deadline=deadline)
+    failed = _matrix_failed(matrix)
+    if failed is not None:
+        return failed
+
+    first_token_at = None
+    if on_delta is not None:
+        first_token_at = time.time()
+        on_delta({"type": "text", "delta": matrix["markdown"]})
+
+    gap_matrix = _gap_matrix(matrix)
+    sections_start = time.time()
+    tasks = [asyncio.create_task(analyze_section_async(use_case, technology, industry, research_findings,
+                                                       name, gap_matrix, deadline))
+             for name in SECTION_SHARDS if name != MATRIX_SHARD]
+    shards = []
+    for task in tasks:
+        shards.append(await task)
+        if on_delta is not None:
+            on_delta({"type": "text", "delta": "\n\n" + shards[-1]["markdown"]})
+    return _sharded_analysis_result(matrix, shards, time.time() - sections_start, first_token_at, t0)
+
+
+@observe()
+async def analyze_compliance_async(use_case: str, technology: str, industry: str, research_findings: str,
+                                   on_delta=None, deadline: Deadline | None = None,
+                                   sharded: bool | None = None, num_queries: int | None = None) -> dict:
+    """
+    Async agent.analyze_compliance(): analyze compliance gaps based on research.
+
+    Args and return dict as analyze_compliance(). With on_delta (a plain
+    callback) the report is streamed, cut off at the deadline, and the result
+    includes ttft_sec and output_tokens_per_sec.
+    """
+    if sharded is None:
+        sharded = SHARDED_ANALYSIS
+    if sharded:
+        return await _analyze_sharded_async(use_case, technology, industry, research_findings,
+                                            on_delta=on_delta, deadline=deadline)
+
+    print("\n🧠 Analyzing compliance gaps" + (" (streaming)..." if on_delta else "..."))
+
+    # In a worker thread: with ADAPTIVE_THINKING it reads the test-log history.
+    budget, deadline_actions, skipped, thinking_info = await asyncio.to_thread(
+        _plan_analysis, research_findings, industry, deadline, num_queries)
+    if skipped is not None:
+        return skipped
+
+    request = _analysis_request(use_case, technology, industry, research_findings, budget)
+
+    if on_delta is None:
+        try:
+            response, model = await _routed_call_async(
+                "analysis", request, lambda req: async_client.messages.create(**req))
+        except (anthropic.APIError, CircuitOpenError) as e:
+            return {**_analysis_error(e), **_route_info("analysis", request["model"]), **thinking_info}
+        return {**_analysis_result(response), "deadline_actions": deadline_actions,
+                **_route_info("analysis", model), **thinking_info}
+
+    t0 = time.time()
+    first_token_at = None
+    text_parts, thinking_parts = [], []
+    response = None
+    model = request["model"]
+
+    try:
+        async with contextlib.AsyncExitStack() as stack:
+            # Only opening the stream is retried or re-routed (see analyze_compliance_stream()).
+            async def open_stream(req):
+                return await stack.enter_async_context(async_client.messages.stream(**req))
+
+            stream, model = await _routed_call_async("analysis", request, open_stream)
+            async for event in stream:
+                delta = _stream_delta(event)
+                if delta is None:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.time()
+                (text_parts if delta["type"] == "text" else thinking_parts).append(delta["delta"])
+                on_delta(delta)
+                if deadline is not None and deadline.expired():
+                    break
+            else:
+                response = await stream.get_final_message()
+    except (anthropic.APIError, CircuitOpenError) as e:
+        return {**_analysis_error(e), **_route_info("analysis", model), **thinking_info}
+
+    return {**_streamed_analysis_result(response, text_parts, thinking_parts, deadline_actions,
+                                        t0, first_token_at, request),
+            **_route_info("analysis", model), **thinking_info}
+
+
+# Function 5: run_pipeline_async()
+async def run_pipeline_async(use_case: str, technology: str, industry: str, on_progress=None,
+                             use_cache: bool = True, streamed_planning: bool | None = None,
+                             speculative: bool | None = None, deadline_sec: float | None = None,
+                             quorum: float | None = None, sharded: bool | None = None,
+                             run_id: str | None = None, resume_from: str | None = None) -> dict:
+    """
+    Async agent.run_pipeline(): plan → research → analyze, no persistence.
+
+    Same arguments, progress events and result dict as run_pipeline(), and
+    the same run cache — both drive agent._pipeline(). on_progress is a plain
+    callback, called on the event loop — keep it quick.
+    """
+    pipeline = _pipeline(use_case, technology, industry, on_progress, use_cache, streamed_planning,
+                         speculative, deadline_sec, quorum, sharded, run_id, resume_from)
+    steps = {"plan": plan_searches_async, "research": conduct_research_async, "analyze": analyze_compliance_async}
+    async with contextlib.AsyncExitStack() as stack:
+        value = None
+        while True:
+            try:
+                call = pipeline.send(value)
+            except StopIteration as done:
+                return done.value
+            if call[0] == "io":
+                # Cache, checkpoint and log reads/writes are blocking SQLite/CSV calls.
+                value = await asyncio.to_thread(call[1], *call[2:])
+            elif call[0] == "engine":
+                value = await stack.enter_async_context(AsyncResearchEngine(context=use_case))
+            elif call[0] == "close_engine":
+                value = await stack.aclose()
+            else:
+                value = await steps[call[0]](**call[1])
@@ -0,0 +1,163 @@
+"""
+Stand-in Claude and Tavily clients for the offline benchmark.
+
+They expose only the surface the pipeline uses (client.messages.create and
+.stream, tavily.search), sleep for a latency drawn from a LatencyModel, and return
+canned responses shaped like the real ones.
+"""
+
+import json
+import time
+import random
+import threading
+import contextvars
+from types import SimpleNamespace
+
+from cassette import SyntheticStream
+
+PLANNED_QUERIES = [
+    "EU AI Act high-risk AI system obligations",
+    "GDPR Article 22 automated decision-making requirements",
+    "vendor API data retention and training data policy",
+    "sector regulator guidance on AI model risk management",
+    "recent enforcement actions AI transparency disclosure",
+]
+
+CANNED_REPORT = """### 1. Compliance Gap Matrix
+
+| Potential Gap | Risk Level | Regulatory Context | Priority |
+|---------------|-----------|-------------------|----------|
+| AI disclosure to end users | HIGH | EU AI Act Art. 50 | 1 |
+
+### 2. Key Regulatory Landscape
+
+- **EU AI Act (Regulation 2024/1689)** — Benchmark placeholder.
+
+### 3. Gap Details
+
+**HIGH:**
+
+**AI disclosure to end users**
+- Benchmark placeholder.
+
+### 4. Recommended Next Steps
+
+**Worth doing soon:**
+1. **Review disclosures** — Benchmark placeholder.
+
+### 5. Bottom Line
+
+Benchmark placeholder."""
+
+# Simulated API seconds per step for the run executing in this context.
+# Set by the benchmark per run; search workers inherit it via copied contexts.
+_run_calls = contextvars.ContextVar("bench_run_calls", default=None)
+
+
+def start_run_recording() -> list:
+    """Begin collecting (step, simulated_sec) tuples for the current run."""
+    calls = []
+    _run_calls.set(calls)
+    return calls
+
+
+class _LatencySource:
+    def __init__(self, models: dict, time_scale: float, seed: int | None):
+        self.models = models
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, step: str) -> float:
+        """Draw one latency (unscaled) and record it against the current run."""
+        with self._lock:
+            latency = self.models[step].sample(self._rng)
+        calls = _run_calls.get()
+        if calls is not None:
+            calls.append((step, latency))
+        return latency
+
+    def wait(self, step: str) -> float:
+        """Sleep for one sampled latency (scaled)."""
+        latency = self.sample(step)
+        time.sleep(latency * self.time_scale)
+        return latency
+
+
+def _classify(kwargs: dict) -> str:
+    """Tell planning and analysis calls apart by their static system instructions."""
+    system = json.dumps(kwargs.get("system", ""), default=str)
+    return "planning" if "searches should I run" in system else "analysis"
+
+
+def _message(text: str, tokens_in: int, tokens_out: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        content=[
+            SimpleNamespace(type="thinking", thinking="(benchmark thinking)"),
+            SimpleNamespace(type="text", text=text),
+        ],
+        usage=SimpleNamespace(
+            input_tokens=tokens_in,
+            output_tokens=tokens_out,
+            cache_creation_input_tokens=0,
+            cache_read_input_tokens=0,
+        ),
+        stop_reason="end_turn",
+    )
+
+
+class _FakeMessages:
+    def __init__(self, latency: _LatencySource, ttft_fraction: float):
+        self._latency = latency
+        self._ttft_fraction = ttft_fraction
+
+    def _respond(self, step: str, kwargs: dict) -> SimpleNamespace:
+        tokens_in = len(json.dumps(kwargs, default=str)) // 4
+        if step == "planning":
+            return _message(json.dumps(PLANNED_QUERIES) + "\n\n## Reasoning\n(benchmark)", tokens_in, 600)
+        return _message(CANNED_REPORT, tokens_in, 3000)
+
+    def create(self, **kwargs):
+        step = _classify(kwargs)
+        self._latency.wait(step)
+        return self._respond(step, kwargs)
+
+    def stream(self, **kwargs):
+        step = _classify(kwargs)
+        total = self._latency.sample(step) * self._latency.time_scale
+        return SyntheticStream(self._respond(step, kwargs), ttft_sec=total * self._ttft_fraction, total_sec=total)
+
+
+class FakeAnthropic:
+    """Stands in for anthropic.Anthropic.
+
+    Streamed calls deliver their first token after ttft_fraction of the sampled
+    latency — test-log.csv predates streaming, so there's no TTFT to fit yet.
+    """
+
+    def __init__(self, models: dict, time_scale: float = 1.0, seed: int | None = None,
+                 ttft_fraction: float = 0.15):
+        self.messages = _FakeMessages(_LatencySource(models, time_scale, seed), ttft_fraction)
+
+
+class FakeTavily:
+    """Stands in for TavilyClient."""
+
+    def __init__(self, models: dict, time_scale: float = 1.0, seed: int | None = None):
+        self._latency = _LatencySource(models, time_scale, seed)
+
+    def search(self, query: str, max_results: int = 3, **kwargs):
+        self._latency.wait("search")
+        slug = "-".join(query.lower().split())
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"{query} — source {i}",
+                    "url": f"https://example.org/{slug}/{i}",
+                    "content": f"Regulatory text about {query}. " * 40,
+                    "score": round(0.9 - 0.1 * i, 2),
+                }
+                for i in range(max_results)
+            ],
+        }
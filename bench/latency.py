@@ -0,0 +1,126 @@
+"""
+Latency models for the offline benchmark.
+
+Each model draws one simulated API latency (seconds). Defaults are fitted from
+the live-run timings in reports/test-log.csv, so the fake clients behave like
+the real Claude and Tavily calls without touching the network.
+
+Model config (JSON, one entry per step — "planning", "search", "analysis"):
+    {"dist": "constant", "value": 2.0}
+    {"dist": "lognormal", "mu": 2.3, "sigma": 0.4}
+    {"dist": "empirical", "samples": [7.7, 9.4, 9.3]}
+"""
+
+import os
+import csv
+import math
+import random
+import statistics
+
+TEST_LOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports", "test-log.csv"
+)
+
+STEPS = ("planning", "search", "analysis")
+
+
+class LatencyModel:
+    """Base class — subclasses implement sample() and describe()."""
+
+    def sample(self, rng: random.Random) -> float:
+        raise NotImplementedError
+
+    def describe(self) -> dict:
+        raise NotImplementedError
+
+
+class Constant(LatencyModel):
+    def __init__(self, value: float):
+        self.value = value
+
+    def sample(self, rng):
+        return self.value
+
+    def describe(self):
+        return {"dist": "constant", "value": self.value}
+
+
+class LogNormal(LatencyModel):
+    """Right-skewed, always positive — a good fit for API latency with a long tail."""
+
+    def __init__(self, mu: float, sigma: float):
+        self.mu = mu
+        self.sigma = sigma
+
+    @classmethod
+    def fit(cls, samples: list[float]) -> "LogNormal":
+        logs = [math.log(s) for s in samples if s > 0]
+        sigma = statistics.stdev(logs) if len(logs) > 1 else 0.0
+        return cls(statistics.fmean(logs), sigma)
+
+    def sample(self, rng):
+        return rng.lognormvariate(self.mu, self.sigma)
+
+    def describe(self):
+        return {"dist": "lognormal", "mu": round(self.mu, 4), "sigma": round(self.sigma, 4)}
+
+
+class Empirical(LatencyModel):
+    """Resample observed latencies directly."""
+
+    def __init__(self, samples: list[float]):
+        if not samples:
+            raise ValueError("Empirical latency model needs at least one sample")
+        self.samples = list(samples)
+
+    def sample(self, rng):
+        return rng.choice(self.samples)
+
+    def describe(self):
+        return {"dist": "empirical", "samples": self.samples}
+
+
+def model_from_config(config: dict) -> LatencyModel:
+    dist = config.get("dist")
+    if dist == "constant":
+        return Constant(float(config["value"]))
+    if dist == "lognormal":
+        return LogNormal(float(config["mu"]), float(config["sigma"]))
+    if dist == "empirical":
+        return Empirical([float(s) for s in config["samples"]])
+    raise ValueError(f"Unknown latency distribution: {dist!r}")
+
+
+def load_test_log_samples(path: str = TEST_LOG_PATH) -> dict[str, list[float]]:
+    """Per-step latency samples from test-log.csv.
+
+    Skips the fixed 1/2/3/6s rows written by test_tracking.py. Per-search
+    latency is research_sec / num_queries — every logged run predates
+    concurrent research, so searches ran back to back.
+    """
+    samples = {step: [] for step in STEPS}
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                num_queries = int(row["num_queries"])
+                planning = float(row["planning_sec"])
+                research = float(row["research_sec"])
+                analysis = float(row["analysis_sec"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if num_queries <= 1:
+                continue
+            samples["planning"].append(planning)
+            samples["search"].append(round(research / num_queries, 3))
+            samples["analysis"].append(analysis)
+    return samples
+
+
+def fit_models(path: str = TEST_LOG_PATH, dist: str = "lognormal") -> dict[str, LatencyModel]:
+    """Fit one latency model per step from the test log."""
+    samples = load_test_log_samples(path)
+    if dist == "empirical":
+        return {step: Empirical(values) for step, values in samples.items()}
+    if dist == "lognormal":
+        return {step: LogNormal.fit(values) for step, values in samples.items()}
+    raise ValueError(f"Can only fit 'lognormal' or 'empirical', not {dist!r}")
@@ -0,0 +1,262 @@
+"""
+Offline benchmark for the compliance pipeline.
+
+Drives run_analysis() (CLI path) and run_pipeline() with a progress callback
+(the Streamlit _run_pipeline path) against stand-in Claude/Tavily clients whose
+latencies are fitted from reports/test-log.csv. No network, no API spend.
+
+Reports per concurrency level:
+- p50/p95/p99 per step (planning, research, analysis, analysis TTFT, total), in simulated seconds
+- pipeline overhead: wall time beyond the simulated API critical path, in real ms
+- throughput in runs per simulated minute
+
+Usage:
+    python -m bench.run_bench
+    python -m bench.run_bench --concurrency 1,4 --time-scale 0.05
+    python -m bench.run_bench --latency-config my_models.json --output out.json
+    python -m bench.run_bench --compare bench/results/baseline.json --tolerance 0.10
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import contextvars
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+# agent.py / tools.py build real API clients at import time, which refuse to
+# start without keys. The fakes replace them before any call is made.
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench-offline")
+os.environ.setdefault("TAVILY_API_KEY", "bench-offline")
+
+import ratelimit
+import search_policy
+from bench.fakes import FakeAnthropic, FakeTavily, start_run_recording
+from bench.latency import fit_models, model_from_config, STEPS
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+TIMED_STEPS = {
+    "plan_searches": "planning",
+    "conduct_research": "research",
+    "analyze_compliance": "analysis",
+}
+
+_step_walls = contextvars.ContextVar("bench_step_walls", default=None)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Linear-interpolated percentile (p in 0–100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values: list[float]) -> dict:
+    return {f"p{p}": round(percentile(values, p), 3) for p in (50, 95, 99)}
+
+
+def ideal_research_sec(latencies: list[float], workers: int) -> float:
+    """Critical path of the search fan-out: FIFO list scheduling onto `workers` slots."""
+    slots = [0.0] * max(1, workers)
+    for latency in latencies:
+        i = slots.index(min(slots))
+        slots[i] += latency
+    return max(slots) if latencies else 0.0
+
+
+def _timed(step: str, fn):
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            walls = _step_walls.get()
+            if walls is not None:
+                walls[step] = walls.get(step, 0.0) + time.perf_counter() - t0
+    return wrapper
+
+
+def install_fakes(agent, tools, models: dict, time_scale: float, seed: int | None, report_dir: str) -> None:
+    """Swap in fake clients, time each pipeline step, and keep reports out of reports/."""
+    agent.client = FakeAnthropic(models, time_scale, seed)
+    tools.tavily = FakeTavily(models, time_scale, None if seed is None else seed + 1)
+    tools.search_cache.ttl_sec = 0
+    agent.run_cache.ttl_sec = 0
+    search_policy.usefulness_store.ttl_sec = 0
+    # Simulated calls run at 1/time_scale speed, so real per-minute provider
+    # limits would throttle the benchmark itself — switch them off.
+    ratelimit.anthropic_limiter.configure(0, 0)
+    ratelimit.tavily_limiter.configure(0, 0)
+    for name, step in TIMED_STEPS.items():
+        setattr(agent, name, _timed(step, getattr(agent, name)))
+    agent.save_report = partial(agent.save_report, output_dir=report_dir)
+    agent.append_test_log = lambda *args, **kwargs: None
+
+
+def _one_run(agent, target: str, scenario: dict, time_scale: float, workers: int) -> dict:
+    calls = start_run_recording()
+    walls = {}
+    _step_walls.set(walls)
+
+    t0 = time.perf_counter()
+    if target == "run_analysis":
+        result = agent.run_analysis(**scenario)
+    else:
+        result = agent.run_pipeline(**scenario, on_progress=lambda event, data: None)
+    total_wall = time.perf_counter() - t0
+
+    simulated = {step: [sec for s, sec in calls if s == step] for step in STEPS}
+    critical_path = (
+        sum(simulated["planning"])
+        + ideal_research_sec(simulated["search"], workers)
+        + sum(simulated["analysis"])
+    )
+    return {
+        "planning": walls.get("planning", 0.0) / time_scale,
+        "research": walls.get("research", 0.0) / time_scale,
+        "analysis": walls.get("analysis", 0.0) / time_scale,
+        "analysis_ttft": (result["timing"].get("analysis_ttft_sec") or 0.0) / time_scale,
+        "total": total_wall / time_scale,
+        "overhead_ms": (total_wall - critical_path * time_scale) * 1000,
+    }
+
+
+def run_level(agent, target: str, concurrency: int, runs: int, time_scale: float, workers: int) -> dict:
+    scenarios = list(agent.TEST_SCENARIOS.values())
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(_one_run, agent, target, scenarios[i % len(scenarios)], time_scale, workers)
+            for i in range(runs)
+        ]
+        samples = [f.result() for f in futures]
+    wall = time.perf_counter() - t0
+
+    summary = {
+        "runs": runs,
+        "wall_sec": round(wall, 3),
+        "throughput_runs_per_min": round(runs / (wall / time_scale) * 60, 3),
+        "steps": {
+            step: summarize([s[step] for s in samples])
+            for step in ("planning", "research", "analysis", "analysis_ttft", "total")
+        },
+        "overhead_ms": summarize([s["overhead_ms"] for s in samples]),
+    }
+    return summary
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """List p95 regressions beyond tolerance (fractional, e.g. 0.10 = 10%)."""
+    regressions = []
+    for target, levels in current["targets"].items():
+        for level, summary in levels.items():
+            base = baseline.get("targets", {}).get(target, {}).get(level)
+            if not base:
+                continue
+            pairs = [(f"{step} p95", summary["steps"][step]["p95"], base["steps"][step]["p95"])
+                     for step in summary["steps"] if step in base["steps"]]
+            pairs.append(("overhead_ms p95", summary["overhead_ms"]["p95"], base["overhead_ms"]["p95"]))
+            for name, now, before in pairs:
+                if before > 0 and now > before * (1 + tolerance):
+                    regressions.append(
+                        f"{target} @ {level}: {name} {before} → {now} (+{(now / before - 1) * 100:.1f}%)"
+                    )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the compliance pipeline")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated concurrent-run levels")
+    parser.add_argument("--runs-per-level", type=int, default=0,
+                        help="Runs per level (default: 2 × concurrency, minimum 8)")
+    parser.add_argument("--targets", default="run_analysis,pipeline",
+                        help="run_analysis (CLI path) and/or pipeline (Streamlit path)")
+    parser.add_argument("--time-scale", type=float, default=0.02,
+                        help="Real seconds slept per simulated second (0.02 → a 100s call takes 2s)")
+    parser.add_argument("--dist", default="lognormal", choices=("lognormal", "empirical"),
+                        help="Distribution fitted from test-log.csv")
+    parser.add_argument("--latency-config", help="JSON file overriding per-step latency models")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--version", default="v0.5", help="Version tag written into the results")
+    parser.add_argument("--output", help="Results JSON path (default: bench/results/bench_<version>_<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline results JSON to gate against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed p95 regression vs --compare")
+    args = parser.parse_args(argv)
+
+    models = fit_models(dist=args.dist)
+    if args.latency_config:
+        with open(args.latency_config, "r", encoding="utf-8") as f:
+            for step, config in json.load(f).items():
+                models[step] = model_from_config(config)
+
+    import agent
+    import tools
+    import research
+
+    report_dir = tempfile.mkdtemp(prefix="bench_reports_")
+    install_fakes(agent, tools, models, args.time_scale, args.seed, report_dir)
+
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+
+    results = {
+        "version": args.version,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "time_scale": args.time_scale,
+        "research_concurrency": research.RESEARCH_CONCURRENCY,
+        "research_quorum": research.RESEARCH_QUORUM,
+        "latency_models": {step: model.describe() for step, model in models.items()},
+        "units": {"steps": "simulated seconds", "overhead_ms": "real milliseconds",
+                  "throughput_runs_per_min": "runs per simulated minute"},
+        "targets": {},
+    }
+
+    for target in targets:
+        results["targets"][target] = {}
+        for level in levels:
+            runs = args.runs_per_level or max(8, 2 * level)
+            print(f"⏱️  {target} @ concurrency {level} ({runs} runs)…", file=sys.stderr)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                summary = run_level(agent, target, level, runs, args.time_scale, research.RESEARCH_CONCURRENCY)
+            results["targets"][target][str(level)] = summary
+            print(f"   total p50/p95/p99: {summary['steps']['total']} · "
+                  f"overhead p95: {summary['overhead_ms']['p95']}ms · "
+                  f"{summary['throughput_runs_per_min']} runs/min", file=sys.stderr)
+
+    if tools.search_hedger.enabled:
+        # Histogram and delays are in scaled (real) seconds; the counts are what matter.
+        results["search_hedging"] = tools.search_hedger.stats()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_{args.version}_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"📊 Benchmark results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) vs {args.compare}:", file=sys.stderr)
+            for line in regressions:
+                print(f"   {line}", file=sys.stderr)
+            return 1
+        print(f"✅ No p95 regressions beyond {args.tolerance:.0%} vs {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Circuit breakers for AI Compliance Gap Analyzer.
+One per provider (Claude, Tavily), shared by every session in the process.
+
+closed    → calls go through; consecutive failures are counted
+open      → calls fail fast with CircuitOpenError for BREAKER_RECOVERY_SEC
+half-open → after the cool-down, one trial call is let through; success
+            closes the breaker, failure re-opens it
+
+Without a breaker, a provider outage costs every run the full retry cycle on
+every call before it fails.
+"""
+
+import os
+import time
+import threading
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RECOVERY_SEC = float(os.getenv("BREAKER_RECOVERY_SEC", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, name: str, retry_in_sec: float):
+        super().__init__(f"{name} circuit open — failing fast (retry in {retry_in_sec:.0f}s)")
+        self.name = name
+        self.retry_in_sec = retry_in_sec
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a timed half-open probe."""
+
+    def __init__(self, name: str, failure_threshold: int | None = None, recovery_sec: float | None = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or BREAKER_FAILURE_THRESHOLD
+        self.recovery_sec = BREAKER_RECOVERY_SEC if recovery_sec is None else recovery_sec
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_sec:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            retry_in = max(0.0, self.recovery_sec - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def allow(self) -> bool:
+        """check() as a boolean."""
+        try:
+            self.check()
+            return True
+        except CircuitOpenError:
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"🔌 {self.name} circuit closed — provider recovered")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"🔌 {self.name} circuit opened after {self._failures} consecutive failures")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self) -> None:
+        """End a call check() let through without a verdict on the provider
+        (e.g. it was cancelled, or failed on our side): a half-open breaker
+        lets the next call probe instead."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self._current_state(), "consecutive_failures": self._failures}
+
+
+anthropic_breaker = CircuitBreaker("anthropic")
+tavily_breaker = CircuitBreaker("tavily")
+
+
+def breaker_states() -> dict:
+    """State of every provider breaker, e.g. {"anthropic": {"state": "closed", ...}}."""
+    return {b.name: b.snapshot() for b in (anthropic_breaker, tavily_breaker)}
+
+
+def degraded_providers() -> list[str]:
+    """Providers whose breaker isn't closed."""
+    return [name for name, snap in breaker_states().items() if snap["state"] != CLOSED]
@@ -0,0 +1,220 @@
+"""
+Adaptive thinking budget for AI Compliance Gap Analyzer.
+Picks the analysis call's budget_tokens / max_tokens to hit a target latency.
+
+With a fixed thinking budget, analysis_sec in the test log still ranges from
+under a minute to over three. The controller (ADAPTIVE_THINKING=1) sizes
+the budget per run from two things:
+
+- History: rolling median analysis_sec per thinking budget, over the last
+  THINKING_HISTORY_WINDOW runs in reports/test-log.csv (Streamlit runs get
+  there through sync_reports.py). Rows logged before budgets were recorded
+  take their version's budget from VERSION_BUDGETS, and are skipped if the
+  version isn't listed. A budget with too few runs is interpolated between
+  the budgets either side that have enough, or extrapolated from the nearest
+  one, assuming the extra thinking is used in full at
+  CLAUDE_OUTPUT_TOKENS_PER_SEC. The history is read once and re-read only
+  when the test log changes.
+- Input complexity: findings size, jurisdictions named in the industry, and
+  the run's search query count (the test log's num_queries), each compared
+  with the history's median (or REFERENCE_FEATURES before the history
+  records them). Only part of the time scales with them — the report format
+  is fixed.
+
+It picks the largest candidate budget predicted to finish within
+TARGET_ANALYSIS_SEC, or the smallest if none does. Each decision is returned
+for the run's record. The run deadline (deadline.py) can still cut the
+budget further.
+
+Agent Workflow:
+1. User Input
+2. Plan Research (Claude) → prompts.py
+3. Execute Research (Tavily) → research.py
+4. Analyze Findings (Claude) → prompts.py, budget_controller.py ← THIS FILE (thinking budget)
+5. Output Report
+"""
+
+import os
+import re
+import csv
+import statistics
+
+from research import estimate_tokens
+
+ADAPTIVE_THINKING = os.getenv("ADAPTIVE_THINKING", "0") == "1"
+TARGET_ANALYSIS_SEC = float(os.getenv("TARGET_ANALYSIS_SEC", "90"))
+BUDGET_CANDIDATES = sorted(int(b) for b in os.getenv("THINKING_BUDGET_CANDIDATES", "1024,2000,3000,4000,6000").split(","))
+THINKING_HISTORY_WINDOW = int(os.getenv("THINKING_HISTORY_WINDOW", "50"))
+
+MIN_SAMPLES = 3            # runs at a budget before its median is trusted
+MIN_ANALYSIS_SEC = 10.0    # shorter rows are smoke tests or failures, not analyses
+# Analysis thinking budget per version, for rows logged before budgets were
+# (docs/iterations): no extended thinking before v0.4, 8000 in v0.4, 4000 from v0.5.
+VERSION_BUDGETS = {"v0.1": 0, "v0.2": 0, "v0.3": 0, "v0.4": 8000, "v0.5": 4000}
+# Typical inputs, the complexity reference until the history records them.
+# A 5-query run is ~2.5k findings tokens (see FINDINGS_TOKEN_BUDGET).
+REFERENCE_FEATURES = {"findings_tokens": 2500, "jurisdictions": 1, "num_queries": 5}
+FIXED_WORK_SHARE = 0.5     # share of analysis time that doesn't grow with the inputs
+
+TEST_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports", "test-log.csv")
+
+# Jurisdiction mentions in free-text industry descriptions, e.g. "UK neobank",
+# "US hospital network", "EU and California users".
+_JURISDICTIONS = {
+    "us": r"\bu\.?s\.?a?\b|united states|\bamerica",
+    "eu": r"\beu\b|european union|\beurope",
+    "uk": r"\buk\b|united kingdom|britain|england",
+    "california": r"california",
+    "new york": r"new york",
+    "canada": r"canad",
+    "australia": r"australia",
+    "singapore": r"singapore",
+    "india": r"\bindia",
+    "china": r"\bchina|chinese",
+    "japan": r"japan",
+    "brazil": r"brazil",
+    "germany": r"german",
+    "france": r"\bfrance|french",
+}
+
+
+def count_jurisdictions(industry: str) -> int:
+    """Distinct jurisdictions named in the industry text (at least 1 — one is always implied)."""
+    text = industry.lower()
+    return max(1, sum(1 for pattern in _JURISDICTIONS.values() if re.search(pattern, text)))
+
+
+def input_features(research_findings: str, industry: str, num_queries: int | None = None) -> dict:
+    """Complexity inputs: findings_tokens, jurisdictions and num_queries.
+
+    num_queries is the run's search query count, as the test log's num_queries
+    column records it; None (unknown) counts as typical.
+    """
+    return {
+        "findings_tokens": estimate_tokens(research_findings),
+        "jurisdictions": count_jurisdictions(industry),
+        "num_queries": num_queries,
+    }
+
+
+def _number(value: str) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# (path, window) -> (test log mtime and size, history), so choose() doesn't
+# re-read the log on every run.
+_history_cache = {}
+
+
+def load_history(path: str | None = None, window: int = THINKING_HISTORY_WINDOW) -> list[dict]:
+    """The last `window` real analyses in the test log: budget, analysis_sec and features (None if not logged)."""
+    path = path or TEST_LOG_PATH
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return []
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _history_cache.get((path, window))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    history = []
+    for row in rows:
+        analysis_sec = _number(row.get("analysis_sec"))
+        if analysis_sec is None or analysis_sec < MIN_ANALYSIS_SEC or row.get("version", "").endswith("-replay"):
+            continue
+        budget = _number(row.get("analysis_thinking_budget"))
+        if budget is None:
+            budget = VERSION_BUDGETS.get(row.get("version"))
+            if budget is None:
+                continue
+        history.append({
+            "budget": int(budget),
+            "analysis_sec": analysis_sec,
+            **{feature: _number(row.get(feature)) for feature in REFERENCE_FEATURES},
+        })
+    history = history[-window:]
+    _history_cache[(path, window)] = (version, history)
+    return history
+
+
+def _load_factor(features: dict, history: list[dict]) -> float:
+    """How much more (or less) work this run is than a typical one in the history."""
+    ratios = []
+    for feature, default in REFERENCE_FEATURES.items():
+        logged = [row[feature] for row in history if row[feature]]
+        reference = statistics.median(logged) if len(logged) >= MIN_SAMPLES else default
+        ratios.append(min(2.0, max(0.5, features[feature] / reference)) if features[feature] else 1.0)
+    return FIXED_WORK_SHARE + (1 - FIXED_WORK_SHARE) * statistics.mean(ratios)
+
+
+def predict_sec(budget: int, history: list[dict], tokens_per_sec: float) -> tuple[float | None, str]:
+    """Typical analysis_sec at a thinking budget, and how it was estimated (None without history)."""
+    by_budget = {}
+    for row in history:
+        by_budget.setdefault(row["budget"], []).append(row["analysis_sec"])
+    known = {b: statistics.median(secs) for b, secs in by_budget.items() if len(secs) >= MIN_SAMPLES}
+    if budget in known:
+        return known[budget], "history"
+    if not known:
+        return None, "no history"
+    below = max((b for b in known if b < budget), default=None)
+    above = min((b for b in known if b > budget), default=None)
+    if below is not None and above is not None:
+        share = (budget - below) / (above - below)
+        return known[below] + share * (known[above] - known[below]), f"interpolated from {below}–{above}"
+    nearest = below if above is None else above
+    return max(0.0, known[nearest] + (budget - nearest) / tokens_per_sec), f"extrapolated from {nearest}"
+
+
+def choose(research_findings: str, industry: str, answer_tokens: int, default_budget: int,
+           tokens_per_sec: float, target_sec: float | None = None, history: list[dict] | None = None,
+           num_queries: int | None = None) -> dict:
+    """Pick the analysis thinking budget for this run.
+
+    Args:
+        research_findings: The findings the analysis will read
+        industry: The user's industry text (jurisdictions are counted from it)
+        answer_tokens: max_tokens left for the report itself, on top of thinking
+        default_budget: Budget to use when there's no history to go on
+        tokens_per_sec: Output rate for extrapolating between budgets
+        target_sec: Latency to aim for (defaults to TARGET_ANALYSIS_SEC)
+        history: load_history() rows (the cached test-log history if None)
+        num_queries: The run's search query count (None = unknown)
+
+    Returns:
+        dict with thinking_budget, max_tokens, target_sec, predicted_sec,
+        load (complexity factor), features, history_runs and basis
+    """
+    target_sec = TARGET_ANALYSIS_SEC if target_sec is None else target_sec
+    history = load_history() if history is None else history
+    features = input_features(research_findings, industry, num_queries)
+    load = _load_factor(features, history)
+
+    predictions = {budget: predict_sec(budget, history, tokens_per_sec) for budget in BUDGET_CANDIDATES}
+    if all(sec is None for sec, _ in predictions.values()):
+        budget, predicted, basis = default_budget, None, "no latency history — default budget"
+    else:
+        fitting = [b for b, (sec, _) in predictions.items() if sec * load <= target_sec]
+        budget = max(fitting) if fitting else BUDGET_CANDIDATES[0]
+        sec, basis = predictions[budget]
+        predicted = round(sec * load, 1)
+        if not fitting:
+            basis += "; no budget fits the target"
+
+    return {
+        "thinking_budget": budget,
+        "max_tokens": answer_tokens + budget,
+        "target_sec": target_sec,
+        "predicted_sec": predicted,
+        "load": round(load, 2),
+        "features": features,
+        "history_runs": len(history),
+        "basis": basis,
+    }
@@ -0,0 +1,178 @@
+"""
+Local on-disk cache for AI Compliance Gap Analyzer.
+SQLite-backed key/value store with TTL expiry and size-bounded LRU eviction.
+
+All operations are fail-safe: a broken or locked cache file is logged and
+treated as a miss, never as an error in the pipeline.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+CACHE_DIR = os.getenv(
+    "CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation, and collapse whitespace so trivially different
+    phrasings ("GDPR Article 22 automated decisions?" vs "gdpr  article 22
+    automated decisions") share one cache key."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def make_key(*parts) -> str:
+    """Stable hash of any JSON-serialisable key parts."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """Thread-safe TTL + LRU cache persisted to CACHE_DIR/<name>.sqlite3.
+
+    Args:
+        name: Cache name (one SQLite file per cache)
+        ttl_sec: Entries older than this are treated as misses. 0 disables the cache.
+        max_entries: When exceeded, least-recently-used entries are evicted.
+    """
+
+    def __init__(self, name: str, ttl_sec: float, max_entries: int, cache_dir: str | None = None):
+        self.name = name
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.path = os.path.join(cache_dir or CACHE_DIR, f"{name}.sqlite3")
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_sec > 0 and self.max_entries > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Lazy-open the database on first use."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.execute(
+                "create table if not exists entries ("
+                " key text primary key,"
+                " value text not null,"
+                " created_at real not null,"
+                " accessed_at real not null)"
+            )
+            self._conn.execute("create index if not exists idx_entries_accessed on entries(accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str, allow_stale: bool = False):
+        """Return the cached value, or None on miss/expiry.
+
+        allow_stale=True ignores the TTL (used to degrade gracefully when the
+        upstream provider is down). Stale reads do not count as hits.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "select value, created_at from entries where key = ?", (key,)
+                ).fetchone()
+                fresh = row is not None and now - row[1] <= self.ttl_sec
+                if row is None or not (fresh or allow_stale):
+                    self.misses += 1
+                    return None
+                conn.execute("update entries set accessed_at = ? where key = ?", (now, key))
+                conn.commit()
+                if fresh:
+                    self.hits += 1
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ {self.name} cache read failed: {e}")
+            return None
+
+    def contains(self, key: str) -> bool:
+        """Whether key has a fresh entry — a probe that doesn't count as a hit or
+        miss and doesn't refresh the entry's LRU recency."""
+        if not self.enabled:
+            return False
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "select created_at from entries where key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ {self.name} cache read failed: {e}")
+            return False
+        return row is not None and time.time() - row[0] <= self.ttl_sec
+
+    def set(self, key: str, value) -> None:
+        """Store a JSON-serialisable value and evict LRU entries beyond max_entries."""
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "insert or replace into entries (key, value, created_at, accessed_at) values (?, ?, ?, ?)",
+                    (key, payload, now, now),
+                )
+                conn.execute(
+                    "delete from entries where key in ("
+                    " select key from entries order by accessed_at desc limit -1 offset ?)",
+                    (self.max_entries,),
+                )
+                conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"⚠️ {self.name} cache write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("delete from entries where key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ {self.name} cache delete failed: {e}")
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("delete from entries")
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ {self.name} cache clear failed: {e}")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus the current entry count."""
+        entries = 0
+        if self.enabled:
+            try:
+                with self._lock:
+                    entries = self._connect().execute("select count(*) from entries").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,279 @@
+"""
+Record/replay cassettes for AI Compliance Gap Analyzer.
+Captures every Claude and Tavily response to a JSONL file, then serves them
+back so a full run_analysis() can be reproduced without network access.
+
+Usage:
+    python agent.py fintech --record                     # live run, writes cassettes/fintech.jsonl
+    python agent.py fintech --replay                     # network-free, instant responses
+    python agent.py fintech --replay --simulate-latency  # network-free, original latencies
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+import anthropic
+
+import tools
+import ratelimit
+import search_policy
+from cache import make_key, normalize_text
+
+CASSETTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes")
+
+KIND_MESSAGES = "anthropic.messages.create"
+KIND_SEARCH = "tavily.search"
+
+
+class CassetteMissError(RuntimeError):
+    """Replay asked for a response the cassette doesn't contain."""
+
+
+def default_cassette_path(name: str) -> str:
+    return os.path.join(CASSETTE_DIR, f"{name}.jsonl")
+
+
+class Cassette:
+    """One JSONL file of recorded API interactions.
+
+    Each line: kind, key, request, response, latency_sec, recorded_at.
+
+    Replay looks up responses by exact request key first. If the request
+    changed (e.g. prompts.py was edited between versions), it falls back to
+    the same search query, then to the next unused response of that kind in
+    recorded order, so a cassette keeps working as a baseline across versions.
+    """
+
+    def __init__(self, path: str, mode: str, simulate_latency: bool = False, latency_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries = []
+        self._by_kind = {}
+        self._used = set()
+
+        if mode == "record":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            open(path, "w", encoding="utf-8").close()
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = [json.loads(line) for line in f if line.strip()]
+            for i, entry in enumerate(self._entries):
+                self._by_kind.setdefault(entry["kind"], deque()).append(i)
+            print(f"📼 Replaying {len(self._entries)} recorded responses from {path}")
+
+    @staticmethod
+    def request_key(kind: str, request: dict) -> str:
+        return make_key(kind, request)
+
+    def record(self, kind: str, request: dict, response, latency_sec: float, ttft_sec: float | None = None) -> None:
+        entry = {
+            "kind": kind,
+            "key": self.request_key(kind, request),
+            "request": request,
+            "response": response,
+            "latency_sec": round(latency_sec, 3),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if ttft_sec is not None:
+            entry["ttft_sec"] = round(ttft_sec, 3)
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def replay_entry(self, kind: str, request: dict) -> dict:
+        """Claim and return the full recorded entry for this request (no latency simulation)."""
+        key = self.request_key(kind, request)
+        with self._lock:
+            index = self._find(kind, key, request)
+            self._used.add(index)
+        return self._entries[index]
+
+    def replay(self, kind: str, request: dict):
+        """Return the recorded response for this request, sleeping for its latency if enabled."""
+        entry = self.replay_entry(kind, request)
+        if self.simulate_latency:
+            time.sleep(entry["latency_sec"] * self.latency_scale)
+        return entry["response"]
+
+    def _find(self, kind: str, key: str, request: dict) -> int:
+        candidates = [i for i in self._by_kind.get(kind, ()) if i not in self._used]
+        for i in candidates:
+            if self._entries[i]["key"] == key:
+                return i
+        if kind == KIND_SEARCH:
+            query = normalize_text(request.get("query", ""))
+            for i in candidates:
+                if normalize_text(self._entries[i]["request"].get("query", "")) == query:
+                    return i
+        if candidates:
+            print(f"⚠️ Cassette has no exact match for this {kind} request — serving next recorded response")
+            return candidates[0]
+        raise CassetteMissError(f"No recorded {kind} responses left in {self.path}")
+
+
+# ── Streaming ─────────────────────────────────────────────────────────────────
+
+class SyntheticStream:
+    """Replays a finished Claude message as a token stream.
+
+    Mimics the parts of anthropic's MessageStream the pipeline uses: context
+    manager, iteration over content_block_delta events, get_final_message().
+    The first chunk arrives after ttft_sec; the rest are spread evenly over
+    the remaining total_sec.
+    """
+
+    def __init__(self, message, ttft_sec: float = 0.0, total_sec: float = 0.0, chunk_chars: int = 40):
+        self.message = message
+        self.ttft_sec = ttft_sec
+        self.total_sec = max(total_sec, ttft_sec)
+        self.chunk_chars = chunk_chars
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        chunks = []
+        for block in self.message.content:
+            if block.type not in ("thinking", "text"):
+                continue
+            body = getattr(block, block.type)
+            for i in range(0, len(body), self.chunk_chars):
+                chunks.append((block.type, body[i:i + self.chunk_chars]))
+
+        gap = (self.total_sec - self.ttft_sec) / max(len(chunks) - 1, 1)
+        for i, (kind, piece) in enumerate(chunks):
+            pause = self.ttft_sec if i == 0 else gap
+            if pause > 0:
+                time.sleep(pause)
+            yield SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type=f"{kind}_delta", **{kind: piece}),
+            )
+
+    def get_final_message(self):
+        return self.message
+
+
+class _RecordingStream:
+    """Passes a live stream through and records its final message on completion."""
+
+    def __init__(self, manager, cassette: "Cassette", request: dict):
+        self._manager = manager
+        self._cassette = cassette
+        self._request = request
+        self._stream = None
+        self._t0 = None
+        self._first_token_at = None
+
+    def __enter__(self):
+        self._t0 = time.time()
+        self._stream = self._manager.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._manager.__exit__(*exc)
+
+    def __iter__(self):
+        for event in self._stream:
+            if self._first_token_at is None and event.type == "content_block_delta":
+                self._first_token_at = time.time()
+            yield event
+
+    def get_final_message(self):
+        message = self._stream.get_final_message()
+        ttft = self._first_token_at - self._t0 if self._first_token_at else None
+        self._cassette.record(KIND_MESSAGES, self._request, message.model_dump(mode="json"),
+                              time.time() - self._t0, ttft_sec=ttft)
+        return message
+
+
+# ── Client wrappers ───────────────────────────────────────────────────────────
+
+class _CassetteMessages:
+    def __init__(self, inner, cassette: Cassette):
+        self._inner = inner
+        self._cassette = cassette
+
+    def create(self, **kwargs):
+        if self._cassette.mode == "replay":
+            data = self._cassette.replay(KIND_MESSAGES, kwargs)
+            return anthropic.types.Message.model_validate(data)
+
+        t0 = time.time()
+        response = self._inner.create(**kwargs)
+        self._cassette.record(KIND_MESSAGES, kwargs, response.model_dump(mode="json"), time.time() - t0)
+        return response
+
+    def stream(self, **kwargs):
+        """Streamed and non-streamed calls share one kind, so either can replay the other."""
+        if self._cassette.mode == "record":
+            return _RecordingStream(self._inner.stream(**kwargs), self._cassette, kwargs)
+
+        entry = self._cassette.replay_entry(KIND_MESSAGES, kwargs)
+        message = anthropic.types.Message.model_validate(entry["response"])
+        if not self._cassette.simulate_latency:
+            return SyntheticStream(message)
+        scale = self._cassette.latency_scale
+        total = entry["latency_sec"] * scale
+        return SyntheticStream(message, ttft_sec=entry.get("ttft_sec", entry["latency_sec"]) * scale, total_sec=total)
+
+
+class CassetteAnthropic:
+    """Stands in for anthropic.Anthropic — only the messages API the pipeline uses."""
+
+    def __init__(self, inner, cassette: Cassette):
+        self.messages = _CassetteMessages(inner.messages if inner else None, cassette)
+
+
+class CassetteTavily:
+    """Stands in for TavilyClient.search()."""
+
+    def __init__(self, inner, cassette: Cassette):
+        self._inner = inner
+        self._cassette = cassette
+
+    def search(self, **kwargs):
+        if self._cassette.mode == "replay":
+            return self._cassette.replay(KIND_SEARCH, kwargs)
+
+        t0 = time.time()
+        response = self._inner.search(**kwargs)
+        self._cassette.record(KIND_SEARCH, kwargs, response, time.time() - t0)
+        return response
+
+
+def install(cassette: Cassette, agent_module) -> None:
+    """Route agent_module's Claude client and tools' Tavily client through the cassette.
+
+    agent_module is passed in (rather than imported) because agent.py may be
+    running as __main__. The search cache is bypassed so every search is
+    recorded and every replayed search is served from the cassette; the run
+    cache likewise, so a cached run never short-circuits the pipeline.
+    """
+    live = cassette.mode == "record"
+    agent_module.client = CassetteAnthropic(agent_module.client if live else None, cassette)
+    tools.tavily = CassetteTavily(tools.tavily if live else None, cassette)
+    tools.search_cache.ttl_sec = 0
+    agent_module.run_cache.ttl_sec = 0
+    # A hedge would record (or consume) a duplicate search.
+    tools.search_hedger.enabled = False
+    # Local citation history would change search parameters between record and replay.
+    search_policy.usefulness_store.ttl_sec = 0
+    if not live:
+        # Replayed calls never reach a provider.
+        ratelimit.anthropic_limiter.configure(0, 0)
+        ratelimit.tavily_limiter.configure(0, 0)
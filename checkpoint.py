@@ -0,0 +1,76 @@
+"""
+Run checkpoints for AI Compliance Gap Analyzer.
+Saves each finished pipeline step per run_id so a retry can resume where the run stopped.
+
+A failed analysis ("Research data was collected successfully. Please
+retry.") used to cost a full re-run: planning and every search again, 20+
+seconds and their API spend. With checkpoints, run_pipeline(run_id=...)
+saves the plan (queries, thinking, token usage) and the research (findings,
+search records) as each step finishes, and run_pipeline(resume_from=...)
+picks up at the first step that has no checkpoint.
+
+Only clean steps are saved — a fallback plan, research where no search
+came back, or research cut short by the deadline is redone on retry. A
+checkpoint is only used for the same inputs (agent._run_cache_key():
+inputs, prompts, MODEL_CONFIG and output settings), and is dropped once its
+run completes cleanly. Set CHECKPOINT_TTL_SEC=0 to disable.
+
+Agent Workflow:
+1. User Input
+2. Plan Research (Claude) → prompts.py, checkpoint.py ← THIS FILE (saved plan)
+3. Execute Research (Tavily) → research.py, checkpoint.py ← THIS FILE (saved findings)
+4. Analyze Findings (Claude) → prompts.py
+5. Output Report
+"""
+
+import os
+
+from cache import SQLiteCache
+
+# Steps that can be checkpointed, in pipeline order. Analysis is the last
+# step: once it succeeds there's nothing left to resume.
+CHECKPOINT_STEPS = ["planning", "research"]
+
+checkpoint_store = SQLiteCache(
+    "checkpoints",
+    ttl_sec=float(os.getenv("CHECKPOINT_TTL_SEC", str(24 * 3600))),
+    max_entries=int(os.getenv("CHECKPOINT_MAX_ENTRIES", "200")),
+)
+
+
+def save_step(run_id: str | None, inputs_key: str, step: str, data: dict) -> None:
+    """Save a finished step's artifacts (JSON-serialisable) under run_id. No-op without a run_id."""
+    if not run_id:
+        return
+    saved = checkpoint_store.get(run_id)
+    if saved is None or saved["inputs_key"] != inputs_key:
+        saved = {"inputs_key": inputs_key, "steps": {}}
+    saved["steps"][step] = data
+    checkpoint_store.set(run_id, saved)
+
+
+def load_steps(run_id: str | None, inputs_key: str) -> dict:
+    """The steps saved for run_id that a retry can skip.
+
+    Only the leading run of CHECKPOINT_STEPS counts — research saved
+    without its plan isn't resumable.
+
+    Returns:
+        dict of step -> saved data, in pipeline order ({} if there's no
+        checkpoint or it was made for different inputs)
+    """
+    saved = checkpoint_store.get(run_id) if run_id else None
+    if saved is None or saved["inputs_key"] != inputs_key:
+        return {}
+    steps = {}
+    for step in CHECKPOINT_STEPS:
+        if step not in saved["steps"]:
+            break
+        steps[step] = saved["steps"][step]
+    return steps
+
+
+def clear_checkpoint(run_id: str | None) -> None:
+    """Drop run_id's checkpoint — its run completed and won't be retried."""
+    if run_id:
+        checkpoint_store.delete(run_id)
@@ -0,0 +1,57 @@
+"""
+Run deadlines for AI Compliance Gap Analyzer.
+A run's time budget, visible to everything it calls.
+
+run_pipeline() starts one per run; retries, searches and Claude calls check
+how much is left through current(). The deadline lives in a context variable,
+so research worker threads (which run in copied contexts) see their run's
+deadline and no one else's.
+"""
+
+import os
+import time
+import contextvars
+
+# End-to-end budget for one analysis run, in seconds. 0 = no deadline (the
+# default: a run that hits its deadline returns a partial report, so it's
+# opt-in).
+RUN_DEADLINE_SEC = float(os.getenv("RUN_DEADLINE_SEC", "0"))
+
+_current = contextvars.ContextVar("run_deadline", default=None)
+
+
+class Deadline:
+    """A fixed point in (monotonic) time; seconds=0 or None never expires."""
+
+    def __init__(self, seconds: float | None):
+        self.seconds = seconds or 0.0
+        self._start = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def remaining(self) -> float:
+        if not self.seconds:
+            return float("inf")
+        return max(0.0, self.seconds - self.elapsed())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def start(seconds: float | None = None) -> Deadline:
+    """Start a deadline for the current run (defaults to RUN_DEADLINE_SEC) and return it."""
+    deadline = Deadline(RUN_DEADLINE_SEC if seconds is None else seconds)
+    _current.set(deadline)
+    return deadline
+
+
+def current() -> Deadline | None:
+    """The current run's deadline, or None outside a run."""
+    return _current.get()
+
+
+def remaining() -> float:
+    """Seconds left in the current run (infinite outside a run)."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else float("inf")
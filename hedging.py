@@ -0,0 +1,238 @@
+"""
+Request hedging for AI Compliance Gap Analyzer.
+Races a duplicate Tavily search when the first one is running unusually long.
+
+Search latency has a long tail: most searches return in a couple of seconds,
+a few take several times that. With hedging on, a search that hasn't
+returned within the HEDGE_PERCENTILE-th percentile of recent search
+latencies gets a second, identical request, and whichever answers first
+wins. Only the slow tail is duplicated, and a budget caps the extra requests
+at HEDGE_MAX_RATE per search.
+
+The percentile comes from a rolling in-process histogram of the last
+HEDGE_WINDOW search latencies; no hedging happens until it holds
+HEDGE_MIN_SAMPLES of them.
+
+Settings:
+    SEARCH_HEDGING     1 to enable (default off)
+    HEDGE_PERCENTILE   latency percentile that triggers a hedge (default 90)
+    HEDGE_MAX_RATE     extra requests allowed per search (default 0.1 = 10%)
+    HEDGE_WINDOW       recent latencies kept in the histogram (default 200)
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait, TimeoutError as FutureTimeout
+
+SEARCH_HEDGING = os.getenv("SEARCH_HEDGING", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", "0.1"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+HEDGE_MIN_SAMPLES = 20
+# Unused hedge budget that can be banked, so a burst of slow searches after a
+# quiet spell can still be hedged — but not more than this many at once.
+HEDGE_BURST = 3
+
+
+class LatencyHistogram:
+    """The most recent `window` latencies, in seconds."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def record(self, sec: float) -> None:
+        with self._lock:
+            self._samples.append(sec)
+
+    def percentile(self, p: float) -> float | None:
+        """Nearest-rank p-th percentile (0–100), or None while empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(p / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+
+class Hedger:
+    """Hedged calls for one provider, with a rolling latency histogram and a hedge budget.
+
+    Each call adds max_rate to the budget (up to HEDGE_BURST) and each hedge
+    spends 1, so over time hedges stay at or below max_rate × calls.
+    """
+
+    def __init__(self, name: str, enabled: bool = False, percentile: float = 90.0,
+                 max_rate: float = 0.1, window: int = 200, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.histogram = LatencyHistogram(window)
+        self._lock = threading.Lock()
+        self._budget = 0.0
+        self._calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging, or None if this call won't be hedged."""
+        if not self.enabled or self.max_rate <= 0 or len(self.histogram) < self.min_samples:
+            return None
+        return self.histogram.percentile(self.percentile)
+
+    def _start_thread(self, fn) -> Future:
+        """Run fn() on a thread of its own, starting now, and return its Future.
+
+        Not a shared pool: under concurrent runs a queued primary would spend
+        its hedge delay waiting for a worker and trigger a spurious hedge.
+        The caller's research worker is blocked meanwhile, so this adds at
+        most two threads per in-flight search.
+        """
+        future = Future()
+        # Copied context: Langfuse spans and per-run state follow the call.
+        context = contextvars.copy_context()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(context.run(fn))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"{self.name}-hedge", daemon=True).start()
+        return future
+
+    def _start_call(self) -> float | None:
+        """Count a call, top up the hedge budget, and return hedge_delay()."""
+        with self._lock:
+            self._calls += 1
+            self._budget = min(HEDGE_BURST, self._budget + self.max_rate)
+        return self.hedge_delay()
+
+    def _take_hedge(self, delay: float) -> bool:
+        """Spend one hedge from the budget, if there is one."""
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self._hedges += 1
+        print(f"⏱️ {self.name} call slower than p{self.percentile:g} ({delay:.1f}s) — sending a hedge request")
+        return True
+
+    def _timed(self, fn, t0: float):
+        """fn, recording its latency since t0 — when the call started, so the
+        histogram measures what hedge_delay() is compared against."""
+        def run():
+            result = fn()
+            self.histogram.record(time.monotonic() - t0)
+            return result
+        return run
+
+    def call(self, fn, hedge_fn=None) -> tuple:
+        """Call fn(); if it outlasts hedge_delay(), race hedge_fn() (default fn) against it.
+
+        Only fn's latencies feed the histogram — a primary that loses the race
+        is still timed when it finishes, so the tail stays visible. If the first
+        call to finish failed, the other one's result is used; if both failed,
+        the first error is raised.
+
+        Returns:
+            (result, hedged) — hedged is True if a duplicate request was sent
+        """
+        delay = self._start_call()
+        t0 = time.monotonic()
+        if delay is None:
+            return self._timed(fn, t0)(), False
+
+        primary = self._start_thread(self._timed(fn, t0))
+        try:
+            return primary.result(timeout=delay), False
+        except FutureTimeout:
+            pass
+
+        if not self._take_hedge(delay):
+            return primary.result(), False
+
+        hedge = self._start_thread(hedge_fn or fn)
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        first = primary if primary in done else hedge
+        other = hedge if first is primary else primary
+        if first.exception() is not None and other.exception() is None:
+            first = other
+        if first is hedge and first.exception() is None:
+            with self._lock:
+                self._hedge_wins += 1
+        return first.result(), True
+
+    async def call_async(self, fn, hedge_fn=None) -> tuple:
+        """call() for coroutine functions (fn and hedge_fn return awaitables).
+
+        Unlike call(), the losing request is cancelled — it ties up no thread.
+        A cancelled primary is recorded at its elapsed time, a lower bound on
+        its latency.
+        """
+        delay = self._start_call()
+        t0 = time.monotonic()
+
+        async def timed_primary():
+            result = await fn()
+            self.histogram.record(time.monotonic() - t0)
+            return result
+
+        if delay is None:
+            return await timed_primary(), False
+
+        primary = asyncio.ensure_future(timed_primary())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._take_hedge(delay):
+            return await primary, False
+
+        hedge = asyncio.ensure_future((hedge_fn or fn)())
+        done, _ = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+        first = primary if primary in done else hedge
+        other = hedge if first is primary else primary
+        if first.exception() is not None:
+            await asyncio.wait({other})
+            if other.exception() is None:
+                first = other
+        elif not other.done():
+            other.cancel()
+            if other is primary:
+                self.histogram.record(time.monotonic() - t0)
+        if first is hedge and first.exception() is None:
+            with self._lock:
+                self._hedge_wins += 1
+        return first.result(), True
+
+    def stats(self) -> dict:
+        """Process-lifetime counters: calls, hedges, hedge_rate, hedge_wins, hedge_delay_sec."""
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "hedges": self._hedges,
+                "hedge_rate": round(self._hedges / self._calls, 3) if self._calls else 0.0,
+                "hedge_wins": self._hedge_wins,
+                "hedge_delay_sec": round(delay, 2) if delay is not None else None,
+            }
+
+
+search_hedger = Hedger(
+    "tavily",
+    enabled=SEARCH_HEDGING,
+    percentile=HEDGE_PERCENTILE,
+    max_rate=HEDGE_MAX_RATE,
+    window=HEDGE_WINDOW,
+)
@@ -0,0 +1,131 @@
+"""
+Passage extraction for AI Compliance Gap Analyzer
+Picks the sentences of each search result most relevant to the query and use case.
+
+Agent Workflow:
+1. User Input
+2. Plan Research (Claude) → prompts.py
+3. Execute Research (Tavily) → research.py, tools.py, passages.py ← THIS FILE (trim results)
+4. Analyze Findings (Claude) → prompts.py
+5. Output Report
+"""
+
+import os
+import re
+import math
+from collections import Counter
+
+from cache import normalize_text
+
+# Characters of content kept per search result. The old fixed cut was the
+# first 500 characters; ranked passages carry more signal in less space.
+PASSAGE_CHAR_BUDGET = int(os.getenv("PASSAGE_CHAR_BUDGET", "400"))
+
+# How much use-case terms count relative to query terms when scoring sentences.
+CONTEXT_WEIGHT = 0.5
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "and", "or", "of", "for", "in", "on", "to", "with", "by",
+    "is", "are", "what", "how", "does", "do", "under", "about", "vs",
+    "be", "as", "at", "from", "that", "this", "it", "its", "was", "were", "will",
+    "can", "may", "has", "have", "not", "which", "their", "they", "than",
+})
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Normalized, stopword-free tokens."""
+    return [t for t in normalize_text(text).split() if t not in STOPWORDS]
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_BREAK.split(text or "") if s.strip()]
+
+
+class BM25:
+    """Okapi BM25 over a small in-memory corpus (here: the sentences of one search)."""
+
+    def __init__(self, documents: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_freqs = [Counter(doc) for doc in documents]
+        self.doc_lens = [len(doc) for doc in documents]
+        self.avg_len = (sum(self.doc_lens) / len(documents)) if documents else 0.0
+        df = Counter(term for doc in documents for term in set(doc))
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def score(self, index: int, terms: dict[str, float]) -> float:
+        """Score document `index` against weighted query terms."""
+        freqs = self.doc_freqs[index]
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lens[index] / (self.avg_len or 1))
+        total = 0.0
+        for term, weight in terms.items():
+            tf = freqs.get(term)
+            if tf:
+                total += weight * self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return total
+
+
+def _query_terms(query: str, context: str) -> dict[str, float]:
+    terms = {t: CONTEXT_WEIGHT for t in tokenize(context)}
+    terms.update({t: 1.0 for t in tokenize(query)})
+    return terms
+
+
+def extract_passages(contents: list[str], query: str, context: str = "",
+                     budget_chars: int | None = None) -> list[str]:
+    """Trim each content string to its most relevant sentences.
+
+    Sentences from all contents are scored together with BM25 against the
+    query (and, at lower weight, the context — the use case), so term rarity
+    is judged across the whole search. Each content keeps its best sentences
+    that fit in budget_chars, in their original order, joined with " … ".
+    Sentences matching no term are never picked. Content already within
+    budget, or with no matching sentence, falls back to a plain cut.
+
+    Args:
+        contents: Raw content strings, one per search result
+        query: The search query
+        context: Extra relevance terms, e.g. the use case
+        budget_chars: Per-result character budget (defaults to PASSAGE_CHAR_BUDGET)
+
+    Returns:
+        One passage string per input content
+    """
+    budget = PASSAGE_CHAR_BUDGET if budget_chars is None else budget_chars
+    sentences = [split_sentences(content) for content in contents]
+    flat = [tokenize(s) for group in sentences for s in group]
+    bm25 = BM25(flat)
+    terms = _query_terms(query, context)
+
+    passages = []
+    offset = 0
+    for content, group in zip(contents, sentences):
+        indices = range(offset, offset + len(group))
+        offset += len(group)
+        if len(content) <= budget:
+            passages.append(content)
+            continue
+
+        scores = {i: bm25.score(i, terms) for i in indices}
+        # Stable sort: ties keep document order, so lead sentences win ties.
+        ranked = sorted((i for i in indices if scores[i] > 0), key=scores.get, reverse=True)
+        if not ranked:
+            # Nothing matches — fall back to the lead, as the fixed cut did.
+            passages.append(content[:budget])
+            continue
+        chosen, used = [], 0
+        for i in ranked:
+            sentence = group[i - indices.start]
+            cost = len(sentence) + (3 if chosen else 0)
+            if used + cost <= budget:
+                chosen.append(i)
+                used += cost
+        if not chosen:
+            # Best sentence alone is over budget — keep its start.
+            passages.append(group[ranked[0] - indices.start][:budget])
+            continue
+        passages.append(" … ".join(group[i - indices.start] for i in sorted(chosen)))
+    return passages
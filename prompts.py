@@ -20,13 +20,14 @@ You have access to web search tools to find current information about regulation
 Be specific, cite sources, and focus on actionable insights."""
 
 
-# AI task 1 - Plan Research
-SEARCH_PLANNING_PROMPT = """
-Given this AI implementation scenario:
+# Prompt caching: each task is split into static INSTRUCTIONS (sent as a
+# cacheable system block, identical on every run) and a per-run PROMPT with the
+# user's inputs and research findings, which always comes last.
 
-USE CASE: {use_case}
-TECHNOLOGY: {technology}
-INDUSTRY: {industry}
+
+# AI task 1 - Plan Research
+SEARCH_PLANNING_INSTRUCTIONS = """
+You will be given an AI implementation scenario (use case, technology, industry).
 
 What 3-5 searches should I run to identify compliance requirements and vendor policies?
 
@@ -46,17 +47,20 @@ Focus on:
 - The specific technology vendor's data policies
 - Recent compliance guidance or enforcement actions"""
 
-
-
-# AI task 2 - Analyze Findings
-ANALYSIS_PROMPT = """
-Based on the following information, analyze the compliance gaps:
+SEARCH_PLANNING_PROMPT = """
+Given this AI implementation scenario:
 
 USE CASE: {use_case}
 TECHNOLOGY: {technology}
 INDUSTRY: {industry}
 
-RESEARCH FINDINGS: {research_findings}
+Plan the searches as instructed."""
+
+
+
+# AI task 2 - Analyze Findings
+ANALYSIS_INSTRUCTIONS = """
+You will be given an AI use case, technology, industry and web research findings.
 
 Write a concise, scannable compliance gap report. Busy founders will read this —
 every sentence must earn its place. Aim for clarity and actionability over exhaustiveness.
@@ -156,4 +160,44 @@ to review first, and an encouraging closing note. No sub-headers.
 - Be specific and cite research findings, but stay concise
 - Total report length: aim for 150–250 lines of markdown"""
 
+ANALYSIS_PROMPT = """
+Based on the following information, analyze the compliance gaps:
+
+USE CASE: {use_case}
+TECHNOLOGY: {technology}
+INDUSTRY: {industry}
+
+RESEARCH FINDINGS: {research_findings}
+
+Write the compliance gap report following the format and rules above."""
+
+
+# Sharded analysis (SHARDED_ANALYSIS=1, see sections.py): same instructions,
+# but each call writes only some sections. The gap matrix comes first and is
+# passed to the calls that write the rest.
+GAP_MATRIX_PROMPT = """
+Based on the following information, analyze the compliance gaps:
+
+USE CASE: {use_case}
+TECHNOLOGY: {technology}
+INDUSTRY: {industry}
+
+RESEARCH FINDINGS: {research_findings}
+
+Write ONLY the "### 1. Compliance Gap Matrix" section of the report, following
+the format and rules above. The other sections are written separately."""
+
+REPORT_SECTION_PROMPT = """
+Based on the following information, analyze the compliance gaps:
+
+USE CASE: {use_case}
+TECHNOLOGY: {technology}
+INDUSTRY: {industry}
+
+RESEARCH FINDINGS: {research_findings}
+
+COMPLIANCE GAP MATRIX (already written — use exactly these gaps, risk levels and priorities):
+{gap_matrix}
 
+Write ONLY these sections of the report, each under its `###` header, following
+the format and rules above: {sections}. The other sections are written separately."""
@@ -0,0 +1,140 @@
+"""
+Process-wide rate limiting for AI Compliance Gap Analyzer.
+Token buckets in front of every Claude and Tavily call.
+
+Every Streamlit session runs in the same process, so a burst of visitors
+multiplies API calls. Each provider gets token buckets for requests/min and
+tokens/min; a call that would exceed either waits its turn (FIFO) instead of
+drawing a 429 and retrying.
+
+Limits (0 disables a bucket):
+    ANTHROPIC_RPM / ANTHROPIC_TPM   requests and input tokens per minute
+    TAVILY_RPM / TAVILY_CREDITS_PER_MIN   requests and API credits per minute
+                                          (advanced search = 2 credits)
+"""
+
+import os
+import time
+import asyncio
+import threading
+import contextvars
+
+# Per-run wait accumulator — set by start_run(); search workers inherit it
+# through their copied contexts.
+_run_waits = contextvars.ContextVar("ratelimit_run_waits", default=None)
+
+
+class TokenBucket:
+    """Refills at rate_per_min, holds at most one minute's worth.
+
+    reserve() debits immediately — the balance may go negative — and returns
+    how long the caller must wait for the debt to be repaid. Later callers
+    queue behind earlier ones, so waits are FIFO without a condition variable.
+    """
+
+    def __init__(self, rate_per_min: float):
+        self.rate_per_min = rate_per_min
+        self.capacity = rate_per_min
+        self._tokens = rate_per_min
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_min > 0
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Debit amount and return seconds to wait before using it (0 if available now)."""
+        if not self.enabled or amount <= 0:
+            return 0.0
+        # A single request larger than the bucket would otherwise wait forever.
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_min / 60)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * 60 / self.rate_per_min
+
+
+class ProviderLimiter:
+    """Requests/min and tokens/min buckets for one API provider."""
+
+    def __init__(self, name: str, requests_per_min: float = 0, tokens_per_min: float = 0):
+        self.name = name
+        self._lock = threading.Lock()
+        self.configure(requests_per_min, tokens_per_min)
+
+    def configure(self, requests_per_min: float, tokens_per_min: float) -> None:
+        """Replace the buckets (0 disables one). Used by the benchmark and replay."""
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        with self._lock:
+            self._calls = 0
+            self._waits = 0
+            self._wait_sec = 0.0
+            self._max_wait_sec = 0.0
+
+    def reserve(self, tokens: float = 0) -> float:
+        """Reserve capacity for one call. Returns seconds to wait (doesn't sleep)."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            self._calls += 1
+            if wait > 0:
+                self._waits += 1
+                self._wait_sec += wait
+                self._max_wait_sec = max(self._max_wait_sec, wait)
+        run_waits = _run_waits.get()
+        if run_waits is not None and wait > 0:
+            run_waits[self.name] = run_waits.get(self.name, 0.0) + wait
+        return wait
+
+    def acquire(self, tokens: float = 0) -> float:
+        """Block until one call of `tokens` fits under the limits. Returns seconds waited."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            if wait >= 0.5:
+                print(f"⏳ {self.name} rate limit: queued {wait:.1f}s")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 0) -> float:
+        """acquire() for async callers: waits with asyncio.sleep instead of blocking."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            if wait >= 0.5:
+                print(f"⏳ {self.name} rate limit: queued {wait:.1f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> dict:
+        """Process-lifetime counters: calls, waits, wait_sec, max_wait_sec."""
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "waits": self._waits,
+                "wait_sec": round(self._wait_sec, 2),
+                "max_wait_sec": round(self._max_wait_sec, 2),
+            }
+
+
+def start_run() -> dict:
+    """Begin collecting rate-limit waits (seconds per provider) for the current run."""
+    waits = {}
+    _run_waits.set(waits)
+    return waits
+
+
+anthropic_limiter = ProviderLimiter(
+    "anthropic",
+    requests_per_min=float(os.getenv("ANTHROPIC_RPM", "50")),
+    tokens_per_min=float(os.getenv("ANTHROPIC_TPM", "30000")),
+)
+
+tavily_limiter = ProviderLimiter(
+    "tavily",
+    requests_per_min=float(os.getenv("TAVILY_RPM", "100")),
+    tokens_per_min=float(os.getenv("TAVILY_CREDITS_PER_MIN", "0")),
+)
@@ -0,0 +1,692 @@
+"""
+Concurrent research engine for AI Compliance Gap Analyzer
+Fans planned queries out to search_web() on a bounded worker pool.
+
+Agent Workflow:
+1. User Input
+2. Plan Research (Claude) → prompts.py
+3. Execute Research (Tavily) → research.py ← THIS FILE (fan-out), tools.py (single search)
+4. Analyze Findings (Claude) → prompts.py
+5. Output Report
+"""
+
+import os
+import json
+import asyncio
+import math
+import time
+import hashlib
+import threading
+import contextvars
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait, TimeoutError as FutureTimeout
+
+import deadline
+import search_policy
+from cache import normalize_text
+from passages import tokenize
+from tools import search_web, search_web_async, format_search_results
+
+# Max searches in flight at once. Planning asks for 3–5 queries, so the default
+# runs a typical plan fully in parallel. Lower it if Tavily starts returning 429s.
+RESEARCH_CONCURRENCY = int(os.getenv("RESEARCH_CONCURRENCY", "5"))
+
+# Planned queries at or above this similarity (0–1, see query_similarity) are
+# searched once. Rephrasings of one question score ~0.7–0.9, distinct questions
+# on the same regulation ~0.3. Set to 1 to merge only identical queries.
+QUERY_DEDUP_THRESHOLD = float(os.getenv("QUERY_DEDUP_THRESHOLD", "0.65"))
+
+# Estimated-token cap on research_findings in the analysis prompt. A typical
+# 5-query run is ~2.5k tokens; lower it to trade evidence for analysis
+# latency and cost under load. 0 = no cap.
+FINDINGS_TOKEN_BUDGET = int(os.getenv("FINDINGS_TOKEN_BUDGET", "6000"))
+
+# Quorum mode: research ends once this fraction of searches has finished, or
+# RESEARCH_DEADLINE_SEC after the research step starts, whichever is first.
+# Searches still running are left behind as stragglers (logged, not waited
+# for), so one slow Tavily call can't hold up analysis. 0 = wait for all.
+RESEARCH_QUORUM = float(os.getenv("RESEARCH_QUORUM", "0"))
+RESEARCH_DEADLINE_SEC = float(os.getenv("RESEARCH_DEADLINE_SEC", "20"))
+
+
+class ResearchEngine:
+    """Run search_web() calls on a bounded thread pool.
+
+    Queries are submitted one at a time (so callers can start searching before
+    the full query list is known) and results() always returns them in
+    submission order, regardless of which search finished first.
+    Retries stay inside search_web() — each worker owns one query end to end.
+    context (the use case) is passed to search_web() for passage ranking.
+    Depth and result count per search come from search_policy.choose(), with
+    max_results as the baseline count.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_results: int = 3, context: str = ""):
+        self.max_workers = max_workers or RESEARCH_CONCURRENCY
+        self.max_results = max_results
+        self.context = context
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="research")
+        self._queries = []
+        self._futures = []
+        self._submitted_at = []
+        self._speculative = set()
+        self._planned = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def queries(self) -> list[str]:
+        """Queries submitted so far, in submission order."""
+        return list(self._queries)
+
+    def submit(self, query: str, speculative: bool = False) -> int:
+        """Queue a search. Returns its position in the results list.
+
+        speculative marks searches started before the plan asked for them;
+        their records carry speculative=True.
+        """
+        # Copy the caller's context so Langfuse spans opened inside the worker
+        # nest under the caller's trace instead of starting a new one.
+        ctx = contextvars.copy_context()
+        rank = None if speculative else self._planned
+        if not speculative:
+            self._planned += 1
+        self._futures.append(self._pool.submit(ctx.run, self._timed_search, query, rank))
+        self._queries.append(query)
+        self._submitted_at.append(time.time())
+        if speculative:
+            self._speculative.add(len(self._queries) - 1)
+        return len(self._queries) - 1
+
+    def skip(self, query: str) -> int:
+        """Record a query without searching it (e.g. no time left). It shows up in
+        results() with skipped=True."""
+        future = Future()
+        future.set_result(({"results": [], "skipped": True, "error": "skipped: out of time"}, 0.0))
+        self._futures.append(future)
+        self._queries.append(query)
+        self._submitted_at.append(time.time())
+        return len(self._queries) - 1
+
+    def _timed_search(self, query: str, rank: int | None) -> tuple[dict, float]:
+        t0 = time.time()
+        plan = search_policy.choose(query, rank, deadline.remaining(), max_results=self.max_results)
+        response = search_web(query, max_results=plan["max_results"], search_depth=plan["search_depth"],
+                              context=self.context)
+        return {**response, "policy": plan}, round(time.time() - t0, 2)
+
+    def wait_for(self, quorum: int, timeout: float | None = None) -> int:
+        """Block until at least `quorum` searches are done or timeout passes.
+        Returns how many are done."""
+        pending = [future for future in self._futures if not future.done()]
+        done_count = len(self._futures) - len(pending)
+        wait_until = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        while done_count < quorum and pending:
+            remaining = None if wait_until is None else wait_until - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            done_count += len(done)
+        return done_count
+
+    def results(self, timeout: float | None = None, stragglers: "StragglerLog | None" = None) -> list[dict]:
+        """Wait for every submitted search and return one record per query, in order.
+
+        Args:
+            timeout: Overall seconds to wait. Searches still unfinished then are
+                given up on — cancelled if not started, otherwise left to finish
+                unobserved — and recorded with skipped=True.
+            stragglers: In quorum mode, unfinished searches are handed to this
+                log instead of being cancelled, and their records also carry
+                straggler=True.
+
+        Each record has keys: query, results, latency_sec, cached, speculative,
+        policy (search_policy.choose() decision), stale if served from expired
+        cache, skipped, hedged, and error if the search failed.
+        """
+        wait_until = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        searches = []
+        for i, (query, future) in enumerate(zip(self._queries, self._futures)):
+            try:
+                response, latency_sec = future.result(
+                    timeout=None if wait_until is None else max(0.0, wait_until - time.monotonic())
+                )
+            except FutureTimeout:
+                searches.append(_unfinished_record(query, future, self._submitted_at[i],
+                                                   i in self._speculative, stragglers))
+                continue
+            searches.append(_search_record(query, response, latency_sec, i in self._speculative))
+        return searches
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _search_record(query: str, response: dict, latency_sec: float, speculative: bool) -> dict:
+    record = {
+        "query": query,
+        "results": response.get("results", []),
+        "latency_sec": latency_sec,
+        "cached": response.get("cached", False),
+        "speculative": speculative,
+    }
+    for flag in ("stale", "skipped", "hedged"):
+        if response.get(flag):
+            record[flag] = True
+    if "policy" in response:
+        record["policy"] = response["policy"]
+    if "error" in response:
+        record["error"] = response["error"]
+    return record
+
+
+def _unfinished_record(query: str, future, submitted_at: float, speculative: bool,
+                       stragglers: "StragglerLog | None") -> dict:
+    """Record for a search results() stopped waiting for: handed to stragglers, or cancelled."""
+    record = {
+        "query": query,
+        "results": [],
+        "latency_sec": round(time.time() - submitted_at, 2),
+        "cached": False,
+        "speculative": speculative,
+        "skipped": True,
+    }
+    if stragglers is not None:
+        stragglers.watch(query, future)
+        record["straggler"] = True
+        record["error"] = "skipped: straggler (quorum reached)"
+    else:
+        future.cancel()
+        record["error"] = "skipped: out of time"
+    return record
+
+
+class AsyncResearchEngine:
+    """ResearchEngine for the asyncio pipeline (agent_async.py).
+
+    Searches are search_web_async() tasks on the running event loop, at most
+    max_workers in flight at once (a semaphore in place of the thread pool).
+    Same interface and records as ResearchEngine, except that wait_for() and
+    results() are coroutines. Tasks copy the caller's context when created,
+    so Langfuse spans nest and the run deadline applies as in the sync engine.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_results: int = 3, context: str = ""):
+        self.max_workers = max_workers or RESEARCH_CONCURRENCY
+        self.max_results = max_results
+        self.context = context
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._queries = []
+        self._tasks = []
+        self._submitted_at = []
+        self._speculative = set()
+        self._started = set()
+        self._planned = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    @property
+    def queries(self) -> list[str]:
+        """Queries submitted so far, in submission order."""
+        return list(self._queries)
+
+    def submit(self, query: str, speculative: bool = False) -> int:
+        """Start a search task. Returns its position in the results list."""
+        rank = None if speculative else self._planned
+        if not speculative:
+            self._planned += 1
+        i = len(self._queries)
+        self._tasks.append(asyncio.create_task(self._timed_search(i, query, rank)))
+        self._queries.append(query)
+        self._submitted_at.append(time.time())
+        if speculative:
+            self._speculative.add(i)
+        return i
+
+    def skip(self, query: str) -> int:
+        """Record a query without searching it; it shows up in results() with skipped=True."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(({"results": [], "skipped": True, "error": "skipped: out of time"}, 0.0))
+        self._tasks.append(future)
+        self._queries.append(query)
+        self._submitted_at.append(time.time())
+        return len(self._queries) - 1
+
+    async def _timed_search(self, i: int, query: str, rank: int | None) -> tuple[dict, float]:
+        async with self._slots:
+            self._started.add(i)
+            t0 = time.time()
+            # search_policy reads its SQLite history; keep that off the event loop.
+            plan = await asyncio.to_thread(search_policy.choose, query, rank, deadline.remaining(),
+                                           max_results=self.max_results)
+            response = await search_web_async(query, max_results=plan["max_results"],
+                                              search_depth=plan["search_depth"], context=self.context)
+            return {**response, "policy": plan}, round(time.time() - t0, 2)
+
+    async def wait_for(self, quorum: int, timeout: float | None = None) -> int:
+        """Wait until at least `quorum` searches are done or timeout passes. Returns how many are done."""
+        pending = {task for task in self._tasks if not task.done()}
+        done_count = len(self._tasks) - len(pending)
+        wait_until = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        while done_count < quorum and pending:
+            remaining = None if wait_until is None else wait_until - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            done_count += len(done)
+        return done_count
+
+    async def results(self, timeout: float | None = None, stragglers: "StragglerLog | None" = None) -> list[dict]:
+        """Wait for every search and return one record per query, in order (see ResearchEngine.results)."""
+        pending = [task for task in self._tasks if not task.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=None if timeout is None else max(0.0, timeout))
+        searches = []
+        for i, (query, task) in enumerate(zip(self._queries, self._tasks)):
+            if not task.done():
+                searches.append(_unfinished_record(query, task, self._submitted_at[i],
+                                                   i in self._speculative, stragglers))
+                continue
+            response, latency_sec = task.result()
+            searches.append(_search_record(query, response, latency_sec, i in self._speculative))
+        return searches
+
+    def close(self) -> None:
+        """Cancel searches still queued for a slot; running ones (stragglers) finish on their own."""
+        for i, task in enumerate(self._tasks):
+            if i not in self._started and not task.done():
+                task.cancel()
+
+
+class StragglerLog:
+    """Searches that quorum mode stopped waiting for, and what waiting would have cost.
+
+    Stragglers keep running (their results still reach the search cache) and
+    each one logs when it finishes. The given report dict is kept current:
+    stragglers (queries), finished, cancelled (never started — dropped when
+    the engine closed) and saved_sec, how much longer research would have
+    taken waiting for all of them. saved_sec is a lower bound until every
+    straggler has finished.
+    """
+
+    def __init__(self, report: dict):
+        self.cutoff = time.monotonic()
+        self.report = report
+        report.update({"stragglers": [], "finished": 0, "cancelled": 0, "saved_sec": 0.0})
+        self._lock = threading.Lock()
+
+    def watch(self, query: str, future) -> None:
+        """Track a search still running: a concurrent Future or an asyncio task."""
+        self.report["stragglers"].append(query)
+        future.add_done_callback(lambda f: self._done(query, f))
+
+    def _done(self, query: str, future) -> None:
+        late = time.monotonic() - self.cutoff
+        with self._lock:
+            if future.cancelled():
+                self.report["cancelled"] += 1
+                return
+            self.report["finished"] += 1
+            self.report["saved_sec"] = max(self.report["saved_sec"], round(late, 1))
+        print(f"🐢 Straggler finished {late:.1f}s after research moved on: {query}")
+
+
+def quorum_size(num_searches: int, fraction: float) -> int:
+    """Searches research waits for in quorum mode: ceil(fraction × n), at least 1."""
+    return max(1, min(num_searches, math.ceil(num_searches * fraction - 1e-9)))
+
+
+def query_shingles(query: str) -> set[str]:
+    """Character trigrams of each non-stopword token, padded at word boundaries.
+
+    Word order is ignored and plural/inflected forms share most trigrams, so
+    "GDPR automated decisions" and "automated decision-making GDPR" overlap heavily.
+    """
+    shingles = set()
+    for token in tokenize(query):
+        padded = f" {token} "
+        shingles.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return shingles
+
+
+def _jaccard(a: set, b: set) -> float:
+    union = a | b
+    return len(a & b) / len(union) if union else 0.0
+
+
+def query_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of two queries' shingle sets (0 = disjoint, 1 = same)."""
+    return _jaccard(query_shingles(a), query_shingles(b))
+
+
+class QueryDeduper:
+    """Collapse near-duplicate queries before they cost a search call.
+
+    Queries are offered one at a time in plan order (streamed or not); the
+    first phrasing of a question is kept and later near-duplicates map onto it.
+    Merges are logged and kept in .merges for the run result.
+    """
+
+    def __init__(self, threshold: float | None = None):
+        self.threshold = QUERY_DEDUP_THRESHOLD if threshold is None else threshold
+        self.merges = []
+        self._kept = []
+        self._merged = {}
+
+    def add(self, query: str) -> str | None:
+        """Offer a query. Returns None if it's new (and now kept), else the kept query it maps to.
+
+        Offering the same query again (streamed, then in the final plan) is a no-op.
+        """
+        if query in self._merged:
+            return self._merged[query]
+        shingles = query_shingles(query)
+        best, best_score = None, 0.0
+        for kept, kept_shingles in self._kept:
+            if kept == query:
+                return kept
+            score = _jaccard(shingles, kept_shingles)
+            if score > best_score:
+                best, best_score = kept, score
+        if best is not None and best_score >= self.threshold:
+            self._merged[query] = best
+            self.merges.append({"query": query, "merged_into": best, "similarity": round(best_score, 2)})
+            print(f"🔗 Merged query \"{query}\" into \"{best}\" (similarity {best_score:.2f})")
+            return best
+        self._kept.append((query, shingles))
+        return None
+
+    def dedupe(self, queries: list[str]) -> list[str]:
+        """Map each query onto its kept phrasing; returns the distinct kept queries in order."""
+        return list(dict.fromkeys(self.add(query) or query for query in queries))
+
+
+class QueryStreamParser:
+    """Pull query strings out of a streamed search plan as soon as each one closes.
+
+    The planning reply is a JSON array of strings, possibly with prose around
+    it. feed() takes raw text deltas and returns the strings of the first
+    top-level array completed so far, so searches can start before the plan
+    finishes. Anything nested deeper, and everything after the closing ']',
+    is ignored — plan_searches() still parses the full reply as the final word.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._literal = []
+        self._done = False
+
+    def feed(self, text: str) -> list[str]:
+        """Consume a text delta. Returns queries completed within it, in order."""
+        queries = []
+        for ch in text:
+            if self._done:
+                break
+            if self._in_string:
+                self._literal.append(ch)
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        try:
+                            query = json.loads("".join(self._literal))
+                        except json.JSONDecodeError:
+                            query = None
+                        if isinstance(query, str) and query.strip():
+                            queries.append(query)
+                continue
+            if ch == "[":
+                self._depth += 1
+            elif ch == "]" and self._depth > 0:
+                self._depth -= 1
+                self._done = self._depth == 0
+            elif ch == '"' and self._depth > 0:
+                self._in_string = True
+                self._literal = ['"']
+        return queries
+
+
+def research_makespan(latencies: list[float], workers: int | None = None) -> float:
+    """Time a batch of searches takes when all are queued at once on `workers` slots.
+
+    Used to estimate what research would have cost had it started only after
+    planning finished.
+    """
+    slots = [0.0] * max(1, workers or RESEARCH_CONCURRENCY)
+    for latency in latencies:
+        i = slots.index(min(slots))
+        slots[i] += latency
+    return max(slots) if latencies else 0.0
+
+
+def merge_speculative(searches: list[dict], planned_queries: list[str]) -> tuple[list[dict], dict]:
+    """Fold speculative baseline searches into the planned ones.
+
+    Planned searches come first, in plan order. A speculative search the plan
+    also asked for counts as planned. Remaining speculative searches follow,
+    minus any result a planned search (or an earlier speculative one) already
+    returned — matched as dedupe_findings() matches them, so the hit rate
+    counts only results that reach the findings as new pages.
+
+    Returns:
+        (merged search records, stats) — stats has searches, results, kept and
+        hit_rate (share of speculative results that survived deduplication).
+    """
+    planned_set = set(planned_queries)
+    planned, speculative = [], []
+    for search in searches:
+        if search.get("speculative") and search["query"] not in planned_set:
+            speculative.append(search)
+        else:
+            planned.append({**search, "speculative": False})
+
+    seen = {key for s in planned for r in s["results"] for key in _result_keys(r)}
+    total = kept = 0
+    merged_speculative = []
+    for search in speculative:
+        fresh = []
+        for result in search["results"]:
+            total += 1
+            keys = _result_keys(result)
+            if any(key in seen for key in keys):
+                continue
+            seen.update(keys)
+            fresh.append(result)
+        kept += len(fresh)
+        merged_speculative.append({**search, "results": fresh})
+
+    stats = {
+        "searches": len(speculative),
+        "results": total,
+        "kept": kept,
+        "hit_rate": round(kept / total, 3) if total else None,
+    }
+    return planned + merged_speculative, stats
+
+
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so trivially different links to one page compare equal.
+
+    Lowercases scheme and host, drops "www.", the fragment, tracking query
+    parameters and any trailing slash, and treats http and https as the same.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ))
+    return urlunsplit(("https", host, parts.path.rstrip("/"), query, ""))
+
+
+def content_fingerprint(content: str) -> str:
+    """Hash of the normalized text — catches one page syndicated under several URLs."""
+    normalized = normalize_text(content)
+    if not normalized:
+        return ""
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count (~4 characters per token for English prose)."""
+    return (len(text) + 3) // 4
+
+
+def _result_keys(result: dict) -> list[str]:
+    """Identity keys of a search result: its canonical_url() and content_fingerprint()."""
+    keys = []
+    if result.get("url"):
+        keys.append("url:" + canonical_url(result["url"]))
+    fingerprint = content_fingerprint(result.get("content", ""))
+    if fingerprint:
+        keys.append("content:" + fingerprint)
+    return keys
+
+
+def dedupe_findings(searches: list[dict]) -> tuple[list[dict], dict]:
+    """Keep each page once across all queries, first occurrence wins.
+
+    Results match on canonical_url() or content_fingerprint(). Every kept
+    result gets a queries list naming all queries that surfaced it, which
+    format_search_results() prints when there's more than one.
+
+    Returns:
+        (deduplicated search records, stats) — stats has results_merged and
+        tokens_saved (estimated findings tokens removed).
+    """
+    kept_by_key = {}
+    deduped = []
+    merged = 0
+    for search in searches:
+        fresh = []
+        for result in search["results"]:
+            keys = _result_keys(result)
+            match = next((kept_by_key[k] for k in keys if k in kept_by_key), None)
+            if match is not None:
+                if search["query"] not in match["queries"]:
+                    match["queries"].append(search["query"])
+                merged += 1
+                continue
+            kept = {**result, "queries": [search["query"]]}
+            for k in keys:
+                kept_by_key[k] = kept
+            fresh.append(kept)
+        deduped.append({**search, "results": fresh})
+
+    tokens_saved = estimate_tokens(compile_findings(searches)) - estimate_tokens(compile_findings(deduped))
+    return deduped, {"results_merged": merged, "tokens_saved": max(0, tokens_saved)}
+
+
+def assemble_findings(searches: list[dict], budget_tokens: int | None = None) -> tuple[str, dict]:
+    """Pack search results into research_findings within an estimated-token budget.
+
+    Results are admitted by priority — every query's best result (by Tavily
+    relevance score) first, in plan order, then every query's second best, and
+    so on — skipping any that no longer fit. The kept results are then laid out
+    in plan order as compile_findings() would.
+
+    Args:
+        searches: Search records in plan order
+        budget_tokens: Estimated-token cap (defaults to FINDINGS_TOKEN_BUDGET; 0 = no cap)
+
+    Returns:
+        (findings text, report) — report has budget_tokens, tokens (estimate for
+        the returned text), results_kept, results_dropped and dropped
+        (query, title, url of each dropped result).
+    """
+    budget = FINDINGS_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    ranked = [sorted(s["results"], key=lambda r: r.get("score") or 0.0, reverse=True) for s in searches]
+
+    candidates = []
+    for query_rank, results in enumerate(ranked):
+        for result_rank, result in enumerate(results):
+            candidates.append((result_rank, query_rank, result))
+    candidates.sort(key=lambda c: (c[0], c[1]))
+
+    used = 0
+    kept_ids = set()
+    opened = set()
+    dropped = []
+    for _, query_rank, result in candidates:
+        cost = estimate_tokens(format_search_results([result]))
+        if query_rank not in opened:
+            cost += estimate_tokens(f"\n=== Search: {searches[query_rank]['query']} ===")
+        if budget and used + cost > budget:
+            dropped.append({"query": searches[query_rank]["query"],
+                            "title": result.get("title", ""), "url": result.get("url", "")})
+            continue
+        used += cost
+        kept_ids.add(id(result))
+        opened.add(query_rank)
+
+    packed = [
+        {**search, "results": [r for r in results if id(r) in kept_ids]}
+        for search, results in zip(searches, ranked)
+    ]
+    findings = compile_findings(packed)
+    return findings, {
+        "budget_tokens": budget,
+        "tokens": estimate_tokens(findings),
+        "results_kept": len(kept_ids),
+        "results_dropped": len(dropped),
+        "dropped": dropped,
+    }
+
+
+def compile_findings(searches: list[dict]) -> str:
+    """Format per-query search records into the research_findings text for Claude."""
+    sections = []
+    for search in searches:
+        if search["results"]:
+            sections.append(f"\n=== Search: {search['query']} ===")
+            sections.append(format_search_results(search["results"]))
+    return "\n".join(sections)
+
+
+def search_stats(searches: list[dict]) -> list[dict]:
+    """Strip result bodies from search records, keeping what's worth logging per query."""
+    stats = []
+    for search in searches:
+        row = {
+            "query": search["query"],
+            "num_results": len(search["results"]),
+            "latency_sec": search["latency_sec"],
+            "cached": search["cached"],
+        }
+        if search.get("speculative"):
+            row["speculative"] = True
+        if search.get("stale"):
+            row["stale"] = True
+        if search.get("skipped"):
+            row["skipped"] = True
+        if search.get("straggler"):
+            row["straggler"] = True
+        if search.get("hedged"):
+            row["hedged"] = True
+        if "policy" in search:
+            row["depth"] = search["policy"]["search_depth"]
+            row["policy"] = search["policy"]["reason"]
+        if "error" in search:
+            row["error"] = search["error"]
+        stats.append(row)
+    return stats
@@ -0,0 +1,114 @@
+"""
+Retry policy for AI Compliance Gap Analyzer.
+One policy shared by Claude calls (agent.py) and Tavily searches (tools.py).
+
+- Decorrelated jitter: each delay is drawn from [base, 3 × previous delay],
+  capped, so concurrent runs that failed together don't retry in lockstep.
+- Retry-after aware: a provider's Retry-After / retry-after-ms hint is a floor
+  on the delay.
+- Deadline aware: a retry that can't finish before the run's deadline (see
+  deadline.py) isn't attempted — the error is raised instead.
+"""
+
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import deadline
+
+
+def retry_after_sec(error: Exception) -> float | None:
+    """Seconds the provider asked us to wait, from the error's HTTP response headers."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            at = parsedate_to_datetime(value)
+            return max(0.0, (at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Attempts, jittered backoff, retry-after and deadline handling for one call."""
+
+    def __init__(self, max_attempts: int = 2, base_sec: float = 1.0, cap_sec: float = 20.0,
+                 min_attempt_sec: float = 2.0):
+        """
+        Args:
+            max_attempts: Total tries, including the first
+            base_sec: Smallest backoff delay
+            cap_sec: Largest backoff delay (retry-after hints beyond it give up)
+            min_attempt_sec: Time an attempt needs after the delay; if the run's
+                deadline leaves less, the retry is skipped
+        """
+        self.max_attempts = max_attempts
+        self.base_sec = base_sec
+        self.cap_sec = cap_sec
+        self.min_attempt_sec = min_attempt_sec
+
+    def next_delay(self, previous_sec: float, error: Exception | None = None) -> float:
+        delay = min(self.cap_sec, random.uniform(self.base_sec, max(self.base_sec, previous_sec * 3)))
+        hint = retry_after_sec(error) if error is not None else None
+        return max(delay, hint) if hint is not None else delay
+
+    def _retry_delay(self, attempt: int, error: Exception, previous: float, label: str) -> float | None:
+        """Seconds to wait before retrying after a retryable error, or None to give up."""
+        if attempt == self.max_attempts:
+            return None
+        delay = self.next_delay(previous, error)
+        if delay > self.cap_sec:
+            print(f"⚠️ {label} failed; provider asked for {delay:.0f}s — not retrying")
+            return None
+        if deadline.remaining() < delay + self.min_attempt_sec:
+            print(f"⚠️ {label} failed; no time left in the run deadline to retry")
+            return None
+        print(f"⚠️ {label} failed (attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s…")
+        return delay
+
+    def call(self, fn, retryable=lambda error: True, label: str = "API call"):
+        """Call fn() until it succeeds, the error isn't retryable, attempts run out,
+        or the run deadline leaves no time for another try. Re-raises the last error.
+        """
+        previous = self.base_sec
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, previous, label) if retryable(e) else None
+                if delay is None:
+                    raise
+                previous = delay
+                time.sleep(delay)
+
+    async def call_async(self, fn, retryable=lambda error: True, label: str = "API call"):
+        """call() for a coroutine function: awaits fn() and sleeps without blocking the event loop."""
+        previous = self.base_sec
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, previous, label) if retryable(e) else None
+                if delay is None:
+                    raise
+                previous = delay
+                await asyncio.sleep(delay)
+
+
+retry_policy = RetryPolicy(
+    max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "2")),
+    base_sec=float(os.getenv("RETRY_BASE_SEC", "2")),
+    cap_sec=float(os.getenv("RETRY_CAP_SEC", "20")),
+)
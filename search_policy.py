@@ -0,0 +1,156 @@
+"""
+Search policy for AI Compliance Gap Analyzer.
+Picks Tavily search depth and result count for each query.
+
+Every search used to be "advanced" (2 API credits, slower) with 3 results,
+whatever the query or the time left. The policy spends that only where it
+has paid off:
+
+- Rank: the plan lists its most important queries first, so the top
+  POLICY_ADVANCED_TOP_N get advanced depth and the rest basic.
+- Time: with less than POLICY_BASIC_BELOW_SEC left in the run's deadline,
+  every search is basic.
+- Cache: if an advanced result for the query is already cached, it's used
+  (free, and the best there is).
+- History: queries whose terms have produced results cited in past reports
+  get advanced depth and an extra result; terms whose results have gone
+  unused drop to basic with fewer results.
+
+Reports don't carry URLs, so "cited" is judged from the text: a result
+counts as cited when the analysis reuses at least CITATION_THRESHOLD of its
+passage's word pairs. Counts are kept per query term in a local SQLite
+store, so a new query inherits the record of the terms it shares with past
+ones. Set SEARCH_POLICY=0 to search every query at advanced depth / 3 results.
+
+Agent Workflow:
+1. User Input
+2. Plan Research (Claude) → prompts.py
+3. Execute Research (Tavily) → research.py, tools.py, search_policy.py ← THIS FILE (depth, result count)
+4. Analyze Findings (Claude) → prompts.py
+5. Output Report
+"""
+
+import os
+
+from cache import SQLiteCache
+from passages import tokenize
+from tools import search_cache, search_cache_key
+
+SEARCH_POLICY = os.getenv("SEARCH_POLICY", "1") == "1"
+POLICY_ADVANCED_TOP_N = int(os.getenv("POLICY_ADVANCED_TOP_N", "3"))
+POLICY_BASIC_BELOW_SEC = float(os.getenv("POLICY_BASIC_BELOW_SEC", "60"))
+
+DEFAULT_DEPTH = "advanced"
+DEFAULT_MAX_RESULTS = 3
+
+# Share of a result's word pairs the analysis must reuse for it to count as cited.
+CITATION_THRESHOLD = 0.2
+# Term history: results on record before a term counts, and the cited
+# rates above / below which a query is promoted / demoted.
+MIN_HISTORY_RESULTS = 6
+USEFUL_RATE = 0.5
+UNUSED_RATE = 0.15
+
+# Per-term citation counts: {"results": int, "cited": int}. Long TTL — the
+# record is what makes the policy better over time.
+usefulness_store = SQLiteCache(
+    "search_usefulness",
+    ttl_sec=float(os.getenv("SEARCH_USEFULNESS_TTL_SEC", str(90 * 24 * 3600))),
+    max_entries=5000,
+)
+
+
+def historic_usefulness(query: str) -> float | None:
+    """Past cited rate of the query's terms, averaged with equal weight per term
+    (so "ai" and "compliance", in nearly every query, don't drown out the rest).
+    Terms with fewer than MIN_HISTORY_RESULTS results don't count; None if none do."""
+    rates = []
+    for term in set(tokenize(query)):
+        counts = usefulness_store.get(term)
+        if counts and counts["results"] >= MIN_HISTORY_RESULTS:
+            rates.append(counts["cited"] / counts["results"])
+    if not rates:
+        return None
+    return sum(rates) / len(rates)
+
+
+def choose(query: str, rank: int | None, remaining_sec: float = float("inf"),
+           max_results: int = DEFAULT_MAX_RESULTS) -> dict:
+    """Pick depth and result count for one search.
+
+    Args:
+        query: The search query
+        rank: Position in the plan (0 = first); None for unplanned
+            (speculative) searches, which rank last
+        remaining_sec: Time left in the run's deadline
+        max_results: Baseline result count, adjusted by history
+
+    Returns:
+        dict with search_depth, max_results and reason
+    """
+    def plan(depth, results, reason):
+        return {"search_depth": depth, "max_results": results, "reason": reason}
+
+    if not SEARCH_POLICY:
+        return plan(DEFAULT_DEPTH, max_results, "policy off")
+    # A probe, not a lookup: search_web() does the counted get() itself.
+    if search_cache.contains(search_cache_key(query, max_results, DEFAULT_DEPTH)):
+        return plan(DEFAULT_DEPTH, max_results, "cached")
+    if remaining_sec < POLICY_BASIC_BELOW_SEC:
+        return plan("basic", max_results, "deadline")
+
+    usefulness = historic_usefulness(query)
+    if usefulness is not None and usefulness >= USEFUL_RATE:
+        return plan("advanced", max_results + 1, f"history: {usefulness:.0%} cited")
+    if usefulness is not None and usefulness < UNUSED_RATE:
+        return plan("basic", max(1, max_results - 1), f"history: {usefulness:.0%} cited")
+    if rank is not None and rank < POLICY_ADVANCED_TOP_N:
+        return plan("advanced", max_results, f"rank {rank + 1}")
+    return plan("basic", max_results, "unplanned" if rank is None else f"rank {rank + 1}")
+
+
+def _word_pairs(text: str) -> set[tuple[str, str]]:
+    tokens = tokenize(text)
+    return set(zip(tokens, tokens[1:]))
+
+
+def is_cited(content: str, analysis_pairs: set) -> bool:
+    """Whether the analysis reuses enough of content's word pairs to count it as cited."""
+    pairs = _word_pairs(content)
+    if not pairs:
+        return False
+    return len(pairs & analysis_pairs) / len(pairs) >= CITATION_THRESHOLD
+
+
+def record_citations(searches: list[dict], analysis: str) -> dict:
+    """Add one report's citations to the per-term history.
+
+    Args:
+        searches: Search records after dedupe_findings() — each result lists
+            every query that surfaced it in `queries`
+        analysis: The finished report text
+
+    Returns:
+        dict with results, cited and rate (cited share) for this report
+    """
+    analysis_pairs = _word_pairs(analysis)
+    term_counts = {}
+    results = cited = 0
+    for search in searches:
+        for result in search["results"]:
+            hit = is_cited(result.get("content", ""), analysis_pairs)
+            results += 1
+            cited += hit
+            terms = {term for query in result.get("queries", [search["query"]]) for term in tokenize(query)}
+            for term in terms:
+                counts = term_counts.setdefault(term, {"results": 0, "cited": 0})
+                counts["results"] += 1
+                counts["cited"] += hit
+
+    for term, counts in term_counts.items():
+        stored = usefulness_store.get(term) or {"results": 0, "cited": 0}
+        usefulness_store.set(term, {
+            "results": stored["results"] + counts["results"],
+            "cited": stored["cited"] + counts["cited"],
+        })
+    return {"results": results, "cited": cited, "rate": round(cited / results, 2) if results else None}
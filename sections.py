@@ -0,0 +1,131 @@
+"""
+Sectioned analysis for AI Compliance Gap Analyzer.
+Splits the report into shards that Claude writes concurrently, and merges them back.
+
+One analysis call writes all five report sections in sequence, so its
+latency is the sum of every section's output. In sharded mode
+(SHARDED_ANALYSIS=1) the Compliance Gap Matrix is written first, then the
+remaining sections are written by concurrent calls that each get the matrix,
+so they agree on the gaps, risk levels and priorities. Analysis time then
+approaches matrix + the longest shard instead of the whole report.
+
+render_shard() and merge_sections() assemble the report deterministically:
+whatever a shard returns, only the sections it was asked for are kept,
+under their canonical `###` headers, in report order. A section a shard failed to produce is
+replaced by a short notice.
+
+Agent Workflow:
+1. User Input
+2. Plan Research (Claude) → prompts.py
+3. Execute Research (Tavily) → research.py
+4. Analyze Findings (Claude) → prompts.py, sections.py ← THIS FILE (sharded mode)
+5. Output Report
+"""
+
+import os
+import re
+
+SHARDED_ANALYSIS = os.getenv("SHARDED_ANALYSIS", "0") == "1"
+
+# The report's sections, in order, as ANALYSIS_INSTRUCTIONS defines them.
+REPORT_SECTIONS = [
+    "1. Compliance Gap Matrix",
+    "2. Key Regulatory Landscape",
+    "3. Gap Details",
+    "4. Recommended Next Steps",
+    "5. Bottom Line",
+]
+
+# Written first; every other shard is conditioned on it.
+MATRIX_SHARD = "matrix"
+# Shard name -> sections it writes. The matrix shard runs alone, the rest
+# concurrently. Bottom Line is short and rides along with Next Steps.
+SECTION_SHARDS = {
+    MATRIX_SHARD: ["1. Compliance Gap Matrix"],
+    "landscape": ["2. Key Regulatory Landscape"],
+    "details": ["3. Gap Details"],
+    "next_steps": ["4. Recommended Next Steps", "5. Bottom Line"],
+}
+
+MISSING_SECTION_NOTE = "_This section couldn't be generated in this run — re-run for the full report._"
+
+_HEADER = re.compile(r"^#{1,6}\s*(?:\d+\.\s*)?(.+?)\s*#*\s*$")
+# A line that is all bold, e.g. "**3. Gap Details**" — a header the model forgot to mark up.
+_BOLD_HEADER = re.compile(r"^\*\*([^*]+?)\*\*:?\s*$")
+
+
+def _section_name(title: str) -> str:
+    """'3. Gap Details' / 'Gap Details' / '**3. Gap Details**' → 'gap details'."""
+    return re.sub(r"^\d+\.\s*", "", title.strip(" *")).strip(" *").lower()
+
+
+_BY_NAME = {_section_name(title): title for title in REPORT_SECTIONS}
+
+
+def split_sections(text: str) -> dict[str, str]:
+    """Section bodies of a (partial) report, keyed by canonical REPORT_SECTIONS title.
+
+    Headers are matched by name, whatever their level or numbering, and so
+    is a bare bold line ("**3. Gap Details**"). Text
+    under an unrecognized header stays with the section before it; text
+    before the first recognized header is dropped.
+    """
+    sections = {}
+    current = None
+    for line in text.splitlines():
+        match = _HEADER.match(line) or _BOLD_HEADER.match(line)
+        title = _BY_NAME.get(_section_name(match.group(1))) if match else None
+        if title is not None:
+            current = title
+            sections.setdefault(current, [])
+            continue
+        if current is not None:
+            sections[current].append(line)
+    return {title: "\n".join(lines).strip() for title, lines in sections.items()}
+
+
+def shard_sections(shard: str, text: str) -> dict[str, str]:
+    """The sections `shard` was asked for, out of its reply.
+
+    A reply with no recognizable header is taken as the shard's first section.
+    """
+    wanted = SECTION_SHARDS[shard]
+    found = split_sections(text)
+    if not found and text.strip():
+        found = {wanted[0]: text.strip()}
+    return {title: body for title, body in found.items() if title in wanted and body}
+
+
+def render_shard(shard: str, text: str) -> tuple[str, list[str]]:
+    """A shard's sections as report markdown under canonical `###` headers.
+
+    Returns:
+        (markdown, titles of the shard's sections missing from text — each
+        replaced by MISSING_SECTION_NOTE)
+    """
+    bodies = shard_sections(shard, text or "")
+    parts, missing = [], []
+    for title in SECTION_SHARDS[shard]:
+        body = bodies.get(title)
+        if not body:
+            missing.append(title)
+            body = MISSING_SECTION_NOTE
+        parts.append(f"### {title}\n\n{body}")
+    return "\n\n".join(parts), missing
+
+
+def merge_sections(shard_texts: dict[str, str]) -> tuple[str, list[str]]:
+    """Assemble shard replies into one report, in REPORT_SECTIONS order.
+
+    Args:
+        shard_texts: SECTION_SHARDS name -> reply text ("" for a shard that failed)
+
+    Returns:
+        (report markdown, titles of sections that were missing)
+    """
+    parts, missing = [], []
+    for shard in SECTION_SHARDS:
+        markdown, shard_missing = render_shard(shard, shard_texts.get(shard, ""))
+        parts.append(markdown)
+        missing += shard_missing
+    return "\n\n".join(parts), missing
@@ -8,6 +8,7 @@ import json
 import streamlit as st
 import streamlit.components.v1 as components
 import time
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,10 +48,9 @@ from langfuse import observe, get_client as get_langfuse_client
 from opentelemetry import trace as otel_trace
 
 from agent import (
-    plan_searches,
-    conduct_research,
-    analyze_compliance,
+    run_pipeline,
     save_report,
+    render_report,
     append_test_log,
     TEST_SCENARIOS,
 )
@@ -120,7 +120,7 @@ st.markdown(
 
 
 # ── Session-state defaults ────────────────────────────────────────────────────
-for key in ("result", "report_md", "report_path"):
+for key in ("result", "report_md", "report_path", "resume"):
     if key not in st.session_state:
         st.session_state[key] = None
 
@@ -190,11 +190,15 @@ st.markdown(
 # ── Pipeline function (Langfuse parent trace) ────────────────────────────────
 
 @observe(name="compliance_pipeline")
-def _run_pipeline(use_case, technology, industry, run_id, session_id, version):
+def _run_pipeline(use_case, technology, industry, run_id, session_id, version,
+                  checkpoint_id=None, resume_from=None):
     """Run the full analysis pipeline under a single Langfuse parent trace.
 
     All child @observe() functions (plan_searches, conduct_research,
     analyze_compliance) are automatically nested as spans under this trace.
+    The steps themselves live in agent.run_pipeline(); this wrapper only
+    renders their progress. Finished steps are checkpointed under
+    checkpoint_id; resume_from names a failed run's checkpoint to pick up from.
     """
     span = otel_trace.get_current_span()
     span.set_attribute("session.id", str(session_id or ""))
@@ -207,9 +211,10 @@ def _run_pipeline(use_case, technology, industry, run_id, session_id, version):
 
     langfuse_trace_id = _langfuse.get_current_trace_id()
 
-    total_start = time.time()
     status_area = st.container()
     timer_slot = st.empty()
+    report_slot = st.empty()
+    streamed = {"text": "", "rendered_at": 0.0}
 
     with status_area:
         with st.status("Running compliance analysis… (step 1/3)", expanded=True) as status:
@@ -241,62 +246,66 @@ def _run_pipeline(use_case, technology, industry, run_id, session_id, version):
                     height=40,
                 )
 
-            # Step 1 — Plan searches
-            st.write("📋 **Planning research strategy** — identifying key regulations to investigate…")
-            t0 = time.time()
-            plan_result = plan_searches(use_case, technology, industry)
-            search_queries = plan_result["queries"]
-            time_planning = round(time.time() - t0, 1)
-            st.write(f"✅ Planned **{len(search_queries)}** search queries ({time_planning}s)")
-
-            status.update(label="Running compliance analysis… (step 2/3)")
-
-            # Step 2 — Conduct research
-            st.write("🔬 **Conducting research** — searching the web for regulatory data…")
-            t0 = time.time()
-            research_findings = conduct_research(search_queries)
-            time_research = round(time.time() - t0, 1)
-            st.write(f"✅ Research complete ({time_research}s)")
-
-            status.update(label="Running compliance analysis… (step 3/3)")
-
-            # Step 3 — Analyze compliance
-            st.write(
-                "🧠 **Analyzing compliance gaps** — the agent is cross-referencing findings "
-                "and writing your report. This is the longest step…"
-            )
-            t0 = time.time()
-            analysis_result = analyze_compliance(use_case, technology, industry, research_findings)
-            analysis = analysis_result["analysis"]
-            time_analysis = round(time.time() - t0, 1)
-            st.write(f"✅ Analysis complete ({time_analysis}s)")
-
-            time_total = round(time.time() - total_start, 1)
-            status.update(label=f"Analysis complete — {time_total}s", state="complete", expanded=False)
-
-    mins, secs = divmod(int(time_total), 60)
-    timer_slot.markdown(f"⏱️ Report generated in **{mins}:{secs:02d}**")
-
-    return {
-        "use_case": use_case,
-        "technology": technology,
-        "industry": industry,
-        "search_queries": search_queries,
-        "analysis": analysis,
-        "timing": {
-            "planning_sec": time_planning,
-            "research_sec": time_research,
-            "analysis_sec": time_analysis,
-            "total_sec": time_total,
-        },
-        "planning_thinking": plan_result.get("thinking"),
-        "analysis_thinking": analysis_result.get("thinking"),
-        "token_usage": {
-            "planning": {"input": plan_result.get("tokens_in", 0), "output": plan_result.get("tokens_out", 0)},
-            "analysis": {"input": analysis_result.get("tokens_in", 0), "output": analysis_result.get("tokens_out", 0)},
-        },
-        "langfuse_trace_id": langfuse_trace_id,
-    }
+            def on_progress(event, data):
+                if event == "breaker_open":
+                    st.warning(
+                        f"🔌 {', '.join(p.capitalize() for p in data['providers'])} is currently degraded — "
+                        "failing fast and using cached search results where available.",
+                    )
+                elif event == "resumed":
+                    st.write(f"♻️ **Resuming the previous run** — reusing its {' and '.join(data['steps'])}, "
+                             "so only the remaining steps run")
+                    status.update(label=f"Running compliance analysis… (step {len(data['steps']) + 1}/3)")
+                elif event == "cache_hit":
+                    st.write(f"⚡ **Served from cache** — same inputs were analyzed at {data['cached_at']}")
+                elif event == "planning_started":
+                    st.write("📋 **Planning research strategy** — identifying key regulations to investigate…")
+                elif event == "query_planned":
+                    st.write(f"🔎 Searching: _{data['query']}_")
+                elif event == "planning_done":
+                    st.write(f"✅ Planned **{len(data['queries'])}** search queries ({data['sec']}s)")
+                    status.update(label="Running compliance analysis… (step 2/3)")
+                elif event == "research_started":
+                    st.write("🔬 **Conducting research** — searching the web for regulatory data…")
+                elif event == "research_done":
+                    st.write(f"✅ Research complete ({data['sec']}s)")
+                    status.update(label="Running compliance analysis… (step 3/3)")
+                elif event == "analysis_started":
+                    st.write(
+                        "🧠 **Analyzing compliance gaps** — the agent is cross-referencing findings "
+                        "and writing your report. This is the longest step…"
+                    )
+                elif event == "analysis_delta":
+                    if data["type"] != "text":
+                        return
+                    streamed["text"] += data["delta"]
+                    # Re-rendering markdown on every token chunk is wasteful;
+                    # a few refreshes per second reads as live.
+                    now = time.time()
+                    if now - streamed["rendered_at"] >= 0.25:
+                        report_slot.markdown(streamed["text"] + " ▌")
+                        streamed["rendered_at"] = now
+                elif event == "analysis_done":
+                    report_slot.empty()
+                    st.write(f"✅ Analysis complete ({data['sec']}s)")
+
+            result = run_pipeline(use_case, technology, industry, on_progress=on_progress,
+                                  run_id=checkpoint_id, resume_from=resume_from)
+
+            time_total = result["timing"]["total_sec"]
+            if result.get("cache_hit"):
+                status.update(label="Analysis complete — served from cache", state="complete", expanded=False)
+            else:
+                status.update(label=f"Analysis complete — {time_total}s", state="complete", expanded=False)
+
+    if result.get("cache_hit"):
+        timer_slot.markdown("⚡ Report served instantly from cache")
+    else:
+        mins, secs = divmod(int(time_total), 60)
+        timer_slot.markdown(f"⏱️ Report generated in **{mins}:{secs:02d}**")
+
+    result["langfuse_trace_id"] = langfuse_trace_id
+    return result
 
 
 # ── Run pipeline ──────────────────────────────────────────────────────────────
@@ -334,20 +343,37 @@ if run_btn:
 
     _user_inputs = {"use_case": use_case, "technology": technology, "industry": industry}
 
-    try:
-        result = _run_pipeline(use_case, technology, industry, run_id, session_id, VERSION)
+    # A retry of a failed run with the same inputs resumes from its checkpoint
+    # (see checkpoint.py). Without Supabase there's no run_id; checkpoint
+    # under a local id instead.
+    resume = st.session_state.resume
+    resume_from = resume["checkpoint_id"] if resume and resume["inputs"] == _user_inputs else None
+    checkpoint_id = str(run_id) if run_id else uuid.uuid4().hex
 
-        try:
-            report_path = save_report(result, version=VERSION, run_id=run_id)
-            append_test_log(result, version=VERSION, report_path=report_path, run_id=run_id)
-        except Exception as save_err:
-            log_error(save_err, session_id=session_id, run_id=run_id,
-                      pipeline_step="save_report", user_inputs=_user_inputs,
-                      app_version=VERSION)
-            report_path = None
+    try:
+        result = _run_pipeline(use_case, technology, industry, run_id, session_id, VERSION,
+                               checkpoint_id=checkpoint_id, resume_from=resume_from)
+        cache_hit = result.get("cache_hit", False)
+
+        report_path = None
+        if not cache_hit:
+            # Cache hits aren't new runs — no report file or test-log row.
+            try:
+                report_path = save_report(result, version=VERSION, run_id=run_id)
+                append_test_log(result, version=VERSION, report_path=report_path, run_id=run_id)
+            except Exception as save_err:
+                log_error(save_err, session_id=session_id, run_id=run_id,
+                          pipeline_step="save_report", user_inputs=_user_inputs,
+                          app_version=VERSION)
 
         if run_id:
-            complete_run(run_id, result["timing"])
+            complete_run(run_id, result["timing"], cache_hit=cache_hit,
+                         speculative_hit_rate=(result.get("speculative") or {}).get("hit_rate"),
+                         quorum_fired=(result.get("quorum") or {}).get("fired"),
+                         model_usage=result.get("model_usage"), cost_usd=result.get("cost_usd"),
+                         analysis_inputs=result.get("analysis_inputs"),
+                         thinking_decision=result.get("thinking_decision"),
+                         resumed=result.get("resumed"))
             if report_path:
                 save_report_to_db(run_id, result["analysis"], result["search_queries"],
                                   os.path.basename(report_path))
@@ -356,10 +382,14 @@ if run_btn:
         st.session_state.result = result
         st.session_state.report_path = report_path
         st.session_state.current_run_id = run_id
+        st.session_state.resume = ({"checkpoint_id": checkpoint_id, "inputs": _user_inputs}
+                                   if result.get("resumable") else None)
 
         if report_path:
             with open(report_path, "r", encoding="utf-8") as f:
                 st.session_state.report_md = f.read()
+        elif cache_hit:
+            st.session_state.report_md = render_report(result, version=VERSION, run_id=run_id)
         else:
             st.session_state.report_md = result.get("analysis", "")
 
@@ -369,11 +399,13 @@ if run_btn:
                   app_version=VERSION)
         if run_id:
             mark_run_failed(run_id, pipeline_err)
+        # Steps that finished before the error are checkpointed.
+        st.session_state.resume = {"checkpoint_id": checkpoint_id, "inputs": _user_inputs}
 
         st.error(
             "Something went wrong during the analysis. The error has been logged "
             "and will be investigated. Please try again — transient issues often "
-            "resolve on retry."
+            "resolve on retry, and steps that already finished won't be re-run."
         )
         st.caption(f"Error reference: `{run_id or 'no-run-id'}`")
         log_user_event(session_id, "pipeline_error", run_id=run_id,
@@ -410,6 +442,57 @@ if result:
         unsafe_allow_html=True,
     )
 
+    if result.get("cache_hit"):
+        st.info(
+            f"Served from cache — these inputs were analyzed at {result['cached_at']}. "
+            "Timings above are from that original run.",
+            icon="⚡",
+        )
+
+    if result.get("resumed"):
+        st.caption(
+            f"♻️ Resumed the previous run — reused its {' and '.join(result['resumed']['steps'])}, "
+            f"saving ~{result['resumed']['saved_sec']}s"
+        )
+    if result.get("resumable"):
+        st.info(
+            "This run didn't finish cleanly, but its completed steps are saved — click "
+            "**Run Analysis** again with the same inputs to retry from where it stopped.",
+            icon="♻️",
+        )
+
+    if result.get("partial"):
+        st.warning(
+            f"Partial report — this run hit its {timing.get('deadline_sec')}s time limit before the "
+            "analysis finished. Re-run for the full report.",
+            icon="⏰",
+        )
+    if result.get("deadline_actions"):
+        st.caption("⏰ To meet the time limit: " + "; ".join(result["deadline_actions"]))
+
+    if timing.get("rate_limit_wait_sec"):
+        st.caption(f"⏳ Queued {timing['rate_limit_wait_sec']}s behind API rate limits (busy period)")
+
+    if (result.get("quorum") or {}).get("fired"):
+        st.caption(
+            f"🏁 Analysis started after {result['quorum']['done']}/{result['quorum']['n']} searches "
+            f"— {len(result['quorum']['stragglers'])} slow ones were left behind"
+        )
+
+    if timing.get("overlap_saved_sec"):
+        st.caption(f"Searches started while the plan was still streaming, saving ~{timing['overlap_saved_sec']}s")
+
+    if timing.get("analysis_ttft_sec") is not None:
+        st.caption(
+            f"Report started streaming after {timing['analysis_ttft_sec']}s"
+            + (f" · {timing['analysis_tokens_per_sec']} tokens/s"
+               if timing.get("analysis_tokens_per_sec") else "")
+        )
+
+    fallbacks = [step for step, usage in (result.get("model_usage") or {}).items() if usage["fallback"]]
+    if fallbacks:
+        st.caption(f"🔀 {', '.join(fallbacks).capitalize()} ran on a fallback model — the primary was overloaded")
+
     tab_report, tab_queries = st.tabs(["📄 Report", "🔍 Search Queries"])
 
     with tab_report:
@@ -439,7 +522,7 @@ if result:
                 event_data={"filename": dl_filename},
             )
     with col_path:
-        if not st.session_state.report_path:
+        if not st.session_state.report_path and not result.get("cache_hit"):
             st.caption("⚠️ Local save failed — report available via download only")
 
 elif not run_btn:
@@ -24,8 +24,25 @@ create table analysis_runs (
   error_message text,
   planning_sec real,
   research_sec real,
+  overlap_saved_sec real,
+  speculative_hit_rate real,
+  rate_limit_wait_sec real,
+  quorum_fired boolean,
+  quorum_saved_sec real,
   analysis_sec real,
+  analysis_ttft_sec real,
+  analysis_tokens_per_sec real,
   total_sec real,
+  planning_model text,
+  analysis_model text,
+  model_usage jsonb,
+  cost_usd real,
+  analysis_thinking_budget integer,
+  findings_tokens integer,
+  jurisdictions integer,
+  thinking_decision jsonb,
+  resumed jsonb,
+  cache_hit boolean not null default false,
   started_at timestamptz not null default now(),
   completed_at timestamptz
 );
@@ -60,10 +77,31 @@ create table error_logs (
   error_traceback text,
   pipeline_step text,
   user_inputs jsonb,
+  breaker_state jsonb,
   app_version text not null,
   created_at timestamptz not null default now()
 );
 
+-- Migrations for databases created from an earlier version of this file
+alter table analysis_runs add column if not exists analysis_ttft_sec real;
+alter table analysis_runs add column if not exists analysis_tokens_per_sec real;
+alter table analysis_runs add column if not exists overlap_saved_sec real;
+alter table analysis_runs add column if not exists speculative_hit_rate real;
+alter table analysis_runs add column if not exists rate_limit_wait_sec real;
+alter table analysis_runs add column if not exists quorum_fired boolean;
+alter table analysis_runs add column if not exists quorum_saved_sec real;
+alter table analysis_runs add column if not exists planning_model text;
+alter table analysis_runs add column if not exists analysis_model text;
+alter table analysis_runs add column if not exists model_usage jsonb;
+alter table analysis_runs add column if not exists cost_usd real;
+alter table analysis_runs add column if not exists analysis_thinking_budget integer;
+alter table analysis_runs add column if not exists findings_tokens integer;
+alter table analysis_runs add column if not exists jurisdictions integer;
+alter table analysis_runs add column if not exists thinking_decision jsonb;
+alter table analysis_runs add column if not exists resumed jsonb;
+alter table analysis_runs add column if not exists cache_hit boolean not null default false;
+alter table error_logs add column if not exists breaker_state jsonb;
+
 -- Disable Row Level Security (portfolio project, no user auth).
 -- Add RLS policies if this goes to production with user accounts.
 alter table sessions disable row level security;
@@ -91,8 +91,22 @@ def fetch_remote_reports(client) -> list[dict]:
             "scenario_source": run.get("scenario_source", "custom"),
             "planning_sec": run.get("planning_sec"),
             "research_sec": run.get("research_sec"),
+            "overlap_saved_sec": run.get("overlap_saved_sec"),
+            "speculative_hit_rate": run.get("speculative_hit_rate"),
+            "rate_limit_wait_sec": run.get("rate_limit_wait_sec"),
+            "quorum_fired": run.get("quorum_fired"),
+            "quorum_saved_sec": run.get("quorum_saved_sec"),
             "analysis_sec": run.get("analysis_sec"),
+            "analysis_ttft_sec": run.get("analysis_ttft_sec"),
+            "analysis_tokens_per_sec": run.get("analysis_tokens_per_sec"),
             "total_sec": run.get("total_sec"),
+            "planning_model": run.get("planning_model"),
+            "analysis_model": run.get("analysis_model"),
+            "cost_usd": run.get("cost_usd"),
+            "analysis_thinking_budget": run.get("analysis_thinking_budget"),
+            "findings_tokens": run.get("findings_tokens"),
+            "jurisdictions": run.get("jurisdictions"),
+            "resumed_steps": "+".join((run.get("resumed") or {}).get("steps", [])),
             "started_at": run.get("started_at"),
             "completed_at": run.get("completed_at"),
         })
@@ -139,7 +153,12 @@ def save_report_locally(report: dict) -> str:
 
 _TEST_LOG_FIELDS = [
     "timestamp", "version", "run_id", "use_case", "technology", "industry",
-    "num_queries", "planning_sec", "research_sec", "analysis_sec", "total_sec",
+    "num_queries", "planning_sec", "research_sec", "overlap_saved_sec", "speculative_hit_rate", "rate_limit_wait_sec",
+    "quorum_fired", "quorum_saved_sec", "analysis_sec",
+    "analysis_ttft_sec", "analysis_tokens_per_sec", "total_sec",
+    "planning_model", "analysis_model", "cost_usd",
+    "analysis_thinking_budget", "findings_tokens", "jurisdictions",
+    "resumed_steps",
     "report_file",
 ]
 
@@ -157,15 +176,29 @@ def append_to_test_log(report: dict) -> None:
         "num_queries": len(report["search_queries"]),
         "planning_sec": report.get("planning_sec", ""),
         "research_sec": report.get("research_sec", ""),
+        "overlap_saved_sec": report.get("overlap_saved_sec", ""),
+        "speculative_hit_rate": report.get("speculative_hit_rate", ""),
+        "rate_limit_wait_sec": report.get("rate_limit_wait_sec", ""),
+        "quorum_fired": report.get("quorum_fired", ""),
+        "quorum_saved_sec": report.get("quorum_saved_sec", ""),
         "analysis_sec": report.get("analysis_sec", ""),
+        "analysis_ttft_sec": report.get("analysis_ttft_sec", ""),
+        "analysis_tokens_per_sec": report.get("analysis_tokens_per_sec", ""),
         "total_sec": report.get("total_sec", ""),
+        "planning_model": report.get("planning_model") or "",
+        "analysis_model": report.get("analysis_model") or "",
+        "cost_usd": "" if report.get("cost_usd") is None else report["cost_usd"],
+        "analysis_thinking_budget": report.get("analysis_thinking_budget", ""),
+        "findings_tokens": report.get("findings_tokens", ""),
+        "jurisdictions": report.get("jurisdictions", ""),
+        "resumed_steps": report.get("resumed_steps", ""),
         "report_file": report["report_filename"],
     }
 
     if os.path.exists(TEST_LOG_PATH):
         with open(TEST_LOG_PATH, "r", encoding="utf-8") as f:
             existing_header = f.readline().strip().split(",")
-        if "run_id" not in existing_header:
+        if any(field not in existing_header for field in _TEST_LOG_FIELDS):
             _migrate_csv_header()
 
     file_exists = os.path.exists(TEST_LOG_PATH)
@@ -178,7 +211,7 @@ def append_to_test_log(report: dict) -> None:
 
 
 def _migrate_csv_header() -> None:
-    """One-time migration: add run_id column to existing test-log.csv."""
+    """Rewrite test-log.csv under the current header, adding any new columns (run_id, TTFT, …) as blanks."""
     with open(TEST_LOG_PATH, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         old_rows = list(reader)
@@ -187,7 +220,8 @@ def _migrate_csv_header() -> None:
         writer = csv.DictWriter(f, fieldnames=_TEST_LOG_FIELDS, extrasaction="ignore")
         writer.writeheader()
         for old_row in old_rows:
-            old_row.setdefault("run_id", "")
+            for field in _TEST_LOG_FIELDS:
+                old_row.setdefault(field, "")
             writer.writerow(old_row)
 
 
@@ -0,0 +1,93 @@
+"""
+Unit tests for breaker.py — CircuitBreaker state transitions.
+
+Run: python -m pytest test_breaker.py
+"""
+
+import pytest
+
+import breaker
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable stand-in for time.monotonic()."""
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _opened(clock):
+    b = CircuitBreaker("test", failure_threshold=3, recovery_sec=30)
+    for _ in range(3):
+        b.record_failure()
+    return b
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    b = CircuitBreaker("test", failure_threshold=3, recovery_sec=30)
+    b.record_failure()
+    b.record_failure()
+    assert b.state == CLOSED
+    b.check()
+
+    b.record_failure()
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpenError) as exc:
+        b.check()
+    assert exc.value.retry_in_sec == 30
+
+
+def test_success_resets_the_failure_count(clock):
+    b = CircuitBreaker("test", failure_threshold=3, recovery_sec=30)
+    b.record_failure()
+    b.record_failure()
+    b.record_success()
+    b.record_failure()
+    b.record_failure()
+    assert b.state == CLOSED
+    assert b.snapshot() == {"state": CLOSED, "consecutive_failures": 2}
+
+
+def test_half_open_after_cool_down_lets_one_probe_through(clock):
+    b = _opened(clock)
+    clock[0] += 29
+    assert not b.allow()
+
+    clock[0] += 1
+    assert b.state == HALF_OPEN
+    assert b.allow()
+    # The probe is in flight; everyone else still fails fast.
+    assert not b.allow()
+
+
+def test_successful_probe_closes(clock):
+    b = _opened(clock)
+    clock[0] += 30
+    b.check()
+    b.record_success()
+    assert b.state == CLOSED
+    assert b.allow() and b.allow()
+
+
+def test_failed_probe_reopens_for_another_cool_down(clock):
+    b = _opened(clock)
+    clock[0] += 30
+    b.check()
+    b.record_failure()
+    assert b.state == OPEN
+
+    clock[0] += 29
+    assert not b.allow()
+    clock[0] += 1
+    assert b.state == HALF_OPEN
+
+
+def test_release_frees_the_probe_without_a_verdict(clock):
+    b = _opened(clock)
+    clock[0] += 30
+    b.check()
+    b.release()         # the probe was cancelled
+    assert b.state == HALF_OPEN
+    assert b.allow()
@@ -0,0 +1,134 @@
+"""
+Unit tests for budget_controller.py — thinking budget choice with and without history.
+
+Run: python -m pytest test_budget_controller.py
+"""
+
+import csv
+
+import pytest
+
+import budget_controller
+from budget_controller import choose, count_jurisdictions, load_history, predict_sec
+
+TYPICAL_FINDINGS = "x" * 10_000     # ~2.5k tokens, the reference size
+TOKENS_PER_SEC = 100
+
+
+@pytest.fixture(autouse=True)
+def candidates(monkeypatch):
+    monkeypatch.setattr(budget_controller, "BUDGET_CANDIDATES", [1024, 2000, 3000, 4000, 6000])
+
+
+def _history(**secs_by_budget):
+    """Three runs per budget, e.g. _history(b2000=60) -> three 60s runs at 2000."""
+    return [
+        {"budget": int(key[1:]), "analysis_sec": sec,
+         "findings_tokens": None, "jurisdictions": None, "num_queries": None}
+        for key, sec in secs_by_budget.items() for _ in range(3)
+    ]
+
+
+def _choose(findings=TYPICAL_FINDINGS, industry="US hospital", num_queries=5, **kwargs):
+    return choose(findings, industry, answer_tokens=8000, default_budget=4000,
+                  tokens_per_sec=TOKENS_PER_SEC, num_queries=num_queries, **kwargs)
+
+
+def test_no_history_uses_the_default_budget():
+    decision = _choose(target_sec=90, history=[])
+    assert decision["thinking_budget"] == 4000
+    assert decision["max_tokens"] == 12000
+    assert decision["predicted_sec"] is None
+    assert decision["basis"] == "no latency history — default budget"
+
+
+def test_picks_the_largest_budget_predicted_to_fit():
+    # Above the last known budget: 60s + 1000 tokens / 100 tok/s per 1000 = 70s, 80s, 100s.
+    decision = _choose(target_sec=85, history=_history(b2000=60))
+    assert decision["thinking_budget"] == 4000
+    assert decision["predicted_sec"] == 80.0
+    assert decision["load"] == 1.0
+    assert decision["basis"] == "extrapolated from 2000"
+
+
+def test_budgets_between_known_ones_are_interpolated():
+    history = _history(b0=80, b4000=50, b8000=250)
+    assert predict_sec(2000, history, TOKENS_PER_SEC) == (65.0, "interpolated from 0–4000")
+    assert predict_sec(6000, history, TOKENS_PER_SEC) == (150.0, "interpolated from 4000–8000")
+    assert _choose(target_sec=90, history=history)["thinking_budget"] == 4000
+
+
+def test_heavier_inputs_get_a_smaller_budget():
+    decision = _choose(findings=TYPICAL_FINDINGS * 4, industry="EU and UK fintech", num_queries=10,
+                       target_sec=90, history=_history(b2000=60, b4000=120))
+    assert decision["load"] == 1.5
+    assert decision["thinking_budget"] == 2000
+    assert decision["predicted_sec"] == 90.0
+    assert decision["features"] == {"findings_tokens": 10_000, "jurisdictions": 2, "num_queries": 10}
+
+
+def test_unknown_query_count_counts_as_typical():
+    decision = _choose(num_queries=None, target_sec=90, history=_history(b2000=60, b4000=120))
+    assert decision["load"] == 1.0
+
+
+def test_smallest_budget_when_none_fits():
+    decision = _choose(target_sec=10, history=_history(b2000=60))
+    assert decision["thinking_budget"] == 1024
+    assert decision["basis"].endswith("; no budget fits the target")
+
+
+def test_predict_sec_needs_min_samples():
+    history = _history(b2000=60)[:2]
+    assert predict_sec(2000, history, TOKENS_PER_SEC) == (None, "no history")
+    assert predict_sec(2000, _history(b2000=60), TOKENS_PER_SEC) == (60, "history")
+
+
+def test_count_jurisdictions():
+    assert count_jurisdictions("Hospital network") == 1
+    assert count_jurisdictions("UK neobank with EU and California users") == 3
+    assert count_jurisdictions("US health insurer") == 1
+
+
+def _write_log(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_load_history_skips_replays_and_short_runs(tmp_path):
+    path = tmp_path / "test-log.csv"
+    _write_log(path, [
+        {"version": "v0.5", "analysis_sec": "60.5", "analysis_thinking_budget": "2000", "num_queries": "4"},
+        {"version": "v0.5-replay", "analysis_sec": "58.0", "analysis_thinking_budget": "2000", "num_queries": "4"},
+        {"version": "v0.5", "analysis_sec": "3.0", "analysis_thinking_budget": "2000", "num_queries": "4"},
+    ])
+
+    history = load_history(str(path))
+    assert [(row["budget"], row["analysis_sec"]) for row in history] == [(2000, 60.5)]
+    assert history[0]["num_queries"] == 4.0
+    assert history[0]["findings_tokens"] is None
+    assert load_history(str(tmp_path / "missing.csv")) == []
+
+
+def test_unlogged_budget_comes_from_the_version(tmp_path):
+    path = tmp_path / "test-log.csv"
+    _write_log(path, [
+        {"version": "v0.3", "analysis_sec": "65.9", "analysis_thinking_budget": ""},
+        {"version": "v0.4", "analysis_sec": "244", "analysis_thinking_budget": ""},
+        {"version": "v0.5", "analysis_sec": "52.4", "analysis_thinking_budget": ""},
+        {"version": "v9", "analysis_sec": "40.0", "analysis_thinking_budget": ""},
+    ])
+    assert [row["budget"] for row in load_history(str(path))] == [0, 8000, 4000]
+
+
+def test_history_is_reread_only_when_the_log_changes(tmp_path):
+    path = tmp_path / "test-log.csv"
+    row = {"version": "v0.5", "analysis_sec": "50.0", "analysis_thinking_budget": "4000"}
+    _write_log(path, [row])
+    history = load_history(str(path))
+    assert load_history(str(path)) is history
+
+    _write_log(path, [row, {**row, "analysis_sec": "55.0"}])
+    assert len(load_history(str(path))) == 2
@@ -0,0 +1,74 @@
+"""
+Unit tests for cache.py — SQLiteCache TTL expiry, LRU eviction and key helpers.
+
+Run: python -m pytest test_cache.py
+"""
+
+import cache
+from cache import SQLiteCache, make_key, normalize_text
+
+
+def _cache(tmp_path, ttl_sec=60, max_entries=10):
+    return SQLiteCache("test", ttl_sec=ttl_sec, max_entries=max_entries, cache_dir=str(tmp_path))
+
+
+def test_get_returns_stored_value_and_counts_hits(tmp_path):
+    c = _cache(tmp_path)
+    c.set("k", {"results": [1, 2]})
+    assert c.get("k") == {"results": [1, 2]}
+    assert c.get("missing") is None
+    assert c.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_expired_entry_is_a_miss_unless_stale_allowed(tmp_path, monkeypatch):
+    c = _cache(tmp_path, ttl_sec=10)
+    now = 1_000_000.0
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    c.set("k", "v")
+
+    now += 11
+    assert c.get("k") is None
+    assert c.get("k", allow_stale=True) == "v"
+    # Stale reads aren't hits.
+    assert c.hits == 0
+
+
+def test_lru_evicts_least_recently_used(tmp_path, monkeypatch):
+    c = _cache(tmp_path, max_entries=2)
+    clock = iter(range(1, 100))
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")          # a is now more recent than b
+    c.set("c", 3)
+
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+
+
+def test_contains_does_not_count_or_refresh(tmp_path, monkeypatch):
+    c = _cache(tmp_path, max_entries=2)
+    clock = iter(range(1, 100))
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.contains("a")
+    assert not c.contains("z")
+    c.set("c", 3)       # contains() didn't refresh a, so a is evicted
+
+    assert c.hits == 0 and c.misses == 0
+    assert not c.contains("a")
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    c = _cache(tmp_path, ttl_sec=0)
+    c.set("k", "v")
+    assert c.get("k") is None
+    assert not c.contains("k")
+
+
+def test_normalized_phrasings_share_a_key():
+    assert normalize_text("GDPR Article 22 automated decisions?") == "gdpr article 22 automated decisions"
+    assert make_key(normalize_text("HIPAA  rules!"), 3) == make_key(normalize_text("hipaa rules"), 3)
+    assert make_key("a", 3) != make_key("a", 5)
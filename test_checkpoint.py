@@ -0,0 +1,63 @@
+"""
+Unit tests for checkpoint.py — saving, resuming and invalidating run checkpoints.
+
+Run: python -m pytest test_checkpoint.py
+"""
+
+import pytest
+
+import checkpoint
+from cache import SQLiteCache
+from checkpoint import clear_checkpoint, load_steps, save_step
+
+PLAN = {"queries": ["eu ai act logging"], "tokens_in": 900, "tokens_out": 120}
+RESEARCH = {"findings": "=== Search: eu ai act logging ===", "searches": []}
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    store = SQLiteCache("checkpoints", ttl_sec=60, max_entries=10, cache_dir=str(tmp_path))
+    monkeypatch.setattr(checkpoint, "checkpoint_store", store)
+    return store
+
+
+def test_saved_steps_resume_in_pipeline_order():
+    save_step("run-1", "key-a", "planning", PLAN)
+    save_step("run-1", "key-a", "research", RESEARCH)
+    steps = load_steps("run-1", "key-a")
+    assert list(steps) == ["planning", "research"]
+    assert steps["planning"] == PLAN
+
+
+def test_input_key_mismatch_ignores_the_checkpoint():
+    save_step("run-1", "key-a", "planning", PLAN)
+    assert load_steps("run-1", "key-b") == {}
+
+
+def test_saving_under_new_inputs_replaces_the_old_steps():
+    save_step("run-1", "key-a", "planning", PLAN)
+    save_step("run-1", "key-a", "research", RESEARCH)
+    save_step("run-1", "key-b", "planning", {**PLAN, "queries": ["hipaa ai chatbot"]})
+
+    assert load_steps("run-1", "key-a") == {}
+    assert list(load_steps("run-1", "key-b")) == ["planning"]
+
+
+def test_research_without_its_plan_is_not_resumable():
+    save_step("run-1", "key-a", "research", RESEARCH)
+    assert load_steps("run-1", "key-a") == {}
+
+
+def test_no_run_id_is_a_no_op(store):
+    save_step(None, "key-a", "planning", PLAN)
+    assert store.stats()["entries"] == 0
+    assert load_steps(None, "key-a") == {}
+    clear_checkpoint(None)
+
+
+def test_clear_drops_the_checkpoint():
+    save_step("run-1", "key-a", "planning", PLAN)
+    save_step("run-2", "key-a", "planning", PLAN)
+    clear_checkpoint("run-1")
+    assert load_steps("run-1", "key-a") == {}
+    assert list(load_steps("run-2", "key-a")) == ["planning"]
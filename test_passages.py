@@ -0,0 +1,66 @@
+"""
+Unit tests for passages.py — BM25 passage selection and its fallbacks.
+
+Run: python -m pytest test_passages.py
+"""
+
+from passages import BM25, extract_passages, split_sentences, tokenize
+
+FILLER = "Our offices are open Monday to Friday. Subscribe to the newsletter for updates."
+RELEVANT = "HIPAA requires covered entities to sign a business associate agreement with AI vendors."
+CONTEXT_ONLY = "Chatbots that triage patients must log every conversation."
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("What are the HIPAA rules for AI?") == ["hipaa", "rules", "ai"]
+
+
+def test_split_sentences():
+    assert split_sentences("One. Two? Three!\nFour; five") == ["One.", "Two?", "Three!", "Four;", "five"]
+
+
+def test_bm25_prefers_rarer_matching_terms():
+    bm25 = BM25([["hipaa", "ai"], ["ai", "news"], ["ai", "blog"]])
+    terms = {"hipaa": 1.0, "ai": 1.0}
+    assert bm25.score(0, terms) > bm25.score(1, terms) > 0
+    assert bm25.score(1, {"gdpr": 1.0}) == 0
+
+
+def test_picks_relevant_sentences_in_original_order():
+    content = " ".join([FILLER, CONTEXT_ONLY, FILLER, RELEVANT, FILLER])
+    [passage] = extract_passages([content], "HIPAA business associate agreement",
+                                 context="patient triage chatbot",
+                                 budget_chars=len(RELEVANT) + len(CONTEXT_ONLY) + 3)
+
+    assert passage == f"{CONTEXT_ONLY} … {RELEVANT}"
+
+
+def test_query_terms_outrank_context_terms():
+    content = " ".join([CONTEXT_ONLY, FILLER, RELEVANT])
+    [passage] = extract_passages([content], "HIPAA business associate agreement",
+                                 context="patient triage chatbot", budget_chars=len(RELEVANT) + 5)
+    assert passage == RELEVANT
+
+
+def test_short_content_is_kept_whole():
+    assert extract_passages([FILLER], "HIPAA", budget_chars=500) == [FILLER]
+
+
+def test_falls_back_to_lead_when_nothing_matches():
+    content = FILLER * 5
+    [passage] = extract_passages([content], "GDPR Article 22", budget_chars=60)
+    assert passage == content[:60]
+
+
+def test_overlong_best_sentence_is_cut():
+    long_sentence = "HIPAA " + "requirements apply broadly " * 20 + "."
+    [passage] = extract_passages([FILLER + " " + long_sentence], "HIPAA", budget_chars=50)
+    assert passage == long_sentence[:50]
+
+
+def test_one_passage_per_content():
+    contents = [FILLER * 3, RELEVANT + " " + FILLER * 3, ""]
+    passages = extract_passages(contents, "HIPAA business associate", budget_chars=100)
+    assert len(passages) == 3
+    assert passages[1] == RELEVANT
+    assert passages[2] == ""
@@ -0,0 +1,130 @@
+"""
+Unit tests for research.py — result and query deduplication, findings budget.
+
+Run: python -m pytest test_research.py
+"""
+
+from research import (QueryDeduper, assemble_findings, canonical_url, compile_findings,
+                      content_fingerprint, dedupe_findings, estimate_tokens)
+from tools import format_search_results
+
+PAGE = ("The EU AI Act requires providers of high-risk AI systems to keep technical "
+        "documentation and automatically generated logs.")
+
+
+def _search(query, *results):
+    return {"query": query, "results": list(results), "latency_sec": 1.0, "cached": False}
+
+
+def _result(name, score, content=PAGE):
+    return {"title": name, "url": f"https://example.com/{name}", "content": content, "score": score}
+
+
+def _cost(query, *results):
+    """Estimated tokens assemble_findings() charges for results, plus their query header if given."""
+    cost = sum(estimate_tokens(format_search_results([r])) for r in results)
+    return cost + (estimate_tokens(f"\n=== Search: {query} ===") if query else 0)
+
+
+def test_canonical_url_ignores_trivial_differences():
+    variants = [
+        "http://www.Example.com/ai-act/?utm_source=news&utm_medium=email#art-10",
+        "https://example.com/ai-act",
+        "https://EXAMPLE.com/ai-act/?fbclid=abc",
+    ]
+    assert {canonical_url(url) for url in variants} == {"https://example.com/ai-act"}
+
+
+def test_canonical_url_keeps_meaningful_query_params():
+    assert canonical_url("https://example.com/doc?id=2&lang=en") == canonical_url("https://example.com/doc?lang=en&id=2")
+    assert canonical_url("https://example.com/doc?id=1") != canonical_url("https://example.com/doc?id=2")
+
+
+def test_content_fingerprint_ignores_case_punctuation_and_spacing():
+    assert content_fingerprint(PAGE) == content_fingerprint("  " + PAGE.upper().replace(" ", "   "))
+    assert content_fingerprint(PAGE) != content_fingerprint(PAGE + " Extra sentence.")
+    assert content_fingerprint("?!") == ""
+
+
+def test_dedupe_findings_merges_by_url_and_by_content():
+    searches = [
+        _search("eu ai act", {"url": "https://example.com/ai-act", "content": PAGE}),
+        _search("ai act logging",
+                {"url": "https://www.example.com/ai-act/?utm_source=x", "content": "Same page, refetched."},
+                {"url": "https://mirror.org/ai-act-copy", "content": PAGE.lower()},
+                {"url": "https://other.org/gdpr", "content": "GDPR Article 22 covers automated decisions."}),
+    ]
+    deduped, stats = dedupe_findings(searches)
+
+    assert [r["url"] for r in deduped[0]["results"]] == ["https://example.com/ai-act"]
+    assert deduped[0]["results"][0]["queries"] == ["eu ai act", "ai act logging"]
+    assert [r["url"] for r in deduped[1]["results"]] == ["https://other.org/gdpr"]
+    assert stats["results_merged"] == 2
+    assert stats["tokens_saved"] > 0
+
+
+def test_dedupe_findings_keeps_distinct_results():
+    searches = [
+        _search("a", {"url": "https://a.org/1", "content": "First page."}),
+        _search("b", {"url": "https://b.org/2", "content": "Second page."}),
+    ]
+    deduped, stats = dedupe_findings(searches)
+    assert [len(s["results"]) for s in deduped] == [1, 1]
+    assert stats == {"results_merged": 0, "tokens_saved": 0}
+
+
+def test_query_deduper_maps_rephrasings_onto_the_first():
+    deduper = QueryDeduper(threshold=0.5)
+    queries = deduper.dedupe([
+        "GDPR automated decisions",
+        "automated decision-making GDPR",
+        "HIPAA AI chatbot requirements",
+    ])
+
+    assert queries == ["GDPR automated decisions", "HIPAA AI chatbot requirements"]
+    assert deduper.merges[0]["query"] == "automated decision-making GDPR"
+    assert deduper.merges[0]["merged_into"] == "GDPR automated decisions"
+    # Offering a query again (streamed, then in the final plan) is a no-op.
+    assert deduper.add("GDPR automated decisions") == "GDPR automated decisions"
+    assert deduper.add("automated decision-making GDPR") == "GDPR automated decisions"
+    assert len(deduper.merges) == 1
+
+
+def test_assemble_findings_admits_every_querys_best_result_first():
+    a1, a2 = _result("a1", 0.5), _result("a2", 0.9)
+    b1 = _result("b1", 0.2)
+    searches = [_search("query a", a1, a2), _search("query b", b1)]
+    budget = _cost("query a", a2) + _cost("query b", b1)
+
+    findings, report = assemble_findings(searches, budget)
+
+    # b1 scores lowest overall but is query b's best, so it beats a's runner-up.
+    assert "https://example.com/a2" in findings and "https://example.com/b1" in findings
+    assert report["dropped"] == [{"query": "query a", "title": "a1", "url": "https://example.com/a1"}]
+    assert report["results_kept"] == 2 and report["results_dropped"] == 1
+    assert report["tokens"] == estimate_tokens(findings)
+
+
+def test_assemble_findings_skips_results_that_no_longer_fit():
+    big = _result("big", 0.9, content=PAGE * 10)
+    small = _result("small", 0.8)
+    searches = [_search("query a", _result("a1", 0.9)), _search("query b", big, small)]
+    budget = _cost("query a", searches[0]["results"][0]) + _cost("query b", small)
+
+    findings, report = assemble_findings(searches, budget)
+
+    assert [d["title"] for d in report["dropped"]] == ["big"]
+    assert "https://example.com/small" in findings
+
+
+def test_assemble_findings_lays_out_kept_results_in_plan_order():
+    searches = [_search("query a", _result("a1", 0.1), _result("a2", 0.9)),
+                _search("query b", _result("b1", 0.5))]
+    findings, report = assemble_findings(searches, 0)
+
+    assert report["results_dropped"] == 0
+    order = [findings.index(f"https://example.com/{n}") for n in ("a2", "a1", "b1")]
+    assert order == sorted(order)
+    # With no cap it's compile_findings() over the score-ranked results.
+    ranked = [_search("query a", searches[0]["results"][1], searches[0]["results"][0]), searches[1]]
+    assert findings == compile_findings(ranked)
@@ -0,0 +1,88 @@
+"""
+Unit tests for retry.py — retry-after hints as a floor on backoff, and the cap.
+
+Run: python -m pytest test_retry.py
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import retry
+from retry import RetryPolicy, retry_after_sec
+
+
+class ProviderError(Exception):
+    """An API error carrying HTTP response headers, like anthropic's and httpx's."""
+
+    def __init__(self, **headers):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers=headers)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """Record retry delays instead of sleeping through them."""
+    slept = []
+    monkeypatch.setattr(retry.time, "sleep", slept.append)
+    monkeypatch.setattr(retry.deadline, "remaining", lambda: float("inf"))
+    return slept
+
+
+def _flaky(*errors):
+    """fn() raising each error in turn, then returning "ok"."""
+    pending = list(errors)
+
+    def fn():
+        if pending:
+            raise pending.pop(0)
+        return "ok"
+    return fn
+
+
+def test_retry_after_header_forms():
+    assert retry_after_sec(ProviderError(**{"retry-after": "7"})) == 7.0
+    assert retry_after_sec(ProviderError(**{"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+    assert retry_after_sec(ProviderError(**{"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_sec(ProviderError(**{"retry-after": "soon"})) is None
+    assert retry_after_sec(ProviderError()) is None
+    assert retry_after_sec(ValueError("no response")) is None
+
+
+def test_retry_after_is_a_floor_on_the_delay(no_sleep):
+    policy = RetryPolicy(max_attempts=2, base_sec=1, cap_sec=20)
+    assert policy.call(_flaky(ProviderError(**{"retry-after": "12"}))) == "ok"
+    assert no_sleep == [12.0]
+
+
+def test_backoff_delay_stays_within_base_and_cap():
+    policy = RetryPolicy(base_sec=1, cap_sec=5)
+    for previous in (1, 2, 10, 100):
+        assert 1 <= policy.next_delay(previous) <= 5
+
+
+def test_hint_beyond_cap_gives_up(no_sleep):
+    policy = RetryPolicy(max_attempts=3, base_sec=1, cap_sec=20)
+    error = ProviderError(**{"retry-after": "60"})
+    with pytest.raises(ProviderError):
+        policy.call(_flaky(error))
+    assert no_sleep == []
+
+
+def test_gives_up_when_deadline_leaves_no_time(no_sleep, monkeypatch):
+    monkeypatch.setattr(retry.deadline, "remaining", lambda: 5.0)
+    policy = RetryPolicy(max_attempts=3, base_sec=1, cap_sec=20, min_attempt_sec=2)
+    with pytest.raises(ProviderError):
+        policy.call(_flaky(ProviderError(**{"retry-after": "4"})))
+    assert no_sleep == []
+
+
+def test_attempts_and_retryable_are_honoured(no_sleep):
+    policy = RetryPolicy(max_attempts=2, base_sec=1, cap_sec=20)
+    with pytest.raises(ProviderError):
+        policy.call(_flaky(ProviderError(), ProviderError()))
+    assert len(no_sleep) == 1
+
+    with pytest.raises(ValueError):
+        policy.call(_flaky(ValueError("bad request")), retryable=lambda e: not isinstance(e, ValueError))
+    assert len(no_sleep) == 1
@@ -0,0 +1,75 @@
+"""
+Unit tests for sections.py — merging shard replies into one report.
+
+Run: python -m pytest test_sections.py
+"""
+
+from sections import (MISSING_SECTION_NOTE, REPORT_SECTIONS, merge_sections, render_shard,
+                      shard_sections, split_sections)
+
+SHARD_TEXTS = {
+    "matrix": "### 1. Compliance Gap Matrix\n\n| Requirement | Status |\n|---|---|\n| DPIA | Gap |",
+    "landscape": "### 2. Key Regulatory Landscape\n\nGDPR and the EU AI Act apply.",
+    "details": "### 3. Gap Details\n\nNo DPIA on file.",
+    "next_steps": "### 4. Recommended Next Steps\n\n1. Run a DPIA.\n\n### 5. Bottom Line\n\nFixable in a quarter.",
+}
+
+
+def _headers(report):
+    return [line[4:] for line in report.splitlines() if line.startswith("### ")]
+
+
+def test_split_sections_matches_headers_by_name():
+    text = ("Preamble that is dropped.\n"
+            "## gap details\nFirst gap.\n"
+            "#### Appendix\nStays with gap details.\n"
+            "# 5. Bottom Line #\nShip it.")
+    assert split_sections(text) == {
+        "3. Gap Details": "First gap.\n#### Appendix\nStays with gap details.",
+        "5. Bottom Line": "Ship it.",
+    }
+
+
+def test_merge_puts_every_section_in_report_order():
+    report, missing = merge_sections(SHARD_TEXTS)
+    assert missing == []
+    assert _headers(report) == REPORT_SECTIONS
+    assert "No DPIA on file." in report and MISSING_SECTION_NOTE not in report
+
+
+def test_failed_shard_is_replaced_by_a_notice():
+    report, missing = merge_sections({**SHARD_TEXTS, "landscape": ""})
+    assert missing == ["2. Key Regulatory Landscape"]
+    assert _headers(report) == REPORT_SECTIONS
+    assert f"### 2. Key Regulatory Landscape\n\n{MISSING_SECTION_NOTE}" in report
+
+
+def test_shard_missing_one_of_its_sections():
+    report, missing = merge_sections({**SHARD_TEXTS, "next_steps": "### Recommended Next Steps\n\n1. Run a DPIA."})
+    assert missing == ["5. Bottom Line"]
+    assert report.endswith(f"### 5. Bottom Line\n\n{MISSING_SECTION_NOTE}")
+
+
+def test_misheaded_shard_reply_is_normalized():
+    markdown, missing = render_shard("details", "## **3. GAP DETAILS**\n\nNo DPIA on file.")
+    assert missing == []
+    assert markdown == "### 3. Gap Details\n\nNo DPIA on file."
+
+
+def test_headerless_reply_is_the_shards_first_section():
+    assert shard_sections("next_steps", "1. Run a DPIA.") == {"4. Recommended Next Steps": "1. Run a DPIA."}
+
+
+def test_sections_a_shard_was_not_asked_for_are_dropped():
+    # The details shard also wrote a bottom line; only the next_steps shard's copy is kept.
+    texts = {**SHARD_TEXTS, "details": SHARD_TEXTS["details"] + "\n\n### 5. Bottom Line\n\nDuplicate."}
+    report, missing = merge_sections(texts)
+    assert missing == []
+    assert "Duplicate." not in report
+    assert _headers(report) == REPORT_SECTIONS
+
+
+def test_bare_bold_header_is_recognized():
+    text = "**3. Gap Details**\n\nNo DPIA on file.\n\n**High risk:** no audit log."
+    assert split_sections(text) == {"3. Gap Details": "No DPIA on file.\n\n**High risk:** no audit log."}
+    assert render_shard("details", text) == ("### 3. Gap Details\n\nNo DPIA on file.\n\n**High risk:** no audit log.", [])
@@ -12,62 +12,220 @@ Agent Workflow:
 
 
 import os
-import time
-from tavily import TavilyClient
+import asyncio
+from tavily import TavilyClient, AsyncTavilyClient
 from dotenv import load_dotenv
 
+from cache import SQLiteCache, normalize_text, make_key
+from passages import extract_passages
+from ratelimit import tavily_limiter
+from breaker import CircuitOpenError, tavily_breaker
+from retry import retry_policy
+from hedging import search_hedger
+
 # Load environment variables
 load_dotenv()
 
 # Initialize Tavily client once (reused for all searches)
 # DESIGN DECISION: Created at file level for efficiency
 tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+async_tavily = AsyncTavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+
+# Search-result cache — regulatory content changes slowly, so repeat analyses
+# can skip Tavily entirely. Set SEARCH_CACHE_TTL_SEC=0 to disable.
+search_cache = SQLiteCache(
+    "search",
+    ttl_sec=float(os.getenv("SEARCH_CACHE_TTL_SEC", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000")),
+)
+
+
+def search_cache_key(query: str, max_results: int, search_depth: str) -> str:
+    return make_key(normalize_text(query), max_results, search_depth)
+
+
+def _shape_results(raw_results: list, query: str, context: str = "") -> list:
+    """Trim raw Tavily results down to what the analysis prompt needs.
+
+    Content is cut to the sentences most relevant to the query and context
+    (see passages.extract_passages) rather than its first N characters.
+    """
+    passages = extract_passages([r.get('content', '') for r in raw_results], query, context)
+    results = []
+    for result, passage in zip(raw_results, passages):
+        results.append({
+            'title': result.get('title', ''),
+            'url': result.get('url', ''),
+            'content': passage,
+            'score': result.get('score', 0.0),
+        })
+    return results
+
+
+def _cache_hit(cache_key: str, query: str, context: str) -> dict | None:
+    cached = search_cache.get(cache_key)
+    if cached is None:
+        return None
+    print(f"\n💾 Cache hit: {query}")
+    return {'results': _shape_results(cached, query, context), 'cached': True}
+
+
+def _search_succeeded(response: dict, cache_key: str, query: str, context: str, hedged: bool) -> dict:
+    raw_results = response.get('results', [])
+    if raw_results:
+        search_cache.set(cache_key, raw_results)
+
+    results = _shape_results(raw_results, query, context)
+    print(f"\n🔍 Found {len(results)} results")
+    response = {'results': results, 'cached': False}
+    if hedged:
+        response['hedged'] = True
+    return response
+
+
+def _search_failed(error: Exception, cache_key: str, query: str, context: str) -> dict:
+    """Serve stale cache if there is any, else an error response."""
+    if isinstance(error, CircuitOpenError):
+        print(f"\n🔌 {error}: {query}")
+    else:
+        print(f"\n❌ Search failed: {str(error)}")
+
+    stale = search_cache.get(cache_key, allow_stale=True)
+    if stale is not None:
+        print(f"\n💾 Serving stale cache (Tavily unavailable): {query}")
+        return {'results': _shape_results(stale, query, context), 'cached': True, 'stale': True}
+
+    response = {'results': [], 'error': str(error)}
+    if isinstance(error, CircuitOpenError):
+        response['circuit_open'] = True
+    return response
 
 
 #search_web() - Use Tavily to search the web for information
-def search_web(query: str, max_results: int = 3) -> dict:
+def search_web(query: str, max_results: int = 3, search_depth: str = "advanced", context: str = "") -> dict:
     """
     Search the web for compliance-related information.
     
     Args:
         query: Search query string (e.g., "HIPAA requirements for AI")
         max_results: Maximum number of results to return (default: 3)
+        search_depth: Tavily search depth, "basic" or "advanced" (default: "advanced")
+        context: Extra relevance terms (the use case) for passage extraction.
+            Not part of the cache key — raw results are cached and re-trimmed.
         
     Returns:
-        Dictionary with 'results' list, or 'error' key if search fails
+        Dictionary with 'results' list and 'cached' flag, or 'error' key if search fails.
+        'hedged' is set when a slow search was raced against a duplicate request
+        (see hedging.py).
+        When Tavily is down (breaker open, or both attempts failed) an expired
+        cache entry is served instead if there is one, flagged 'stale'.
     """
-    
-    last_error = None
-    for attempt in range(2):
+
+    cache_key = search_cache_key(query, max_results, search_depth)
+    cached = _cache_hit(cache_key, query, context)
+    if cached is not None:
+        return cached
+
+    # Tavily bills advanced searches at 2 API credits, basic at 1.
+    credits = 2 if search_depth == "advanced" else 1
+    hedged = False
+
+    def search():
+        return tavily.search(
+            query=query,
+            max_results=max_results,
+            search_depth=search_depth
+            )
+
+    def hedge_search():
+        # The duplicate request is billed too, so it queues for its own credits.
+        tavily_limiter.acquire(credits)
+        return search()
+
+    def attempt():
+        nonlocal hedged
+        tavily_breaker.check()
+        try:
+            tavily_limiter.acquire(credits)
+            print(f"\n🔍 Searching: {query}")
+            response, attempt_hedged = search_hedger.call(search, hedge_fn=hedge_search)
+        except Exception:
+            tavily_breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (e.g. after the research quorum): no verdict, free the probe.
+            tavily_breaker.release()
+            raise
+        hedged = hedged or attempt_hedged
+        tavily_breaker.record_success()
+        return response
+
+    try:
+        response = retry_policy.call(
+            attempt,
+            retryable=lambda e: not isinstance(e, CircuitOpenError),
+            label=f"Search \"{query}\"",
+        )
+    except Exception as e:
+        return _search_failed(e, cache_key, query, context)
+    return _search_succeeded(response, cache_key, query, context, hedged)
+
+
+async def search_web_async(query: str, max_results: int = 3, search_depth: str = "advanced",
+                           context: str = "") -> dict:
+    """
+    search_web() on the async Tavily client, for the asyncio pipeline (agent_async.py).
+
+    Same cache, rate limits, breaker, retries, hedging and return value; waits
+    yield to the event loop instead of blocking a thread. Cache reads and
+    writes (SQLite) and passage extraction run in a worker thread.
+    """
+    cache_key = search_cache_key(query, max_results, search_depth)
+    cached = await asyncio.to_thread(_cache_hit, cache_key, query, context)
+    if cached is not None:
+        return cached
+
+    credits = 2 if search_depth == "advanced" else 1
+    hedged = False
+
+    async def search():
+        return await async_tavily.search(
+            query=query,
+            max_results=max_results,
+            search_depth=search_depth
+            )
+
+    async def hedge_search():
+        await tavily_limiter.acquire_async(credits)
+        return await search()
+
+    async def attempt():
+        nonlocal hedged
+        tavily_breaker.check()
         try:
+            await tavily_limiter.acquire_async(credits)
             print(f"\n🔍 Searching: {query}")
+            response, attempt_hedged = await search_hedger.call_async(search, hedge_fn=hedge_search)
+        except Exception:
+            tavily_breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (e.g. after the research quorum): no verdict, free the probe.
+            tavily_breaker.release()
+            raise
+        hedged = hedged or attempt_hedged
+        tavily_breaker.record_success()
+        return response
 
-            response = tavily.search(
-                query=query, 
-                max_results=max_results,
-                search_depth="advanced"
-                )
-            
-            results = []
-            for result in response.get('results', []):
-                results.append({
-                    'title': result.get('title', ''),
-                    'url': result.get('url', ''),
-                    'content': result.get('content', '')[:500]
-                })
-            
-            print(f"\n🔍 Found {len(results)} results")
-            return {'results': results}
-
-        except Exception as e:
-            last_error = e
-            if attempt == 0:
-                print(f"\n⚠️ Search failed (attempt 1/2), retrying in 2s…")
-                time.sleep(2)
-            else:
-                print(f"\n❌ Search failed after retry: {str(e)}")
-
-    return {'results': [], 'error': str(last_error)}
+    try:
+        response = await retry_policy.call_async(
+            attempt,
+            retryable=lambda e: not isinstance(e, CircuitOpenError),
+            label=f"Search \"{query}\"",
+        )
+    except Exception as e:
+        return await asyncio.to_thread(_search_failed, e, cache_key, query, context)
+    return await asyncio.to_thread(_search_succeeded, response, cache_key, query, context, hedged)
 
 
 def format_search_results(search_results: list) -> str:
@@ -90,6 +248,8 @@ def format_search_results(search_results: list) -> str:
         formatted.append(f"\n --- Result {i} ---")
         formatted.append(f"Title: {result.get('title', 'N/A')}")
         formatted.append(f"URL: {result.get('url', 'N/A')}")
+        if len(result.get('queries', [])) > 1:
+            formatted.append(f"Surfaced by: {'; '.join(result['queries'])}")
         formatted.append(f"Content: {result.get('content', 'N/A')}")
 
     return "\n".join(formatted)
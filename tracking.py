@@ -12,6 +12,8 @@ import traceback as tb_module
 from datetime import datetime, timezone
 from functools import wraps
 
+from breaker import breaker_states
+
 _supabase_client = None
 _tracking_enabled = False
 
@@ -104,14 +106,50 @@ def complete_run(
     timing: dict,
     status: str = "completed",
     error_message: str | None = None,
+    cache_hit: bool = False,
+    speculative_hit_rate: float | None = None,
+    quorum_fired: bool | None = None,
+    model_usage: dict | None = None,
+    cost_usd: float | None = None,
+    analysis_inputs: dict | None = None,
+    thinking_decision: dict | None = None,
+    resumed: dict | None = None,
 ) -> None:
-    """Update an analysis run with final timing and status."""
+    """Update an analysis run with final timing and status.
+
+    cache_hit marks runs served from the run-result cache; their timing is
+    copied from the original run. quorum_fired is None unless research ran
+    in quorum mode. model_usage is the run's per-step model, latency, tokens
+    and cost (run_pipeline() result); cost_usd its estimated Claude spend.
+    analysis_inputs (findings_tokens, jurisdictions) and the analysis thinking
+    budget feed budget_controller.py; thinking_decision is its pick, if any.
+    resumed is set when the run resumed a failed run's checkpoint (see checkpoint.py).
+    """
+    model_usage = model_usage or {}
+    analysis_inputs = analysis_inputs or {}
     update = {
         "status": status,
+        "cache_hit": cache_hit,
+        "speculative_hit_rate": speculative_hit_rate,
         "planning_sec": timing.get("planning_sec"),
         "research_sec": timing.get("research_sec"),
+        "overlap_saved_sec": timing.get("overlap_saved_sec"),
+        "rate_limit_wait_sec": timing.get("rate_limit_wait_sec"),
+        "quorum_fired": quorum_fired,
+        "quorum_saved_sec": timing.get("quorum_saved_sec"),
         "analysis_sec": timing.get("analysis_sec"),
+        "analysis_ttft_sec": timing.get("analysis_ttft_sec"),
+        "analysis_tokens_per_sec": timing.get("analysis_tokens_per_sec"),
         "total_sec": timing.get("total_sec"),
+        "planning_model": model_usage.get("planning", {}).get("model"),
+        "analysis_model": model_usage.get("analysis", {}).get("model"),
+        "model_usage": model_usage or None,
+        "cost_usd": cost_usd,
+        "analysis_thinking_budget": model_usage.get("analysis", {}).get("thinking_budget"),
+        "findings_tokens": analysis_inputs.get("findings_tokens"),
+        "jurisdictions": analysis_inputs.get("jurisdictions"),
+        "thinking_decision": thinking_decision,
+        "resumed": resumed,
         "completed_at": datetime.now(timezone.utc).isoformat(),
     }
     if error_message:
@@ -172,11 +210,16 @@ def log_error(
     user_inputs: dict | None = None,
     app_version: str = "",
 ) -> None:
-    """Persist a structured error record to Supabase for post-incident debugging."""
+    """Persist a structured error record to Supabase for post-incident debugging.
+
+    Provider circuit-breaker states are attached, so an error can be told
+    apart from a known outage.
+    """
     row = {
         "error_type": type(error).__name__,
         "error_message": str(error)[:2000],
         "error_traceback": tb_module.format_exc()[:4000],
+        "breaker_state": breaker_states(),
         "app_version": app_version,
     }
     if session_id: